@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,9 +39,11 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'bookshelf',
+    'perfkit',
 ]
 
 MIDDLEWARE = [
+    'perfkit.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +83,10 @@ DATABASES = {
     }
 }
 
+# SQLite connection profile (perfkit/sqliteprofile.py): overrides of DEFAULT_PRAGMAS
+SQLITE_PRAGMAS = {}
+SQLITE_MAINTENANCE_INTERVAL = 300  # seconds between PRAGMA optimize + WAL checkpoint; 0 disables
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,3 +128,10 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Query budgets and N+1 detection (perfkit/querybudget.py): strict under the
+# test runner or with QUERY_BUDGET_STRICT=1
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+TEST_RUNNER = 'perfkit.testrunner.QueryBudgetTestRunner'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -39,9 +41,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'api',
+    'jobs',
+    'perfkit',
 ]
 
 MIDDLEWARE = [
+    'perfkit.querybudget.QueryBudgetMiddleware',
+    'perfkit.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,9 +84,102 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Transactions take the write lock at BEGIN and wait for it (busy_timeout);
+        # a deferred one that reads first fails with "database is locked" when it writes
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
+# SQLite connection profile (perfkit/sqliteprofile.py): overrides of DEFAULT_PRAGMAS
+SQLITE_PRAGMAS = {}
+SQLITE_MAINTENANCE_INTERVAL = 300  # seconds between PRAGMA optimize + WAL checkpoint; 0 disables
+
+# Read replicas (perfkit/replicas.py): aliases such as ['replica']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_SECONDS = 5  # read-your-writes window after a request writes
+for _alias in DATABASE_REPLICAS:
+    DATABASES[_alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.{_alias}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['perfkit.replicas.ReplicaRouter']
+
+# Single-writer queue (api/writequeue.py): book create/update requests hand their
+# writes to one writer thread per process, which commits them in batches.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_MAX_BATCH = 50     # writes per transaction
+WRITE_QUEUE_MAX_DELAY = 0.002  # seconds the writer waits to fill a batch
+WRITE_QUEUE_TIMEOUT = 30       # seconds a request waits for its write
+
+# Background jobs (jobs/queue.py): `python manage.py run_workers` runs JOBS_WORKERS
+# processes that claim queued jobs from the database
+JOBS_WORKERS = 2
+JOBS_POLL_INTERVAL = 1.0        # seconds between polls of an idle worker
+JOBS_RETRY_DELAY = 5            # seconds before the first retry, doubled per attempt
+JOBS_RETRY_MAX_DELAY = 600
+JOBS_HEARTBEAT_INTERVAL = 10    # seconds between heartbeats of a running job
+JOBS_STALE_AFTER = 60           # seconds without a heartbeat before a job is requeued
+JOBS_IMPORT_DIR = BASE_DIR / 'imports'  # import_books jobs only read files below it
+JOBS_EXPORT_DIR = BASE_DIR / 'exports'
+
+# Autocomplete (api/suggest.py): seconds between background rebuilds of each
+# process's prefix index, which pick up bulk writes and other processes' writes
+SUGGEST_REBUILD_INTERVAL = 300
+
+# Counts on paginated lists with a `count_strategy` (perfkit/counting.py)
+COUNT_EXACT_THRESHOLD = 10_000
+
+# Delta sync feed (api/sync.py): days a deleted book or author stays in /api/sync/;
+# older tokens get 410 Gone. The `prune_tombstones` job deletes the rest.
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The API response cache works with locmem (per process) or a shared
+# backend such as django.core.cache.backends.filebased.FileBasedCache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 300  # seconds
+
+# Query budgets and N+1 detection (perfkit/querybudget.py): strict under the
+# test runner or with QUERY_BUDGET_STRICT=1
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+TEST_RUNNER = 'perfkit.testrunner.QueryBudgetTestRunner'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+# JSON goes through orjson when it is installed (api/renderers.py, api/parsers.py)
+# and through DRF's stdlib-based classes otherwise.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# application/msgpack for internal consumers (`Accept: application/msgpack; layout=table`),
+# offered only when the optional msgpack package is installed
+if importlib.util.find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'api.parsers.MessagePackParser')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -18,5 +18,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/jobs/', include('jobs.urls')),
     path('api/', include('api.urls')),  # ✅ Required for checker
 ]
@@ -0,0 +1,158 @@
+"""
+Native async read path for the book API.
+
+DRF views are synchronous, so under ASGI every request to them is handed to a
+worker thread for its whole lifetime. The views below are plain Django async
+views that reuse the configured DRF view (`BookListView`, `BookDetailView`)
+for everything that does not touch the database - content negotiation,
+permissions, filter backends, pagination, serializers, ETags and the response
+cache - and read rows with Django's async ORM (`async for`, `aget()`).
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import arecord, cacheable, etag_matches, get_cache
+from .compiled import NotCompilable, compile_serializer
+from .views import BookDetailView, BookListView
+
+
+# AsyncAPIView: run a DRF view class's GET on the event loop
+class AsyncAPIView(View):
+    """
+    Base class for the async views. Subclasses set `api_view_class` and
+    implement `get_response(api_view, request)`.
+
+    Features:
+    - Same permissions, throttles, negotiation and error responses as `api_view_class`.
+    - Same ETags and cache entries as the sync view, so both share one cache.
+    """
+    api_view_class = None
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        api_view = self.api_view_class()
+        api_view.setup(request, *args, **kwargs)
+        drf_request = api_view.initialize_request(request, *args, **kwargs)
+        api_view.request = drf_request
+        api_view.headers = api_view.default_response_headers
+        try:
+            await self.initial(api_view, drf_request)
+            response = await self.conditional_get(api_view, drf_request)
+        except Exception as exc:
+            response = api_view.handle_exception(exc)
+        response = api_view.finalize_response(drf_request, response, *args, **kwargs)
+        return self.rendered(response)
+
+    @staticmethod
+    def rendered(response):
+        """
+        Render on the event loop and return a plain HttpResponse; Django's async
+        handler would otherwise render a TemplateResponse in a worker thread.
+        """
+        response.render()
+        http_response = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            http_response[header] = value
+        return http_response
+
+    async def initial(self, api_view, request):
+        if 'HTTP_AUTHORIZATION' in request.META:
+            # Header authentication (Basic, tokens) looks the user up synchronously
+            await sync_to_async(api_view.initial)(request)
+            return
+        # Resolve the session user up front so SessionAuthentication does not query
+        request._request.user = await request._request.auser()
+        api_view.initial(request)
+
+    async def conditional_get(self, api_view, request):
+        """
+        ConditionalGetMixin + CachedResponseMixin, with async cache calls only:
+        a file-based or network cache must not block the event loop.
+        """
+        versions = await api_view.aget_versions()
+        etag = api_view.get_etag(request, versions)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        cache = get_cache()
+        key = api_view.get_response_cache_key(request, versions)
+        data = await cache.aget(key)
+        if data is not None:
+            await arecord('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            await arecord('misses')
+            response = await self.get_response(api_view, request)
+            if response.status_code == 200 and cacheable():
+                await cache.aset(key, response.data, api_view.get_cache_timeout())
+            response['X-Cache'] = 'MISS'
+        if response.status_code == 200 and cacheable():
+            response['ETag'] = etag
+        return response
+
+    async def get_response(self, api_view, request):
+        raise NotImplementedError
+
+
+# List books with the filters, ordering and pagination of BookListView
+class AsyncBookListView(AsyncAPIView):
+    """
+    Async twin of BookListView, accepting the same query parameters.
+
+    Example usage:
+    - /api/books/async/?search=tolkien
+    - /api/books/async/?ordering=publication_year&page_size=100
+    - /api/books/async/?facets=publication_year,author
+    """
+    api_view_class = BookListView
+    query_budget = BookListView.query_budget
+    replica_reads = BookListView.replica_reads
+
+    async def get_response(self, api_view, request):
+        facets = api_view.get_requested_facets()
+        response = await self.get_list_response(api_view, request)
+        if facets:
+            await sync_to_async(api_view.add_facets)(response, facets)
+        return response
+
+    async def get_list_response(self, api_view, request):
+        queryset = api_view.filter_queryset(api_view.get_queryset())
+        paginator = api_view.paginator
+        page_queryset = paginator.get_page_queryset(queryset, request, view=api_view) if paginator else None
+        if page_queryset is not None:
+            page = paginator.set_page([book async for book in page_queryset])
+            paginator.count = await sync_to_async(paginator.get_count)()
+            return api_view.get_paginated_response(api_view.get_serializer(page, many=True).data)
+
+        compiled = compile_serializer(api_view.get_serializer_class(), **api_view.get_serializer_options())
+        if compiled is not None:
+            try:
+                return Response(await compiled.aserialize(queryset))
+            except NotCompilable:
+                pass
+        books = [book async for book in queryset]
+        return Response(api_view.get_serializer(books, many=True).data)
+
+
+# Retrieve a single book like BookDetailView
+class AsyncBookDetailView(AsyncAPIView):
+    """
+    Async twin of BookDetailView, including 'fields' and 'expand'.
+    """
+    api_view_class = BookDetailView
+    query_budget = BookDetailView.query_budget
+    replica_reads = BookDetailView.replica_reads
+
+    async def get_response(self, api_view, request):
+        queryset = api_view.filter_queryset(api_view.get_queryset())
+        lookup_url_kwarg = api_view.lookup_url_kwarg or api_view.lookup_field
+        try:
+            book = await queryset.aget(**{api_view.lookup_field: api_view.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        api_view.check_object_permissions(request, book)
+        return Response(api_view.get_serializer(book).data)
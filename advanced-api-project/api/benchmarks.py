@@ -0,0 +1,149 @@
+"""
+Helpers shared by the `benchmark_*` management commands.
+
+Benchmarks run against a scratch copy of the schema (the same database Django
+creates for the test suite), so they never touch development data.
+"""
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .models import Author, Book, stamp_changes
+from .stats import rebuild_stats
+
+WORDS = [
+    'shadow', 'river', 'empire', 'garden', 'silence', 'night', 'crown', 'storm',
+    'harvest', 'mirror', 'ember', 'winter', 'orchard', 'stone', 'voyage', 'lantern',
+    'hollow', 'tide', 'meridian', 'quiet', 'salt', 'ash', 'thunder', 'paper',
+]
+
+
+@contextmanager
+def scratch_database(using=DEFAULT_DB_ALIAS, keepdb=False, name=None):
+    """
+    Create a migrated test database for the block and destroy it afterwards.
+    Pass `name` (or set DATABASES[...]['TEST']['NAME']) to benchmark against a
+    file instead of memory; concurrent writers need a file on SQLite.
+
+    The test environment is set up too, so the Django/DRF test clients can be
+    used to drive requests through the full middleware stack.
+    """
+    connection = connections[using]
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if name:
+        test_settings['NAME'] = name
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+
+
+def seed_catalog(books, authors=None, seed=0, batch_size=5000):
+    """
+    Insert a deterministic catalog of `books` books spread over `authors` authors.
+    The same arguments always produce the same titles, years and authorship.
+    """
+    rng = random.Random(seed)
+    authors = authors or max(1, books // 10)
+    author_objs = Author.objects.bulk_create(
+        stamp_changes(
+            Author(name=f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}") for i in range(authors)
+        ),
+        batch_size=batch_size,
+    )
+
+    def make_book():
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+        year = rng.randint(1900, 2024)
+        author = author_objs[rng.randrange(authors)]
+        return Book(title=title, publication_year=year, author=author, author_name=author.name)
+
+    Book.objects.bulk_create(stamp_changes(make_book() for _ in range(books)), batch_size=batch_size)
+    rebuild_stats()
+    return author_objs
+
+
+def measure(func, repeat=1):
+    """Call `func` `repeat` times and return the wall-clock duration of each call in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations):
+    """Latency summary in milliseconds."""
+    return {
+        'count': len(durations),
+        'mean_ms': statistics.fmean(durations) * 1000 if durations else 0.0,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
+
+
+def run_threaded(func, items, concurrency, make_state=dict):
+    """
+    Call `func(state, item)` for every item on `concurrency` threads, as a
+    threaded WSGI server would, and return each call's duration in seconds.
+    `make_state()` builds per-thread state such as a test client.
+    """
+    local = threading.local()
+
+    def timed(item):
+        if not hasattr(local, 'state'):
+            local.state = make_state()
+        start = time.perf_counter()
+        func(local.state, item)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        durations = list(pool.map(timed, items))
+        # Each worker thread opened its own database connection
+        list(pool.map(lambda _: connections.close_all(), range(concurrency)))
+    return durations
+
+
+def compare_results(results, baseline, tolerance=0.2):
+    """
+    Compare two `run_benchmarks` reports and list the regressions: scenarios
+    whose p95 latency grew, or whose throughput fell, by more than `tolerance`,
+    or that failed more requests. Scenarios missing from the baseline are ignored.
+    """
+    regressions = []
+    for size, scenarios in results['results'].items():
+        for name, stats in scenarios.items():
+            base = baseline['results'].get(size, {}).get(name)
+            if base is None:
+                continue
+            if stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}@{size}: p95 {base['p95_ms']:.1f}ms -> {stats['p95_ms']:.1f}ms")
+            if stats['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+                regressions.append(
+                    f"{name}@{size}: throughput {base['throughput_rps']:.0f} -> {stats['throughput_rps']:.0f} req/s"
+                )
+            if stats['errors'] > base['errors']:
+                regressions.append(f"{name}@{size}: errors {base['errors']} -> {stats['errors']}")
+    return regressions
@@ -0,0 +1,224 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from perfkit.replicas import read_from_replica
+
+GENERATION_KEY = 'api:generation:%s'
+STATS_KEY = 'api:cache-stats:%s'
+
+
+def get_cache():
+    """Cache backend used for API responses (settings.API_CACHE_ALIAS, 'default' by default)."""
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def get_generation(name):
+    """
+    Current generation counter for a model ('book', 'author').
+
+    A missing counter is seeded from the clock rather than 0, so a counter that
+    was evicted never restarts at a value that older cache entries still use.
+    """
+    cache = get_cache()
+    key = GENERATION_KEY % name
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+async def aget_generation(name):
+    """get_generation() with the async cache API, for code on the event loop."""
+    cache = get_cache()
+    key = GENERATION_KEY % name
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), None)
+        generation = await cache.aget(key, 0)
+    return generation
+
+
+def bump_generation(*names):
+    """Invalidate every cached response that depends on the given models."""
+    cache = get_cache()
+    for name in names:
+        try:
+            cache.incr(GENERATION_KEY % name)
+        except ValueError:
+            cache.set(GENERATION_KEY % name, time.time_ns(), None)
+
+
+def record(event):
+    cache = get_cache()
+    key = STATS_KEY % event
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First event, or a backend that stores nothing (DummyCache)
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+
+
+async def arecord(event):
+    """record() with the async cache API."""
+    cache = get_cache()
+    key = STATS_KEY % event
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            try:
+                await cache.aincr(key)
+            except ValueError:
+                pass
+
+
+def cache_stats():
+    cache = get_cache()
+    return {event: cache.get(STATS_KEY % event, 0) for event in ('hits', 'misses')}
+
+
+def cacheable():
+    """
+    False when the current request read from a replica. Replicas can lag the
+    writes that bumped the generation counters, so their data must not be
+    stored under the current generations or answered with their ETag.
+    """
+    return not read_from_replica()
+
+
+def normalized_query(request, exclude=()):
+    """Query string with keys and values sorted, so equivalent URLs share a key."""
+    items = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in exclude
+        for value in values
+    )
+    return urlencode(items)
+
+
+def etag_matches(header, etag, allow_wildcard=False):
+    """True if an If-None-Match / If-Match header value matches `etag`."""
+    if header is None:
+        return False
+    header = header.strip()
+    return (allow_wildcard and header == '*') or etag in parse_etags(header)
+
+
+# VersionedResourceMixin: identify a response by the generations it was built from
+class VersionedResourceMixin:
+    """
+    Shared by the cache and conditional request mixins.
+
+    `cache_models` lists the generation counters a response depends on;
+    views whose data comes from a single row override `get_version_names()`
+    and `get_resource_id()` to use a per-row counter instead. Async views
+    read the counters with `aget_versions()` and pass them on.
+    """
+    cache_models = ('book', 'author')
+
+    def get_version_names(self):
+        return self.cache_models
+
+    def get_versions(self):
+        return [get_generation(name) for name in self.get_version_names()]
+
+    async def aget_versions(self):
+        return [await aget_generation(name) for name in self.get_version_names()]
+
+    def get_resource_id(self, request):
+        return f"{request.get_host()}{request.path}?{normalized_query(request)}"
+
+    def get_etag(self, request, versions=None):
+        """Strong ETag computed from counters only: no query, no serialization."""
+        if versions is None:
+            versions = self.get_versions()
+        versions = '.'.join(str(version) for version in versions)
+        media_type = getattr(request, 'accepted_media_type', '')
+        digest = hashlib.md5(f"{versions}|{self.get_resource_id(request)}|{media_type}".encode()).hexdigest()
+        return f'"{digest}"'
+
+
+# CachedResponseMixin: serve repeated GETs from the cache until the data changes
+class CachedResponseMixin(VersionedResourceMixin):
+    """
+    Cache the serialized data of successful GET responses.
+
+    Keys combine the generation counters of `cache_models` with the request
+    path and normalized query string. Any write to those models bumps a
+    counter (see api/signals.py), which makes every older entry unreachable,
+    so stale data is never served and nothing has to be deleted explicitly.
+    Responses read from a replica are served but not stored.
+    """
+    cache_timeout = None
+
+    def get(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        record('misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and cacheable():
+            cache.set(key, response.data, self.get_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_cache_timeout(self):
+        return self.cache_timeout or getattr(settings, 'API_CACHE_TIMEOUT', 300)
+
+    def get_response_cache_key(self, request, versions=None):
+        if versions is None:
+            versions = self.get_versions()
+        versions = '.'.join(str(version) for version in versions)
+        digest = hashlib.md5(self.get_resource_id(request).encode()).hexdigest()
+        return f"api:response:{type(self).__name__}:{versions}:{digest}"
+
+
+# ConditionalGetMixin: answer If-None-Match with 304 before touching the database
+class ConditionalGetMixin(VersionedResourceMixin):
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200 and cacheable():
+            response['ETag'] = etag
+        return response
+
+
+# ConditionalUpdateMixin: optimistic concurrency through If-Match
+class ConditionalUpdateMixin(VersionedResourceMixin):
+    """
+    Reject updates whose If-Match header does not carry the current ETag.
+    Requests without If-Match are processed as before.
+    """
+    precondition_failed_message = 'The resource was modified since it was last fetched.'
+
+    def update(self, request, *args, **kwargs):
+        if_match = request.META.get('HTTP_IF_MATCH')
+        if if_match is not None and not etag_matches(if_match, self.get_etag(request), allow_wildcard=True):
+            return Response(
+                {'detail': self.precondition_failed_message},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = self.get_etag(request)
+        return response
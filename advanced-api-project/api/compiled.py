@@ -0,0 +1,173 @@
+"""
+Compiled read path for ModelSerializers.
+
+`compile_serializer(BookSerializer)` inspects the serializer's fields once and
+generates a plain function that turns a `values_list()` tuple into the same
+dict `BookSerializer(instance).data` would produce, skipping model instances
+and the per-field `to_representation()` calls. Nested `many=True` serializers
+over a reverse foreign key (e.g. `AuthorSerializer.books`) are fetched with one
+extra query and grouped in Python.
+
+Only fields whose representation is the database value itself (model columns,
+or queryset annotations for read-only fields) are supported; for anything else
+`compile_serializer()` returns None and callers fall back to the regular
+serializer.
+"""
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ManyToOneRel
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Serializer fields whose to_representation() is the identity for values coming
+# out of the database (after Django's own converters)
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.FloatField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# Parent pks per nested query, below SQLite's bound-parameter limit
+NESTED_CHUNK_SIZE = 5000
+
+_compiled = {}
+
+
+class NotCompilable(Exception):
+    pass
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, **options):
+        serializer = serializer_class(**options)
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.nested = []
+        self.annotations = set()
+        items = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                items.append(f"{name!r}: nested_{len(self.nested)}.get(row[{{pk}}], [])")
+                self.nested.append(self.compile_nested(field))
+            elif isinstance(field, PASSTHROUGH_FIELDS) and field.source != '*' and '.' not in field.source:
+                try:
+                    self.model._meta.get_field(field.source)
+                except FieldDoesNotExist:
+                    # Read-only values such as books_count must come from a queryset annotation
+                    if not field.read_only:
+                        raise NotCompilable(f"{serializer_class.__name__}.{name} has no model field")
+                    self.annotations.add(field.source)
+                items.append(f"{name!r}: row[{len(self.columns)}]")
+                self.columns.append(field.source)
+            else:
+                raise NotCompilable(f"{serializer_class.__name__}.{name} ({type(field).__name__})")
+
+        # Nested lists are keyed by the parent pk, which may not be an output field
+        pk_index = len(self.columns)
+        if self.nested:
+            self.columns.append('pk')
+        args = ''.join(f", nested_{index}" for index in range(len(self.nested)))
+        source = "def row_to_dict(row%s):\n    return {%s}\n" % (
+            args, ', '.join(item.replace('{pk}', str(pk_index)) for item in items)
+        )
+        namespace = {}
+        exec(compile(source, f"<compiled {serializer_class.__name__}>", 'exec'), namespace)
+        self.row_to_dict = namespace['row_to_dict']
+        self.code = source
+
+    def compile_nested(self, field):
+        relation = self.model._meta.get_field(field.source)
+        if not isinstance(relation, ManyToOneRel):
+            raise NotCompilable(f"{field.source} is not a reverse foreign key")
+        child = compile_serializer(type(field.child), strict=True)
+        if child.annotations:
+            raise NotCompilable(f"{field.source} needs annotations")
+        return child, relation.field.attname
+
+    def check_annotations(self, queryset):
+        missing = self.annotations - set(queryset.query.annotations)
+        if missing:
+            raise NotCompilable(f"queryset is not annotated with {', '.join(sorted(missing))}")
+
+    def serialize(self, queryset):
+        self.check_annotations(queryset)
+        rows = list(queryset.values_list(*self.columns))
+        return self.serialize_rows(rows)
+
+    async def aserialize(self, queryset):
+        """Same as `serialize()`, reading the rows with async iteration."""
+        self.check_annotations(queryset)
+        rows = [row async for row in queryset.values_list(*self.columns)]
+        if self.nested:
+            return await sync_to_async(self.serialize_rows)(rows)
+        return self.serialize_rows(rows)
+
+    def serialize_rows(self, rows):
+        nested_maps = []
+        if self.nested:
+            parent_pks = [row[-1] for row in rows]
+            for child, fk_column in self.nested:
+                nested_maps.append(child.serialize_grouped(fk_column, parent_pks))
+        row_to_dict = self.row_to_dict
+        return [row_to_dict(row, *nested_maps) for row in rows]
+
+    def serialize_grouped(self, fk_column, parent_pks):
+        """Serialize the children of `parent_pks`, grouped by parent pk."""
+        rows = []
+        for start in range(0, len(parent_pks), NESTED_CHUNK_SIZE):
+            rows += (
+                self.model._default_manager
+                .filter(**{f"{fk_column}__in": parent_pks[start:start + NESTED_CHUNK_SIZE]})
+                .order_by('pk')
+                .values_list(*self.columns, fk_column)
+            )
+        grouped = defaultdict(list)
+        for row, item in zip(rows, self.serialize_rows([row[:-1] for row in rows])):
+            grouped[row[-1]].append(item)
+        return grouped
+
+
+def compile_serializer(serializer_class, strict=False, **options):
+    """
+    Return the CompiledSerializer for `serializer_class`, built once per class
+    and set of constructor `options` (e.g. sparse `fields`), or None when one of
+    its fields is not supported (unless `strict`).
+    """
+    key = (serializer_class, tuple(sorted(options.items())))
+    if key not in _compiled:
+        try:
+            _compiled[key] = CompiledSerializer(serializer_class, **options)
+        except NotCompilable:
+            _compiled[key] = None
+    if strict and _compiled[key] is None:
+        raise NotCompilable(serializer_class.__name__)
+    return _compiled[key]
+
+
+# CompiledListMixin: serve unpaginated list responses through the compiled serializer
+class CompiledListMixin:
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        compiled = compile_serializer(self.get_serializer_class(), **self.get_serializer_options())
+        if compiled is not None:
+            try:
+                return Response(compiled.serialize(queryset))
+            except NotCompilable:
+                pass
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    def get_serializer_options(self):
+        """Extra serializer kwargs, see SparseFieldsViewMixin."""
+        return {}
@@ -0,0 +1,114 @@
+"""
+Sparse fieldsets: `?fields=id,title` and `?expand=author`.
+
+The serializer mixin trims its fields; the view mixin validates the query
+parameters and narrows the SQL to match, with `.only()` for the requested
+columns and `select_related()` only for expanded relations.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+# SparseFieldsSerializerMixin: accept `fields` and `expand` keyword arguments
+class SparseFieldsSerializerMixin:
+    """
+    - `fields`: names to keep, in the serializer's own order.
+    - `expand`: names from `Meta.expandable_fields` to replace with the nested
+      serializer declared there (e.g. the author pk becomes {"id", "name"}).
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', ())
+        super().__init__(*args, **kwargs)
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand:
+            self.fields[name] = expandable[name](read_only=True)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+# SparseFieldsViewMixin: parse/validate ?fields= and ?expand= and narrow the queryset
+class SparseFieldsViewMixin:
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def get_serializer_options(self):
+        """Validated `fields`/`expand` serializer kwargs for this request ({} when absent)."""
+        if not hasattr(self, '_serializer_options'):
+            self._serializer_options = self.parse_serializer_options()
+        return self._serializer_options
+
+    def parse_serializer_options(self):
+        params = self.request.query_params
+        fields = self.split(params.get(self.fields_query_param))
+        expand = self.split(params.get(self.expand_query_param))
+
+        serializer_class = self.get_serializer_class()
+        available = list(serializer_class().fields)
+        expandable = list(getattr(serializer_class.Meta, 'expandable_fields', {}))
+        errors = {}
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            errors[self.fields_query_param] = [
+                f"Unknown field(s): {', '.join(unknown)}. Available fields: {', '.join(available)}."
+            ]
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            errors[self.expand_query_param] = [
+                f"Cannot expand: {', '.join(unknown)}. Expandable fields: {', '.join(expandable) or 'none'}."
+            ]
+        if errors:
+            raise ValidationError(errors)
+
+        # In the serializer's order without repeats: options key the process-wide
+        # compiled serializer cache (api/compiled.py), which must stay bounded
+        options = {}
+        if fields:
+            options['fields'] = tuple(name for name in available if name in fields)
+        if expand:
+            options['expand'] = tuple(name for name in expandable if name in expand)
+        return options
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_serializer_options().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        options = self.get_serializer_options()
+        if not options:
+            return queryset
+
+        serializer = self.get_serializer()
+        model_meta = queryset.model._meta
+        columns = {model_meta.pk.name}
+        # Keep the ordering columns loaded, pagination cursors read them
+        columns.update(
+            field.lstrip('-') for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip('-') in {f.name for f in model_meta.concrete_fields}
+        )
+        related = []
+        for name, field in serializer.fields.items():
+            source = field.source
+            if name in options.get('expand', ()):
+                related.append(source)
+                columns.add(source)
+                columns.update(f"{source}__{sub.source}" for sub in field.fields.values())
+                continue
+            try:
+                model_field = model_meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.add(source)
+
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    @staticmethod
+    def split(value):
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
@@ -0,0 +1,20 @@
+from django_filters import rest_framework as django_filters
+
+from .models import Book
+
+
+# BookFilterSet: query parameters shared by the books list and export endpoints
+class BookFilterSet(django_filters.FilterSet):
+    """
+    Same parameters as before (`title`, `author__name`, `publication_year`),
+    but `author__name` reads the denormalized `Book.author_name` column, so
+    filtering by author needs no join.
+
+    Example usage:
+    - /api/books/?author__name=Chinua%20Achebe
+    """
+    author__name = django_filters.CharFilter(field_name='author_name')
+
+    class Meta:
+        model = Book
+        fields = ['title', 'publication_year']
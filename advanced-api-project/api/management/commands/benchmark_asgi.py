@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from api.benchmarks import run_threaded, scratch_database, seed_catalog, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and tail latency of the book list under concurrent clients for "
+        "WSGI, ASGI with the sync views and ASGI with the async views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--query', default='?page_size=50&ordering=publication_year')
+        parser.add_argument('--cache', action='store_true', help="Keep the response cache enabled.")
+
+    def handle(self, *args, **options):
+        caches = None if options['cache'] else {
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        }
+        with scratch_database(), override_settings(**({'CACHES': caches} if caches else {})):
+            seed_catalog(options['rows'])
+            sync_url = reverse('book-list') + options['query']
+            async_url = reverse('book-list-async') + options['query']
+            runs = [
+                ('wsgi (sync views)', self.run_wsgi, sync_url),
+                ('asgi (sync views)', self.run_asgi, sync_url),
+                ('asgi (async views)', self.run_asgi, async_url),
+            ]
+            for label, run, url in runs:
+                start = time.perf_counter()
+                durations = run(url, options['requests'], options['concurrency'])
+                elapsed = time.perf_counter() - start
+                stats = summarize(durations)
+                self.stdout.write(
+                    f"{label:<19} {len(durations) / elapsed:8.0f} req/s  p50={stats['p50_ms']:7.1f}ms  "
+                    f"p95={stats['p95_ms']:7.1f}ms  p99={stats['p99_ms']:7.1f}ms"
+                )
+
+    def run_wsgi(self, url, requests, concurrency):
+        """One thread per client, as a threaded WSGI server would run them."""
+        def fetch(client, _):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        return run_threaded(fetch, range(requests), concurrency, make_state=Client)
+
+    def run_asgi(self, url, requests, concurrency):
+        """`concurrency` clients on one event loop through Django's ASGI handler."""
+        async def main():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def fetch():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    assert response.status_code == 200, response.status_code
+                    return time.perf_counter() - start
+
+            return await asyncio.gather(*(fetch() for _ in range(requests)))
+
+        return asyncio.run(main())
@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.benchmarks import scratch_database, seed_catalog
+from api.models import Book
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of BookCreateView (one book per request) with the bulk endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows, batch_size = options['rows'], options['batch_size']
+        with scratch_database():
+            authors = seed_catalog(0, authors=50)
+            payload = [
+                {'title': f'Ingested Book {i}', 'publication_year': 1950 + i % 70, 'author': authors[i % 50].pk}
+                for i in range(rows)
+            ]
+            client = APIClient()
+            client.force_authenticate(User.objects.create_user(username='bench', password='bench'))
+
+            start = time.perf_counter()
+            for item in payload:
+                client.post(reverse('book-create'), item, format='json')
+            single = rows / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, rows, batch_size):
+                response = client.post(reverse('book-bulk'), payload[offset:offset + batch_size], format='json')
+                assert response.status_code == 201, response.data
+            bulk = rows / (time.perf_counter() - start)
+
+            assert Book.objects.count() == rows * 2
+            self.stdout.write(f"single-item: {single:,.0f} rows/sec")
+            self.stdout.write(f"bulk ({batch_size}/request): {bulk:,.0f} rows/sec")
+            self.stdout.write(self.style.SUCCESS(f"speedup: {bulk / single:.1f}x"))
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api.benchmarks import measure, scratch_database, seed_catalog, summarize
+from api.models import Book
+from api.stats import estimate_book_count
+from perfkit.counting import count_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the time of one 50-book page with a full COUNT(*) of the filtered list and with "
+        "the 'auto' counting strategy (perfkit/counting.py) on a generated catalog."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--threshold', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with scratch_database(), override_settings(COUNT_EXACT_THRESHOLD=options['threshold']):
+            author_objs = seed_catalog(options['rows'], seed=options['seed'])
+            books = Book.objects.all()
+            author_name = author_objs[0].name
+            cases = [
+                ('all books', books, {}),
+                ('publication_year=1950', books.filter(publication_year=1950), {'year': 1950}),
+                ('author__name=<one author>', books.filter(author_name=author_name), {'author_name': author_name}),
+                ("title contains 'shadow'", books.filter(title__icontains='shadow'), None),
+            ]
+            for label, queryset, estimate_args in cases:
+                estimate = (lambda _, args=estimate_args: estimate_book_count(**args)) if estimate_args is not None else None
+                page = summarize(measure(lambda: list(queryset.order_by('title', 'pk')[:51]), options['repeat']))
+                exact = summarize(measure(queryset.count, options['repeat']))
+                auto = summarize(measure(partial(count_queryset, queryset, 'auto', estimate), options['repeat']))
+                count = count_queryset(queryset, 'auto', estimate)
+                self.stdout.write(
+                    f"{label:<28} page={page['p50_ms']:7.1f}ms  COUNT(*)={exact['p50_ms']:7.1f}ms  "
+                    f"auto={auto['p50_ms']:7.1f}ms  -> {count.value} ({count.type}, exact {queryset.count()})"
+                )
@@ -0,0 +1,59 @@
+import io
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import measure, scratch_database, seed_catalog, summarize
+from api.models import Author, Book
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import AuthorSerializer, BookSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer/JSONParser with FastJSONRenderer/FastJSONParser on list payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: both sides use the stdlib encoder."))
+        repeat = options['repeat']
+        with scratch_database():
+            seed_catalog(max(options['rows']))
+            for rows in options['rows']:
+                cases = [
+                    ('books', BookSerializer(Book.objects.order_by('pk')[:rows], many=True).data),
+                    ('authors+books', AuthorSerializer(
+                        Author.objects.annotate(books_count=Count('books')).prefetch_related('books')
+                        .order_by('pk')[:rows // 10], many=True,
+                    ).data),
+                ]
+                for label, data in cases:
+                    self.compare(label, rows, data, repeat)
+
+    def compare(self, label, rows, data, repeat):
+        stock_body = JSONRenderer().render(data)
+        fast_body = FastJSONRenderer().render(data)
+        timings = {
+            'render': (
+                summarize(measure(lambda: JSONRenderer().render(data), repeat))['p50_ms'],
+                summarize(measure(lambda: FastJSONRenderer().render(data), repeat))['p50_ms'],
+            ),
+            'parse': (
+                summarize(measure(lambda: JSONParser().parse(io.BytesIO(stock_body)), repeat))['p50_ms'],
+                summarize(measure(lambda: FastJSONParser().parse(io.BytesIO(stock_body)), repeat))['p50_ms'],
+            ),
+        }
+        for step, (stock_ms, fast_ms) in timings.items():
+            self.stdout.write(
+                f"{label:<14} {rows:>7} rows  {step:<6} stdlib={stock_ms:8.1f}ms  fast={fast_ms:7.1f}ms  "
+                f"speedup={stock_ms / fast_ms:5.1f}x"
+            )
+        self.stdout.write(
+            f"{label:<14} {rows:>7} rows  {len(stock_body) / 1024:,.0f} KiB  identical={stock_body == fast_body}"
+        )
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from api.benchmarks import measure, scratch_database, seed_catalog, summarize
+from api.models import Author, Book
+from api.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from api.serializers import AuthorSerializer, BookSerializer
+
+
+def json_loads(body):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def msgpack_loads(body):
+    return msgpack.unpackb(body, raw=False)
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and encode/decode time of JSON and MessagePack (maps and table layout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if msgpack is None:
+            raise CommandError("msgpack is not installed (pip install msgpack).")
+        formats = [
+            ('json', FastJSONRenderer(), json_loads, 'application/json'),
+            ('msgpack', MessagePackRenderer(), msgpack_loads, 'application/msgpack'),
+            ('msgpack table', MessagePackRenderer(), msgpack_loads, 'application/msgpack; layout=table'),
+        ]
+        with scratch_database():
+            seed_catalog(max(options['rows']))
+            for rows in options['rows']:
+                cases = [
+                    ('books', BookSerializer(Book.objects.order_by('pk')[:rows], many=True).data),
+                    ('authors+books', AuthorSerializer(
+                        Author.objects.annotate(books_count=Count('books')).prefetch_related('books')
+                        .order_by('pk')[:rows // 10], many=True,
+                    ).data),
+                ]
+                for label, data in cases:
+                    json_size = None
+                    for name, renderer, loads, media_type in formats:
+                        body = renderer.render(data, media_type)
+                        json_size = json_size or len(body)
+                        encode_ms = summarize(measure(lambda: renderer.render(data, media_type), options['repeat']))['p50_ms']
+                        # Decoding as a client does: the table stays a table
+                        decode_ms = summarize(measure(lambda: loads(body), options['repeat']))['p50_ms']
+                        self.stdout.write(
+                            f"{label:<14} {rows:>7} rows  {name:<14} {len(body) / 1024:8,.0f} KiB "
+                            f"({len(body) / json_size:4.0%})  encode={encode_ms:6.1f}ms  decode={decode_ms:6.1f}ms"
+                        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import WORDS, measure, scratch_database, seed_catalog, summarize
+from api.models import Book
+from api.search import FullTextSearchFilter
+from api.views import BookListView
+
+
+class Command(BaseCommand):
+    help = "Compare the FTS5 search filter with the LIKE-based SearchFilter on a seeded catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = BookListView()
+        queries = ['storm', 'gard', 'night crown', WORDS[5][:3]]
+
+        with scratch_database():
+            seed_catalog(options['books'], seed=options['seed'])
+            self.stdout.write(f"Seeded {Book.objects.count()} books")
+
+            for backend in (filters.SearchFilter(), FullTextSearchFilter()):
+                for term in queries:
+                    request = Request(factory.get('/api/books/', {'search': term}))
+
+                    def run():
+                        list(backend.filter_queryset(request, Book.objects.all(), view).values_list('id', flat=True))
+
+                    stats = summarize(measure(run, options['repeat']))
+                    self.stdout.write(
+                        f"{type(backend).__name__:<22} {term!r:<14} "
+                        f"p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms"
+                    )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import measure, scratch_database, seed_catalog, summarize
+from api.compiled import compile_serializer
+from api.models import Author, Book
+from api.serializers import AuthorSerializer, BookSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare the stock ModelSerializer read path with the compiled serializer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10_000, 100_000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        render = JSONRenderer().render
+        with scratch_database():
+            seed_catalog(max(options['rows']))
+            cases = [
+                ('books', Book.objects.order_by('pk'), BookSerializer, {}),
+                ('authors+books', Author.objects.annotate(books_count=Count('books')).order_by('pk'), AuthorSerializer, {'books': 10}),
+            ]
+            for label, base_queryset, serializer_class, ratio in cases:
+                compiled = compile_serializer(serializer_class)
+                for rows in options['rows']:
+                    limit = rows // ratio.get('books', 1)
+                    queryset = base_queryset[:limit]
+                    if serializer_class is AuthorSerializer:
+                        queryset = queryset.prefetch_related('books')
+
+                    stock_data = compiled_data = None
+
+                    def stock():
+                        nonlocal stock_data
+                        stock_data = serializer_class(queryset.all(), many=True).data
+
+                    def fast():
+                        nonlocal compiled_data
+                        compiled_data = compiled.serialize(queryset.all())
+
+                    stock_ms = summarize(measure(stock, repeat))['p50_ms']
+                    fast_ms = summarize(measure(fast, repeat))['p50_ms']
+                    identical = render(stock_data) == render(compiled_data)
+                    self.stdout.write(
+                        f"{label:<14} {rows:>7} rows  stock={stock_ms:9.1f}ms  compiled={fast_ms:8.1f}ms  "
+                        f"speedup={stock_ms / fast_ms:5.1f}x  identical={identical}"
+                    )
@@ -0,0 +1,80 @@
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from api.benchmarks import run_threaded, scratch_database, seed_catalog, summarize
+from api.models import Book
+from perfkit.sqliteprofile import DEFAULT_PRAGMAS
+
+# SQLite's own defaults, spelled out so the file is switched back from WAL
+STOCK_PRAGMAS = {
+    'busy_timeout': 5000,  # what Python's sqlite3 module sets anyway
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'DEFAULT',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare mixed read/write throughput and latency of concurrent workers on a SQLite file "
+        "with the stock pragmas and with the tuned connection profile (perfkit/sqliteprofile.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20_000)
+        parser.add_argument('--operations', type=int, default=4000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--database-file', help="Scratch SQLite file (default: a temporary file).")
+
+    def handle(self, *args, **options):
+        database_file = options['database_file'] or os.path.join(tempfile.gettempdir(), 'api_sqlite_profile.sqlite3')
+        with scratch_database(name=database_file):
+            seed_catalog(options['rows'], seed=options['seed'])
+            pks = list(Book.objects.values_list('pk', flat=True))
+            rng = random.Random(options['seed'])
+            operations = [
+                ('write', rng.choice(pks)) if rng.random() < options['write_ratio'] else ('read', rng.randint(1900, 2024))
+                for _ in range(options['operations'])
+            ]
+            for label, pragmas in (('stock', STOCK_PRAGMAS), ('tuned', DEFAULT_PRAGMAS)):
+                # Pragmas are applied when a connection opens
+                connections.close_all()
+                with override_settings(SQLITE_PRAGMAS=pragmas, SQLITE_MAINTENANCE_INTERVAL=0):
+                    self.run_profile(label, operations, options['concurrency'])
+            connections.close_all()
+
+    def run_profile(self, label, operations, concurrency):
+        errors = []
+
+        def operate(state, operation):
+            kind, value = operation
+            try:
+                if kind == 'read':
+                    list(Book.objects.filter(publication_year=value).order_by('pk')
+                         .values_list('id', 'title', 'author_name')[:50])
+                else:
+                    Book.objects.filter(pk=value).update(title=f"Revised {value}")
+            except OperationalError:
+                # "database is locked" once busy_timeout runs out
+                errors.append(kind)
+
+        start = time.perf_counter()
+        durations = run_threaded(operate, operations, concurrency)
+        elapsed = time.perf_counter() - start
+        for kind in ('read', 'write'):
+            stats = summarize([d for (k, _), d in zip(operations, durations) if k == kind])
+            self.stdout.write(
+                f"{label:<6} {kind:<6} {stats['count']:6} ops  p50={stats['p50_ms']:7.2f}ms  "
+                f"p95={stats['p95_ms']:7.2f}ms  p99={stats['p99_ms']:7.2f}ms  errors={errors.count(kind)}"
+            )
+        self.stdout.write(f"{label:<6} total  {len(operations) / elapsed:8.0f} ops/s")
@@ -0,0 +1,58 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import WORDS, summarize
+from api.suggest import SuggestIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the autocomplete prefix index (api/suggest.py) over generated titles and names, "
+        "and report its memory, build time and lookup latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+        parser.add_argument('--lookups', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            rng = random.Random(options['seed'])
+            books = [
+                (pk, ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title())
+                for pk in range(1, rows + 1)
+            ]
+            authors = [
+                (pk, f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}") for pk in range(1, rows // 10 + 1)
+            ]
+
+            index = SuggestIndex()
+            index.build(iter(books), iter(authors))
+            build_seconds = index.build_seconds
+            # Measured on a second build: tracing slows allocation down several times
+            tracemalloc.start()
+            index = SuggestIndex()
+            index.build(iter(books), iter(authors))
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            queries = [
+                rng.choice(WORDS)[:rng.randint(1, 6)] if rng.random() < 0.8 else rng.choice(books)[1][:8]
+                for _ in range(options['lookups'])
+            ]
+            durations = []
+            for query in queries:
+                start = time.perf_counter()
+                index.lookup(query, limit=10)
+                durations.append(time.perf_counter() - start)
+            stats = summarize(durations)
+            self.stdout.write(
+                f"{rows:>9} titles  {index.stats()['keys']:>9} keys  {memory / 2 ** 20:7.1f} MiB "
+                f"({memory / 2 ** 20 / rows * 1_000_000:6.0f} MiB per million titles)  "
+                f"build={build_seconds:5.1f}s  lookup p50={stats['p50_ms'] * 1000:5.0f}us "
+                f"p99={stats['p99_ms'] * 1000:5.0f}us"
+            )
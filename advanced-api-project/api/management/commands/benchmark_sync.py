@@ -0,0 +1,60 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from api.benchmarks import scratch_database, seed_catalog
+from api.models import Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the bytes and time of re-fetching /api/books/ with a delta sync from "
+        "/api/sync/ (api/sync.py) after a few books were updated and deleted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+        parser.add_argument('--changes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_catalog(options['rows'], seed=options['seed'])
+            client = Client()
+            rng = random.Random(options['seed'])
+            pks = list(Book.objects.values_list('pk', flat=True))
+            token = self.sync_all(client)
+
+            for changes in options['changes']:
+                changed = rng.sample(pks, changes)
+                for pk in changed[:changes // 2]:
+                    book = Book.objects.get(pk=pk)
+                    book.title = f"{book.title} (revised)"
+                    book.save(update_fields=['title'])
+                Book.objects.filter(pk__in=changed[changes // 2:]).delete()
+                pks = list(set(pks) - set(changed[changes // 2:]))
+
+                # The list cache was invalidated by the writes, so this is a real re-fetch
+                start = time.perf_counter()
+                full = client.get('/api/books/')
+                full_ms = (time.perf_counter() - start) * 1000
+                start = time.perf_counter()
+                received, token, pages = self.sync_all(client, token, with_stats=True)
+                sync_ms = (time.perf_counter() - start) * 1000
+                self.stdout.write(
+                    f"{changes:>5} changes  full list: {len(full.content) / 1024:8.0f} KiB {full_ms:7.0f}ms  "
+                    f"sync: {received / 1024:6.1f} KiB {sync_ms:6.1f}ms in {pages} page(s)"
+                )
+
+    def sync_all(self, client, token=None, with_stats=False):
+        received = pages = 0
+        url = f'/api/sync/?since={token}' if token else '/api/sync/?limit=5000'
+        while url:
+            response = client.get(url)
+            data = response.json()
+            received += len(response.content)
+            pages += 1
+            token, url = data['token'], data['next']
+        return (received, token, pages) if with_stats else token
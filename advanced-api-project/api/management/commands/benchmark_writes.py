@@ -0,0 +1,99 @@
+import os
+import random
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.benchmarks import run_threaded, scratch_database, seed_catalog, summarize
+from api.models import Book
+from api.writequeue import get_write_queue, stop_write_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test concurrent BookCreateView/BookUpdateView requests on a SQLite file, with every "
+        "request thread writing itself and with the single-writer queue (api/writequeue.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--requests', type=int, default=3000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--max-batch', type=int, default=50)
+        parser.add_argument('--max-delay', type=float, default=0.002, help="Seconds.")
+        parser.add_argument('--busy-timeout', type=int, default=5000, help="SQLite busy_timeout in ms.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--database-file', help="Scratch SQLite file (default: a temporary file).")
+
+    def handle(self, *args, **options):
+        database_file = options['database_file'] or os.path.join(tempfile.gettempdir(), 'api_write_queue.sqlite3')
+        with scratch_database(name=database_file), override_settings(
+            SQLITE_PRAGMAS={'busy_timeout': options['busy_timeout']},
+            # Responses are not cached, but every write bumps the cache generations
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ):
+            connections.close_all()
+            authors = seed_catalog(options['rows'], seed=options['seed'])
+            user = User.objects.create_user(username='bench', password='bench')
+            pks = list(Book.objects.values_list('pk', flat=True))
+            rng = random.Random(options['seed'])
+            requests = [
+                ('create', {'title': f'Load Book {i}', 'publication_year': rng.randint(1900, 2024),
+                            'author': rng.choice(authors).pk})
+                if rng.random() < 0.5 else
+                ('update', (rng.choice(pks), {'title': f'Load Revision {i}'}))
+                for i in range(options['requests'])
+            ]
+            for label, enabled in (('direct', False), ('queued', True)):
+                with override_settings(
+                    WRITE_QUEUE_ENABLED=enabled,
+                    WRITE_QUEUE_MAX_BATCH=options['max_batch'],
+                    WRITE_QUEUE_MAX_DELAY=options['max_delay'],
+                ):
+                    self.run_load(label, requests, options['concurrency'], user)
+                    if enabled:
+                        writer = get_write_queue()
+                        self.stdout.write(
+                            f"{'':<6} {writer.writes} writes in {writer.batches} transactions "
+                            f"({writer.writes / max(writer.batches, 1):.1f} per batch)"
+                        )
+                        stop_write_queue()
+            connections.close_all()
+
+    def run_load(self, label, requests, concurrency, user):
+        errors = []
+
+        def make_client():
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(user)
+            return client
+
+        def send(client, request):
+            kind, payload = request
+            try:
+                if kind == 'create':
+                    response = client.post(reverse('book-create'), payload, format='json')
+                else:
+                    pk, data = payload
+                    response = client.patch(reverse('book-update', args=[pk]), data, format='json')
+                if response.status_code >= 500:
+                    errors.append(kind)
+            except Exception:
+                errors.append(kind)
+
+        start = time.perf_counter()
+        durations = run_threaded(send, requests, concurrency, make_state=make_client)
+        elapsed = time.perf_counter() - start
+        for kind in ('create', 'update'):
+            stats = summarize([d for (k, _), d in zip(requests, durations) if k == kind])
+            self.stdout.write(
+                f"{label:<6} {kind:<6} {stats['count']:6} req  p50={stats['p50_ms']:7.2f}ms  "
+                f"p95={stats['p95_ms']:7.2f}ms  p99={stats['p99_ms']:7.2f}ms  errors={errors.count(kind)}"
+            )
+        self.stdout.write(f"{label:<6} total  {len(requests) / elapsed:8.0f} writes/s")
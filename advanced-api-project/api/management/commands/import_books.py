@@ -0,0 +1,165 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.caching import bump_generation
+from api.models import Author, Book, ImportCheckpoint, stamp_changes
+from api.stats import apply_book_changes
+
+
+def read_chunks(path, fmt, size, skip=0):
+    """Yield lists of raw records (CSV dicts or NDJSON lines), skipping the first `skip` records."""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            records = csv.DictReader(handle)
+        else:
+            records = (line for line in handle if line.strip())
+        records = islice(records, skip, None)
+        while True:
+            chunk = list(islice(records, size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def parse_chunk(fmt, chunk):
+    """
+    Turn raw records into (title, publication_year, author_name) tuples.
+    Runs in worker processes when --workers is set, so it must stay importable.
+    Returns (rows, number of invalid records).
+    """
+    rows, invalid = [], 0
+    for record in chunk:
+        try:
+            if fmt == 'ndjson':
+                record = json.loads(record)
+            title = str(record['title']).strip()
+            author = str(record['author']).strip()
+            year = int(record['publication_year'])
+        except (KeyError, TypeError, ValueError):
+            invalid += 1
+            continue
+        if not title or not author:
+            invalid += 1
+            continue
+        rows.append((title[:200], year, author[:100]))
+    return rows, invalid
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books from a CSV or NDJSON file with columns title, publication_year, author. "
+        "Authors are matched by name and created when missing."
+    )
+    # before_commit: callable run at the end of every transaction (the import_books
+    # job passes job.check_owned, whose exception rolls the batches back)
+    stealth_options = ('before_commit',)
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk_create().")
+        parser.add_argument('--commit-every', type=int, default=10, help="Batches per transaction.")
+        parser.add_argument('--workers', type=int, default=0, help="Parse on a pool of N processes.")
+        parser.add_argument('--checkpoint', help="Checkpoint name (default: the absolute path of the file).")
+        parser.add_argument('--restart', action='store_true', help="Ignore an existing checkpoint.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        self.checkpoint = options['checkpoint'] or path
+
+        done = 0 if options['restart'] else self.load_checkpoint(path)
+        if done:
+            self.stdout.write(f"Resuming after {done} records")
+
+        self.authors = {}
+        self.imported = self.invalid = 0
+        self.started = time.perf_counter()
+        chunks = read_chunks(path, fmt, options['batch_size'], skip=done)
+
+        parsed = self.parsed(fmt, chunks, options['workers'])
+        before_commit = options.get('before_commit')
+        while True:
+            # One transaction per --commit-every batches. The checkpoint is written in it,
+            # so a crash never leaves committed rows that a rerun would insert again
+            group = list(islice(parsed, options['commit_every']))
+            if not group:
+                break
+            with transaction.atomic():
+                for consumed, (rows, invalid) in group:
+                    self.insert(rows)
+                    self.invalid += invalid
+                    done += consumed
+                self.save_checkpoint(path, done)
+                if before_commit:
+                    before_commit()
+            self.stdout.write(f"{done} records processed, {self.imported} imported, {self.rate():,.0f} rows/sec")
+
+        ImportCheckpoint.objects.filter(name=self.checkpoint).delete()
+        bump_generation('book', 'author')
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} books ({self.invalid} invalid records skipped) "
+            f"at {self.rate():,.0f} rows/sec"
+        ))
+
+    def parsed(self, fmt, chunks, workers):
+        """Yield (records consumed, parse_chunk() result) in file order."""
+        if not workers:
+            for chunk in chunks:
+                yield len(chunk), parse_chunk(fmt, chunk)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((len(chunk), pool.submit(parse_chunk, fmt, chunk)))
+                # Keep a bounded number of chunks in flight so memory stays flat
+                if len(pending) >= workers * 2:
+                    consumed, future = pending.popleft()
+                    yield consumed, future.result()
+            while pending:
+                consumed, future = pending.popleft()
+                yield consumed, future.result()
+
+    def insert(self, rows):
+        missing = {name for _, _, name in rows if name not in self.authors}
+        if missing:
+            for pk, name in Author.objects.filter(name__in=missing).order_by('-pk').values_list('pk', 'name'):
+                self.authors[name] = pk
+            created = Author.objects.bulk_create(
+                stamp_changes(Author(name=name) for name in missing - self.authors.keys())
+            )
+            self.authors.update((author.name, author.pk) for author in created)
+
+        books = Book.objects.bulk_create(
+            stamp_changes(
+                Book(title=title, publication_year=year, author_id=self.authors[name], author_name=name)
+                for title, year, name in rows
+            ),
+            batch_size=1000,
+        )
+        apply_book_changes(added=[(book.author_id, book.publication_year) for book in books])
+        self.imported += len(rows)
+
+    def load_checkpoint(self, path):
+        checkpoint = ImportCheckpoint.objects.filter(name=self.checkpoint).first()
+        if checkpoint is None:
+            return 0
+        if checkpoint.source != path:
+            raise CommandError(f"Checkpoint {self.checkpoint!r} belongs to another import ({checkpoint.source}).")
+        return checkpoint.records
+
+    def save_checkpoint(self, path, records):
+        ImportCheckpoint.objects.update_or_create(name=self.checkpoint, defaults={'source': path, 'records': records})
+
+    def rate(self):
+        return self.imported / max(time.perf_counter() - self.started, 1e-9)
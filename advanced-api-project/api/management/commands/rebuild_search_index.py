@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from api.search import rebuild_author_index, rebuild_book_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 indexes used by the book and author search filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'sqlite':
+            raise CommandError("The full-text index is only available on SQLite.")
+        with transaction.atomic(using=using):
+            books = rebuild_book_index(using)
+            authors = rebuild_author_index(using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {books} books and {authors} authors."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from api.caching import bump_generation
+from api.stats import diff_counts, rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the YearStats/AuthorStats tables from live aggregates over api_book, "
+        "or with --check compare them and fail on any difference."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--check', action='store_true', help="Only report differences; fail if there are any.")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = diff_counts(options['database'])
+            for table, key, stored, live in differences:
+                self.stderr.write(f"{table} {key}: stored {stored}, live {live}")
+            if differences:
+                raise CommandError(f"{len(differences)} stats rows differ from the live aggregates.")
+            self.stdout.write(self.style.SUCCESS("Catalog stats match the live aggregates."))
+            return
+
+        years, authors = rebuild_stats(options['database'])
+        bump_generation('book')
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {years} years and {authors} authors."))
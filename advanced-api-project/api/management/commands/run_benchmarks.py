@@ -0,0 +1,149 @@
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.benchmarks import WORDS, compare_results, run_threaded, scratch_database, seed_catalog, summarize
+from api.models import Author, Book
+
+# name: (method, URL name, needs a book pk, query string or payload builder)
+SCENARIOS = {
+    'list': ('get', 'book-list', False, lambda rng, ctx: {'page_size': ctx['page_size']}),
+    'filter': ('get', 'book-list', False,
+               lambda rng, ctx: {'publication_year': rng.randint(1900, 2024), 'page_size': ctx['page_size']}),
+    'search': ('get', 'book-list', False, lambda rng, ctx: {'search': rng.choice(WORDS), 'page_size': ctx['page_size']}),
+    'order': ('get', 'book-list', False,
+              lambda rng, ctx: {'ordering': '-publication_year', 'page_size': ctx['page_size']}),
+    'detail': ('get', 'book-detail', True, lambda rng, ctx: None),
+    'create': ('post', 'book-create', False, lambda rng, ctx: {
+        'title': f"Benchmark {rng.choice(WORDS)}",
+        'publication_year': rng.randint(1900, 2024),
+        'author': rng.choice(ctx['authors']),
+    }),
+    'update': ('patch', 'book-update', True, lambda rng, ctx: {'title': f"Updated {rng.choice(WORDS)}"}),
+    # Last, so the rows it removes are not needed by any other scenario
+    'delete': ('delete', 'book-delete', True, lambda rng, ctx: None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed deterministic catalogs and drive list/filter/search/order/detail/create/update/delete "
+        "traffic through the book URLs, reporting throughput and p50/p95/p99 latency as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--requests', type=int, default=500, help="Requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads.")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cache', action='store_true', help="Keep the response cache enabled.")
+        parser.add_argument('--database-file', help="Scratch SQLite file (default: a temporary file).")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--baseline', help="JSON report to compare against; fails on regressions.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        report = {
+            'meta': {
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'page_size': options['page_size'],
+                'seed': options['seed'],
+                'cache': options['cache'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+            },
+            'results': {},
+        }
+        settings = {} if options['cache'] else {
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        }
+        with override_settings(**settings):
+            for size in options['sizes']:
+                report['results'][str(size)] = self.run_size(size, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            regressions = compare_results(report, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(f"REGRESSION {regression}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stderr.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def run_size(self, size, options):
+        results = {}
+        # A fresh database per size keeps the datasets reproducible. It is a file, not
+        # the in-memory test database, so concurrent writers wait on the lock instead of failing
+        database_file = options['database_file'] or os.path.join(tempfile.gettempdir(), 'api_benchmarks.sqlite3')
+        with scratch_database(name=database_file):
+            seed_catalog(size, seed=options['seed'])
+            user = User.objects.create_user(username='bench', password='bench')
+            pks = list(Book.objects.order_by('pk').values_list('pk', flat=True))
+            context = {
+                'page_size': options['page_size'],
+                'authors': list(Author.objects.values_list('pk', flat=True)),
+            }
+            rng = random.Random(options['seed'])
+            # Update and delete get disjoint rows, so no request hits a deleted book
+            sample = rng.sample(pks, min(len(pks), options['requests'] * 2))
+            targets = {'update': sample[:options['requests']], 'delete': sample[options['requests']:]}
+
+            def make_client():
+                # Server errors count as failed requests instead of aborting the run
+                client = APIClient(raise_request_exception=False)
+                client.force_authenticate(user)
+                return client
+
+            for name in options['scenarios']:
+                method, url_name, needs_pk, build = SCENARIOS[name]
+                calls = []
+                for index in range(len(targets[name]) if name in targets else options['requests']):
+                    kwargs = {}
+                    if needs_pk:
+                        kwargs['pk'] = targets[name][index] if name in targets else rng.choice(pks)
+                    calls.append((reverse(url_name, kwargs=kwargs), build(rng, context)))
+                errors = []
+
+                def request(client, call):
+                    url, data = call
+                    response = getattr(client, method)(url, data, format=None if method == 'get' else 'json')
+                    if response.status_code >= 400:
+                        errors.append(response.status_code)
+
+                start = time.perf_counter()
+                durations = run_threaded(request, calls, options['concurrency'], make_state=make_client)
+                elapsed = time.perf_counter() - start
+                results[name] = {
+                    'throughput_rps': len(durations) / elapsed if elapsed else 0.0,
+                    'errors': len(errors),
+                    **summarize(durations),
+                }
+                self.stderr.write(
+                    f"{size:>9} {name:<8} {results[name]['throughput_rps']:8.0f} req/s  "
+                    f"p50={results[name]['p50_ms']:7.1f}ms  p95={results[name]['p95_ms']:7.1f}ms  "
+                    f"p99={results[name]['p99_ms']:7.1f}ms  errors={len(errors)}"
+                )
+        return results
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, OuterRef, Subquery
+
+from api.caching import bump_generation
+from api.models import Author, Book
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill or repair the denormalized Book.author_name column from Author.name, "
+        "e.g. after raw SQL or queryset.update() renamed authors without signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--check', action='store_true', help="Only report stale rows; fail if there are any.")
+
+    def handle(self, *args, **options):
+        stale = Book.objects.using(options['database']).exclude(author_name=F('author__name'))
+        if options['check']:
+            count = stale.count()
+            if count:
+                raise CommandError(f"{count} books have a stale author_name.")
+            self.stdout.write(self.style.SUCCESS("All author names are in sync."))
+            return
+
+        with transaction.atomic(using=options['database']):
+            # UPDATE ... WHERE id IN (stale books): only the drifted rows are rewritten
+            count = Book.objects.using(options['database']).filter(
+                pk__in=stale.values('pk'),
+            ).update(author_name=Subquery(Author.objects.filter(pk=OuterRef('author_id')).values('name')[:1]))
+        bump_generation('book')
+        self.stdout.write(self.style.SUCCESS(f"Repaired {count} books."))
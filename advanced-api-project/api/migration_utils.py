@@ -0,0 +1,80 @@
+"""
+Helpers shared by the api migrations that maintain the SQLite full-text
+indexes (0003, 0004, 0006 and 0007).
+
+Applied migrations must keep running the same SQL: do not edit the statement
+lists below, add a new list when a later migration changes a trigger.
+"""
+
+# Book index triggers of 0003: the author name is read from api_author, and
+# renaming an author rewrites the index rows of its books.
+BOOK_FTS_AUTHOR_JOIN_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_insert AFTER INSERT ON api_book BEGIN
+        INSERT INTO api_book_fts(rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM api_author WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_update AFTER UPDATE OF title, author_id ON api_book BEGIN
+        DELETE FROM api_book_fts WHERE rowid = old.id;
+        INSERT INTO api_book_fts(rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM api_author WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_delete AFTER DELETE ON api_book BEGIN
+        DELETE FROM api_book_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_author_fts_rename AFTER UPDATE OF name ON api_author BEGIN
+        UPDATE api_book_fts SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM api_book WHERE author_id = new.id);
+    END
+    """,
+]
+
+# Book index triggers since 0004: the index mirrors Book.title and
+# Book.author_name.
+BOOK_FTS_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_insert AFTER INSERT ON api_book BEGIN
+        INSERT INTO api_book_fts(rowid, title, author_name) VALUES (new.id, new.title, new.author_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_update AFTER UPDATE OF title, author_name ON api_book BEGIN
+        DELETE FROM api_book_fts WHERE rowid = old.id;
+        INSERT INTO api_book_fts(rowid, title, author_name) VALUES (new.id, new.title, new.author_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_book_fts_delete AFTER DELETE ON api_book BEGIN
+        DELETE FROM api_book_fts WHERE rowid = old.id;
+    END
+    """,
+]
+
+DROP_BOOK_FTS_TRIGGERS_SQL = [
+    "DROP TRIGGER IF EXISTS api_book_fts_delete",
+    "DROP TRIGGER IF EXISTS api_book_fts_update",
+    "DROP TRIGGER IF EXISTS api_book_fts_insert",
+]
+
+DROP_AUTHOR_RENAME_TRIGGER_SQL = "DROP TRIGGER IF EXISTS api_author_fts_rename"
+
+
+def run_sqlite(statements):
+    """
+    Return a RunPython callable executing `statements` on SQLite only.
+
+    The full-text indexes are SQLite-only; other backends use the LIKE
+    fallback of api.search.
+    """
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
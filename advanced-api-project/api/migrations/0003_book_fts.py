@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from api.migration_utils import (
+    BOOK_FTS_AUTHOR_JOIN_TRIGGERS_SQL,
+    DROP_AUTHOR_RENAME_TRIGGER_SQL,
+    DROP_BOOK_FTS_TRIGGERS_SQL,
+    run_sqlite,
+)
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_book_fts USING fts5(
+        title, author_name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    *BOOK_FTS_AUTHOR_JOIN_TRIGGERS_SQL,
+    """
+    INSERT INTO api_book_fts(rowid, title, author_name)
+    SELECT b.id, b.title, a.name FROM api_book b JOIN api_author a ON a.id = b.author_id
+    """,
+]
+
+DROP_SQL = [
+    DROP_AUTHOR_RENAME_TRIGGER_SQL,
+    *DROP_BOOK_FTS_TRIGGERS_SQL,
+    "DROP TABLE IF EXISTS api_book_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_book_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
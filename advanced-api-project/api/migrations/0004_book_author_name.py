@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+from api.migration_utils import (
+    BOOK_FTS_AUTHOR_JOIN_TRIGGERS_SQL,
+    BOOK_FTS_TRIGGERS_SQL,
+    DROP_AUTHOR_RENAME_TRIGGER_SQL,
+    DROP_BOOK_FTS_TRIGGERS_SQL,
+    run_sqlite,
+)
+
+# SQLite rebuilds api_book to add the column, which drops its triggers and
+# breaks the author trigger that reads it: drop them all first, then recreate
+# them reading the new column. The index now mirrors the Book row exactly, so
+# the author rename trigger is no longer needed (the rename signal rewrites
+# Book.author_name, which fires the update trigger).
+DROP_TRIGGERS_SQL = [DROP_AUTHOR_RENAME_TRIGGER_SQL, *DROP_BOOK_FTS_TRIGGERS_SQL]
+
+
+def backfill_author_names(apps, schema_editor):
+    Author = apps.get_model('api', 'Author')
+    Book = apps.get_model('api', 'Book')
+    names = Author.objects.filter(pk=OuterRef('author_id')).values('name')[:1]
+    Book.objects.using(schema_editor.connection.alias).update(author_name=Subquery(names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_book_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(DROP_TRIGGERS_SQL), run_sqlite(BOOK_FTS_AUTHOR_JOIN_TRIGGERS_SQL)),
+        migrations.AddField(
+            model_name='book',
+            name='author_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_author_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author_name', 'id'], name='book_author_name_id_idx'),
+        ),
+        migrations.RunPython(run_sqlite(BOOK_FTS_TRIGGERS_SQL), run_sqlite(DROP_TRIGGERS_SQL)),
+    ]
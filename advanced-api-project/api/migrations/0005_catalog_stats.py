@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Book = apps.get_model('api', 'Book')
+    YearStats = apps.get_model('api', 'YearStats')
+    AuthorStats = apps.get_model('api', 'AuthorStats')
+    books = Book.objects.using(schema_editor.connection.alias).order_by()
+    YearStats.objects.using(schema_editor.connection.alias).bulk_create([
+        YearStats(publication_year=year, book_count=count)
+        for year, count in books.values_list('publication_year').annotate(Count('pk'))
+    ])
+    AuthorStats.objects.using(schema_editor.connection.alias).bulk_create([
+        AuthorStats(author_id=author_id, book_count=count)
+        for author_id, count in books.values_list('author_id').annotate(Count('pk'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_book_author_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearStats',
+            fields=[
+                ('publication_year', models.IntegerField(primary_key=True, serialize=False)),
+                ('book_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.author')),
+                ('book_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['book_count', 'author'], name='authorstats_count_idx')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
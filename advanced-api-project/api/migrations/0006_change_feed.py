@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:08
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+from api.migration_utils import BOOK_FTS_TRIGGERS_SQL, DROP_BOOK_FTS_TRIGGERS_SQL, run_sqlite
+
+
+def number_existing_rows(apps, schema_editor):
+    # Authors take 1..max(author id) and books follow, so a first sync returns every row once
+    using = schema_editor.connection.alias
+    Author = apps.get_model('api', 'Author')
+    Book = apps.get_model('api', 'Book')
+    ChangeSequence = apps.get_model('api', 'ChangeSequence')
+    authors_end = Author.objects.using(using).aggregate(end=Max('pk'))['end'] or 0
+    books_end = Book.objects.using(using).aggregate(end=Max('pk'))['end'] or 0
+    Author.objects.using(using).update(change_seq=F('pk'))
+    Book.objects.using(using).update(change_seq=F('pk') + authors_end)
+    ChangeSequence.objects.using(using).create(name='catalog', value=authors_end + books_end)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_catalog_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('book', 'Book'), ('author', 'Author')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        # SQLite rebuilds api_book to add the column, which drops the full-text
+        # index triggers of 0004: drop them first and create them again afterwards
+        migrations.RunPython(run_sqlite(DROP_BOOK_FTS_TRIGGERS_SQL), run_sqlite(BOOK_FTS_TRIGGERS_SQL)),
+        migrations.AddField(
+            model_name='book',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(run_sqlite(BOOK_FTS_TRIGGERS_SQL), run_sqlite(DROP_BOOK_FTS_TRIGGERS_SQL)),
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+    ]
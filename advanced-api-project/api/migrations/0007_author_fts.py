@@ -0,0 +1,49 @@
+from django.db import migrations
+
+from api.migration_utils import run_sqlite
+
+# Author names get their own FTS5 table so /api/authors/?search= does not scan
+# api_author with LIKE. A later migration that makes SQLite rebuild api_author
+# drops these triggers and must create them again (see 0006).
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_author_fts USING fts5(
+        name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_author_fts_insert AFTER INSERT ON api_author BEGIN
+        INSERT INTO api_author_fts(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_author_fts_update AFTER UPDATE OF name ON api_author BEGIN
+        DELETE FROM api_author_fts WHERE rowid = old.id;
+        INSERT INTO api_author_fts(rowid, name) VALUES (new.id, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_author_fts_delete AFTER DELETE ON api_author BEGIN
+        DELETE FROM api_author_fts WHERE rowid = old.id;
+    END
+    """,
+    "INSERT INTO api_author_fts(rowid, name) SELECT id, name FROM api_author",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS api_author_fts_delete",
+    "DROP TRIGGER IF EXISTS api_author_fts_update",
+    "DROP TRIGGER IF EXISTS api_author_fts_insert",
+    "DROP TABLE IF EXISTS api_author_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_change_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -1,15 +1,153 @@
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, connections, models, router, transaction
 class Author(models.Model):
     name = models.CharField(max_length=100)
+    # Position in the catalog change sequence (ChangeSequence), renewed by every save
+    change_seq = models.BigIntegerField(default=0, editable=False, db_index=True)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            stamp_changes([self], using=using)
+            if kwargs.get('update_fields'):
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+
 class Book(models.Model):
     title = models.CharField(max_length=200)
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE)
+    # Copy of author.name so filtering, searching and ordering by author need no join.
+    # Kept in sync by save(), the Author rename signal and `manage.py sync_author_names`.
+    author_name = models.CharField(max_length=100, editable=False, default='')
+    # Position in the catalog change sequence (ChangeSequence), renewed by every save
+    change_seq = models.BigIntegerField(default=0, editable=False, db_index=True)
+
+    class Meta:
+        # Composite indexes backing keyset pagination for each ordering option
+        indexes = [
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            models.Index(fields=['publication_year', 'id'], name='book_year_id_idx'),
+            models.Index(fields=['author_name', 'id'], name='book_author_name_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.publication_year})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Counted as (author, year) in the stats tables; saving compares against this
+        if 'author_id' in field_names and 'publication_year' in field_names:
+            instance._stats_key = (instance.author_id, instance.publication_year)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Skip the author lookup when a loaded row keeps its author: renames are synced by signal
+        loaded_author_id = getattr(self, '_stats_key', (None,))[0]
+        if self.author_id is not None and (
+            loaded_author_id != self.author_id or Book.author.is_cached(self)
+        ):
+            self.author_name = self.author.name
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'author' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'author_name'}
+        # The stats receivers in api/signals.py write in the same transaction as the row
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            stamp_changes([self], using=using)
+            if kwargs.get('update_fields'):
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+            super().save(*args, **kwargs)
+
+
+# YearStats: number of books per publication year, maintained incrementally (api/stats.py)
+class YearStats(models.Model):
+    publication_year = models.IntegerField(primary_key=True)
+    book_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.publication_year}: {self.book_count}"
+
+
+# AuthorStats: number of books per author, maintained incrementally (api/stats.py)
+class AuthorStats(models.Model):
+    author = models.OneToOneField(Author, primary_key=True, related_name='stats', on_delete=models.CASCADE)
+    book_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Backs the most-prolific-first ordering of /api/stats/authors/
+        indexes = [models.Index(fields=['book_count', 'author'], name='authorstats_count_idx')]
+
+    def __str__(self):
+        return f"{self.author_id}: {self.book_count}"
+
+
+# ChangeSequence: named counters; 'catalog' numbers every Book/Author write for the sync feed (api/sync.py)
+class ChangeSequence(models.Model):
+    CATALOG = 'catalog'
+    # Highest change_seq of the tombstones removed by prune_tombstones
+    PRUNED = 'pruned_tombstones'
+
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def allocate(cls, count=1, using=DEFAULT_DB_ALIAS):
+        """
+        Reserve `count` consecutive catalog values with one UPDATE and return them
+        as a range. Call it inside the transaction that writes the rows: the
+        UPDATE locks the counter until that transaction commits, so values are
+        handed out in commit order.
+        """
+        table = connections[using].ops.quote_name(cls._meta.db_table)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"UPDATE {table} SET value = value + %s WHERE name = %s RETURNING value",
+                           [count, cls.CATALOG])
+            row = cursor.fetchone()
+        if row is None:
+            cls.objects.using(using).bulk_create([cls(name=cls.CATALOG)], ignore_conflicts=True)
+            return cls.allocate(count, using)
+        return range(row[0] - count + 1, row[0] + 1)
+
+
+def stamp_changes(objs, using=DEFAULT_DB_ALIAS):
+    """Give each of `objs` (Books or Authors about to be written) the next change_seq."""
+    objs = list(objs)
+    if not objs:
+        return objs
+    for obj, seq in zip(objs, ChangeSequence.allocate(len(objs), using)):
+        obj.change_seq = seq
+    return objs
+
+
+# Tombstone: a deleted Book or Author, kept for the sync feed until prune_tombstones removes it
+class Tombstone(models.Model):
+    BOOK = 'book'
+    AUTHOR = 'author'
+    KINDS = [(BOOK, 'Book'), (AUTHOR, 'Author')]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.change_seq}"
+
+
+# ImportCheckpoint: records of a file already imported by import_books, saved in each batch transaction
+class ImportCheckpoint(models.Model):
+    # --checkpoint, or the absolute path of the imported file
+    name = models.CharField(max_length=500, primary_key=True)
+    source = models.CharField(max_length=500)
+    records = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.records} records"
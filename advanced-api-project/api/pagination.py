@@ -0,0 +1,245 @@
+import base64
+import hashlib
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from perfkit.counting import (
+    AUTO, EXACT, HAS_MORE, ListCount, count_queryset, get_strategy, get_threshold,
+)
+
+from .caching import cacheable, get_cache, normalized_query
+
+
+# KeysetPagination: opt-in cursor pagination that seeks on (ordering..., pk)
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the active ordering plus a pk tie-breaker.
+
+    Each cursor stores the ordering values of the row at the page boundary,
+    so the next page is fetched with an indexed range query instead of an
+    OFFSET scan. Rows inserted while a client is paging never shift the
+    pages it has not read yet.
+
+    Pagination is only applied when the client sends `cursor` or `page_size`;
+    otherwise the full list is returned as before.
+
+    Pages carry no count unless the view sets `count_strategy` (see
+    perfkit/counting.py); then they gain "count" and
+    "count_type" ('exact', 'estimated' or 'more_than'), counted by the view's
+    `get_list_count()` when it has one.
+
+    Example usage:
+    - /api/books/?page_size=50
+    - /api/books/?ordering=-publication_year&page_size=50
+    """
+    page_size = 50
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    count_strategy = HAS_MORE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        rows = self.set_page(list(page_queryset))
+        self.count = self.get_count()
+        return rows
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the unevaluated queryset for the requested page (one extra row
+        to detect more pages), or None when pagination was not requested.
+        Async views evaluate it themselves, pass the rows to `set_page()` and
+        set `count` from `get_count()`.
+        """
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.view = view
+        self.count = None
+        # The whole filtered list, for counting
+        self.count_queryset = queryset
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['d'] == 'p'
+        self.has_cursor = cursor is not None
+        if cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(cursor['v'], self.reverse))
+
+        ordering = [self.invert(field) for field in self.ordering] if self.reverse else self.ordering
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.has_more = has_more
+        self.page = rows
+        return rows
+
+    def get_count(self):
+        """ListCount of the whole list with the view's `count_strategy`, or None."""
+        strategy = get_strategy(getattr(self.view, 'count_strategy', self.count_strategy))
+        if strategy == HAS_MORE:
+            return None
+        if not self.has_cursor and not self.has_more:
+            # The first page is the whole list
+            return ListCount(len(self.page), EXACT)
+        get_list_count = getattr(self.view, 'get_list_count', None)
+        if get_list_count is not None:
+            return get_list_count(self.count_queryset, strategy)
+        return count_queryset(self.count_queryset, strategy)
+
+    def get_paginated_response(self, data):
+        counted = {'count': self.count.value, 'count_type': self.count.type} if self.count else {}
+        return Response({
+            **counted,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Return the queryset ordering with a trailing pk tie-breaker, so every
+        position in the list is unique.
+        """
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(queryset.model._meta.ordering)
+        pk_name = queryset.model._meta.pk.name
+        if not ordering or ordering[-1].lstrip('-') not in ('pk', pk_name):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(('-' if descending else '') + pk_name)
+        return ordering
+
+    def get_seek_filter(self, values, reverse):
+        """
+        Build `(f1, f2, ..., pk) > (v1, v2, ..., vpk)` as nested Q objects.
+
+        The leading `f1 >= v1` term is redundant but lets the database seek
+        straight into the composite index.
+        """
+        seek = Q()
+        for index, (field, value) in enumerate(zip(self.ordering, values)):
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            term = Q(**{f'{field.lstrip("-")}__{lookup}': value})
+            for prev_field, prev_value in zip(self.ordering[:index], values[:index]):
+                term &= Q(**{prev_field.lstrip('-'): prev_value})
+            seek |= term
+
+        first_field = self.ordering[0]
+        lookup = 'lte' if first_field.startswith('-') != reverse else 'gte'
+        return Q(**{f'{first_field.lstrip("-")}__{lookup}': values[0]}) & seek
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], 'n')
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], 'p')
+
+    def encode_cursor(self, obj, direction):
+        position = {
+            'o': self.ordering,
+            'v': [self.get_position_value(obj, field) for field in self.ordering],
+            'd': direction,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+        url = replace_query_param(self.base_url, self.cursor_query_param, token)
+        return replace_query_param(url, self.page_size_query_param, self.page_size)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode()))
+            valid = (
+                cursor['o'] == self.ordering
+                and cursor['d'] in ('n', 'p')
+                and len(cursor['v']) == len(self.ordering)
+            )
+        except (TypeError, ValueError, KeyError):
+            valid = False
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    @staticmethod
+    def get_position_value(obj, field):
+        value = obj
+        for attr in field.lstrip('-').split('__'):
+            value = value[attr] if isinstance(value, dict) else getattr(value, attr)
+        return value
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+
+# CountedListMixin: counts for the pages of a list view, cached per filtered set
+class CountedListMixin:
+    """
+    Features:
+    - `count_strategy` sets how KeysetPagination counts this view's list
+      ('auto' by default: exact up to COUNT_EXACT_THRESHOLD rows, estimated above).
+    - `estimate_count(queryset)` returns a maintained count of the filtered set, or None.
+    - Counts are cached under the view's generation counters and keyed on the
+      filters only, so paging or reordering does not count again.
+
+    Example usage:
+    - /api/books/?page_size=50 -> {"count": 48213, "count_type": "estimated", "next": ..., ...}
+    """
+    count_strategy = AUTO
+    # Parameters that change the page or its rendering but not the set being counted
+    count_ignored_params = ('cursor', 'page_size', 'ordering', 'fields', 'expand',
+                            'facets', 'facet_size', 'format', 'layout')
+
+    def estimate_count(self, queryset):
+        return None
+
+    def get_list_count(self, queryset, strategy):
+        cache = get_cache()
+        key = self.get_count_cache_key(strategy)
+        count = cache.get(key)
+        if count is None:
+            count = count_queryset(queryset, strategy, self.estimate_count)
+            if cacheable():
+                cache.set(key, count, self.get_cache_timeout())
+        return count
+
+    def get_count_cache_key(self, strategy):
+        versions = '.'.join(str(version) for version in self.get_versions())
+        query = normalized_query(self.request, exclude=self.count_ignored_params)
+        digest = hashlib.md5(f"{strategy}:{get_threshold()}|{query}".encode()).hexdigest()
+        return f"api:count:{type(self).__name__}:{versions}:{digest}"
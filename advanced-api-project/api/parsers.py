@@ -0,0 +1,46 @@
+"""
+Request parsers registered in REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].
+
+FastJSONParser reads `application/json` bodies with orjson when it is
+installed, straight from the request bytes without decoding them to a str
+first. Without orjson, or for bodies in a charset other than UTF-8, it is
+DRF's JSONParser.
+
+MessagePackParser reads `application/msgpack` bodies; with
+`Content-Type: application/msgpack; layout=table` a {"columns", "rows"}
+table is turned back into a list of objects (for the bulk endpoint).
+"""
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import FastJSONRenderer, MessagePackRenderer, from_table, msgpack, orjson
+
+
+# FastJSONParser: orjson-backed drop-in for JSONParser
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+# MessagePackParser: request bodies sent as application/msgpack
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            data = msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            # msgpack raises several unrelated exception types for malformed input
+            raise ParseError(f'MessagePack parse error - {exc}')
+        _, params = parse_header_parameters(media_type or '')
+        return from_table(data) if params.get('layout') == 'table' else data
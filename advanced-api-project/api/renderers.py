@@ -0,0 +1,131 @@
+"""
+Response renderers registered in REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].
+
+FastJSONRenderer serves `application/json` with orjson when it is installed:
+the whole response is encoded in C straight to bytes. Strings, integers and
+UUIDs are encoded natively; datetimes, dates and times are passed through to
+DRF's encoder, as are the types orjson does not know (Decimal, lazy
+translation strings, querysets, ...), so they come out as JSONRenderer writes
+them. Without orjson, or for data orjson cannot encode identically
+(`; indent=` other than 2, integers over 64 bits, non-string dict keys), it is
+DRF's JSONRenderer.
+
+Floats are the exception: orjson writes 1e16 where JSONRenderer writes
+1e+16, and NaN/Infinity as null where JSONRenderer raises (STRICT_JSON). The
+API's serializers produce no floats; a view that renders them should return
+plain JSONRenderer output if clients compare bytes.
+
+MessagePackRenderer serves `application/msgpack` (`?format=msgpack`) for
+internal consumers when msgpack is installed. List payloads can be sent as a
+table, one header row of field names and one array per item, with
+`Accept: application/msgpack; layout=table` or `?layout=table`.
+"""
+from operator import itemgetter
+
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+if orjson is not None:
+    # Datetimes go to _encoder.default; non-string keys raise and fall back
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME
+
+_encoder = JSONEncoder()
+
+
+# FastJSONRenderer: orjson-backed drop-in for JSONRenderer
+class FastJSONRenderer(JSONRenderer):
+    """
+    Features:
+    - Same media type, format suffix (`.json`/`?format=json`) and output as JSONRenderer,
+      floats aside (see the module docstring).
+    - Compact output only; `Accept: application/json; indent=2` is indented by orjson,
+      any other indent by the stdlib encoder.
+
+    Example usage:
+    - REST_FRAMEWORK = {'DEFAULT_RENDERER_CLASSES': ['api.renderers.FastJSONRenderer', ...]}
+    - FastJSONRenderer().render(BookSerializer(books, many=True).data)
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+        option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. an int over 64 bits, a non-string key, or a default() result orjson cannot take either
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer does, so the output is also valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def to_table(items):
+    """[{...}, ...] -> {"columns": [...], "rows": [[...], ...]} when every item has the same fields."""
+    if not items or not all(isinstance(item, dict) for item in items):
+        return items
+    fields = items[0].keys()
+    if any(item.keys() != fields for item in items):
+        return items
+    columns = list(fields)
+    row = itemgetter(*columns) if len(columns) > 1 else lambda item: (item[columns[0]],)
+    return {'columns': columns, 'rows': [row(item) for item in items]}
+
+
+def from_table(data):
+    """Inverse of to_table(); anything else is returned unchanged."""
+    if isinstance(data, dict) and data.keys() == {'columns', 'rows'}:
+        return [dict(zip(data['columns'], row)) for row in data['rows']]
+    return data
+
+
+def requested_layout(accepted_media_type, renderer_context):
+    _, params = parse_header_parameters(accepted_media_type or '')
+    request = (renderer_context or {}).get('request')
+    if 'layout' not in params and request is not None:
+        return getattr(request, 'query_params', {}).get('layout')
+    return params.get('layout')
+
+
+# MessagePackRenderer: compact binary responses for internal consumers
+class MessagePackRenderer(BaseRenderer):
+    """
+    Features:
+    - Values are encoded as in the JSON output: dates, times and UUIDs go through DRF's encoder.
+    - `layout=table` turns the list (or the "results" of a page) into
+      {"columns": [...], "rows": [[...], ...]}, so field names are sent once.
+
+    Example usage:
+    - curl -H 'Accept: application/msgpack' /api/books/
+    - curl -H 'Accept: application/msgpack; layout=table' '/api/books/?page_size=1000'
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if requested_layout(accepted_media_type, renderer_context) == 'table':
+            if isinstance(data, list):
+                data = to_table(data)
+            elif isinstance(data, dict) and isinstance(data.get('results'), list):
+                data = {**data, 'results': to_table(data['results'])}
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
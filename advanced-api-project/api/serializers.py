@@ -1,26 +1,133 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
-from .models import Author, Book
+from .fieldsets import SparseFieldsSerializerMixin
+from .models import Author, AuthorStats, Book, YearStats, stamp_changes
+from .stats import apply_book_changes
 import datetime
 
-# BookSerializer: Serializes all fields of the Book model
-class BookSerializer(serializers.ModelSerializer):
+
+# PrefetchedPrimaryKeyRelatedField: resolves pks from a map preloaded for the whole batch
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks the pk up in `context[context_key]` (a dict from `in_bulk()`) when the
+    list serializer has preloaded it, instead of one query per item.
+    """
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        objects = self.context.get(self.context_key)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail('does_not_exist', pk_value=data)
+        return objects[pk]
+
+
+# BookListSerializer: many=True validation and writes for batches of books
+class BookListSerializer(serializers.ListSerializer):
+    """
+    Used whenever BookSerializer is instantiated with many=True.
+
+    - Authors referenced by the batch are loaded with a single query.
+    - The current year for `validate_publication_year` is computed once.
+    - create()/update() write with bulk_create()/bulk_update(), numbering the
+      books in the catalog change sequence with one query.
+    """
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            author_ids = {item.get('author') for item in data if isinstance(item, dict)}
+            author_ids = [pk for pk in author_ids if isinstance(pk, (int, str)) and str(pk).isdigit()]
+            self.context['authors'] = Author.objects.in_bulk(author_ids)
+        self.context['current_year'] = datetime.datetime.now().year
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        # bulk_create() skips Book.save(), so fill the denormalized author_name here
+        books = [Book(**attrs, author_name=attrs['author'].name) for attrs in validated_data]
+        with transaction.atomic(savepoint=False):
+            books = Book.objects.bulk_create(stamp_changes(books), batch_size=self.batch_size)
+            apply_book_changes(added=[(book.author_id, book.publication_year) for book in books])
+        return books
+
+    def update(self, instances, validated_data):
+        fields = set()
+        removed = [(book.author_id, book.publication_year) for book in instances]
+        for book, attrs in zip(instances, validated_data):
+            for field, value in attrs.items():
+                setattr(book, field, value)
+            fields.update(attrs)
+            if 'author' in attrs:
+                book.author_name = book.author.name
+                fields.add('author_name')
+        if fields:
+            with transaction.atomic(savepoint=False):
+                stamp_changes(instances)
+                Book.objects.bulk_update(instances, sorted(fields | {'change_seq'}), batch_size=self.batch_size)
+                for book in instances:
+                    book._stats_key = (book.author_id, book.publication_year)
+                apply_book_changes(added=[book._stats_key for book in instances], removed=removed)
+        return instances
+
+
+# AuthorSummarySerializer: compact author representation used by ?expand=author
+class AuthorSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Author
+        fields = ['id', 'name']
+
+
+# BookSerializer: Serializes the fields of the Book model (author_name is internal)
+# Supports sparse fieldsets (?fields=id,title) and ?expand=author
+class BookSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    author = PrefetchedPrimaryKeyRelatedField('authors', queryset=Author.objects.all())
+
     class Meta:
         model = Book
-        fields = '__all__'
+        fields = ['id', 'title', 'publication_year', 'author']
+        list_serializer_class = BookListSerializer
+        expandable_fields = {'author': AuthorSummarySerializer}
 
     # Custom validation to ensure publication_year is not in the future
     def validate_publication_year(self, value):
-        current_year = datetime.datetime.now().year
+        current_year = self.context.get('current_year') or datetime.datetime.now().year
         if value > current_year:
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
 
-# AuthorSerializer: Includes name and nested books
-class AuthorSerializer(serializers.ModelSerializer):
+# AuthorSerializer: Includes name, book count and nested books
+class AuthorSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     # Nested BookSerializer to show all books by the author
     books = BookSerializer(many=True, read_only=True)
+    # Filled in by the Count('books') annotation of the author views
+    books_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Author
-        fields = ['name', 'books']
-i
+        fields = ['id', 'name', 'books_count', 'books']
+
+
+# YearStatsSerializer: books per publication year from the YearStats table
+class YearStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = YearStats
+        fields = ['publication_year', 'book_count']
+
+
+# AuthorStatsSerializer: books per author from the AuthorStats table
+class AuthorStatsSerializer(serializers.ModelSerializer):
+    author_name = serializers.CharField(source='author.name', read_only=True)
+
+    class Meta:
+        model = AuthorStats
+        fields = ['author', 'author_name', 'book_count']
@@ -0,0 +1,124 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_generation
+from .models import Author, Book, Tombstone
+from .stats import apply_book_changes, signals_deferred
+from .suggest import get_suggest_index
+from .sync import record_deletions
+
+
+# 🔄 Any ORM write to Book/Author invalidates the cached API responses once it
+# commits: bumped earlier, a concurrent reader could cache the old row under the
+# new generation
+def invalidate_on_commit(*names, using):
+    transaction.on_commit(partial(bump_generation, *names), using=using)
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_book_responses(sender, instance, using, **kwargs):
+    invalidate_on_commit('book', f'book:{instance.pk}', using=using)
+
+
+@receiver([post_save, post_delete], sender=Author)
+def invalidate_author_responses(sender, using, **kwargs):
+    invalidate_on_commit('author', using=using)
+
+
+# ✏️ Renaming an author rewrites Book.author_name with a single UPDATE
+@receiver(post_save, sender=Author)
+def sync_book_author_names(sender, instance, created, using, **kwargs):
+    if created:
+        return
+    renamed = (
+        Book.objects.using(using).filter(author=instance).exclude(author_name=instance.name)
+        .update(author_name=instance.name)
+    )
+    if renamed:
+        invalidate_on_commit('book', using=using)
+
+
+# 📊 Keep YearStats/AuthorStats in step with single-row saves and deletes
+@receiver(pre_save, sender=Book)
+def remember_book_stats_key(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._stats_old = None
+    elif hasattr(instance, '_stats_key'):
+        instance._stats_old = instance._stats_key
+    else:
+        # Instances built by hand (not loaded from the database) look the stored row up
+        instance._stats_old = (
+            Book.objects.using(kwargs['using']).filter(pk=instance.pk)
+            .values_list('author_id', 'publication_year').first()
+        )
+
+
+@receiver(post_save, sender=Book)
+def update_stats_on_save(sender, instance, using, update_fields, **kwargs):
+    old, new = instance._stats_old, (instance.author_id, instance.publication_year)
+    if old and update_fields is not None:
+        # Fields left out of update_fields keep their stored value
+        new = (
+            new[0] if {'author', 'author_id'} & set(update_fields) else old[0],
+            new[1] if 'publication_year' in update_fields else old[1],
+        )
+    if old != new:
+        apply_book_changes(added=[new], removed=[old] if old else [], using=using)
+    instance._stats_key = new
+
+
+@receiver(post_delete, sender=Book)
+def update_stats_on_delete(sender, instance, using, **kwargs):
+    if not signals_deferred():
+        apply_book_changes(removed=[(instance.author_id, instance.publication_year)], using=using)
+
+
+# 🔤 Keep this process's autocomplete index (api/suggest.py) current once the write commits
+def update_suggest_index(kind, pk, text, using):
+    def apply():
+        index = get_suggest_index(build=False)
+        if index is None:
+            return
+        if text is None:
+            index.remove(kind, pk)
+        else:
+            index.add(kind, pk, text)
+    transaction.on_commit(apply, using=using)
+
+
+@receiver(post_save, sender=Book)
+def index_book_title(sender, instance, using, update_fields, **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        update_suggest_index('b', instance.pk, instance.title, using)
+
+
+@receiver(post_save, sender=Author)
+def index_author_name(sender, instance, using, update_fields, **kwargs):
+    if update_fields is None or 'name' in update_fields:
+        update_suggest_index('a', instance.pk, instance.name, using)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, using, **kwargs):
+    update_suggest_index('b', instance.pk, None, using)
+
+
+@receiver(post_delete, sender=Author)
+def unindex_author(sender, instance, using, **kwargs):
+    update_suggest_index('a', instance.pk, None, using)
+
+
+# 🪦 Deletes leave a tombstone for the sync feed (api/sync.py), in the deleting transaction
+@receiver(post_delete, sender=Book)
+def record_book_deletion(sender, instance, using, **kwargs):
+    # BookBulkView records its whole batch itself
+    if not signals_deferred():
+        record_deletions(Tombstone.BOOK, [instance.pk], using)
+
+
+@receiver(post_delete, sender=Author)
+def record_author_deletion(sender, instance, using, **kwargs):
+    record_deletions(Tombstone.AUTHOR, [instance.pk], using)
@@ -0,0 +1,150 @@
+"""
+Incrementally maintained catalog statistics.
+
+YearStats and AuthorStats hold the number of books per publication year and
+per author, so reports read a handful of rows instead of running GROUP BY
+over api_book. Every write path applies (author_id, publication_year) deltas
+in the same transaction as the books it changes:
+
+- Book.save() / delete(): receivers in api/signals.py
+- bulk create/update (BookListSerializer), bulk delete (BookBulkView) and
+  import_books: `apply_book_changes()` with the whole batch
+
+`rebuild_stats` recomputes both tables from live aggregates; `--check` only
+compares them. Large pages of /api/books/ take their estimated counts from
+them (`estimate_book_count()`).
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Book, YearStats
+from .writequeue import immediate_transaction
+
+# Keys per statement, below SQLite's bound-parameter limit (3 parameters per key)
+CHUNK_SIZE = 300
+
+_signals_deferred = ContextVar('stats_signals_deferred', default=False)
+
+
+@contextmanager
+def deferred_signals():
+    """Skip the per-row delete receiver while a bulk path applies grouped deltas itself."""
+    token = _signals_deferred.set(True)
+    try:
+        yield
+    finally:
+        _signals_deferred.reset(token)
+
+
+def signals_deferred():
+    return _signals_deferred.get()
+
+
+def apply_book_changes(added=(), removed=(), using=DEFAULT_DB_ALIAS):
+    """Count books added/removed, each given as an (author_id, publication_year) pair."""
+    years, authors = Counter(), Counter()
+    for sign, keys in ((1, added), (-1, removed)):
+        for author_id, year in keys:
+            authors[author_id] += sign
+            years[year] += sign
+    # Callers already run in the transaction that writes the books
+    with transaction.atomic(using=using, savepoint=False):
+        apply_deltas(YearStats, years, using)
+        apply_deltas(AuthorStats, authors, using)
+
+
+def counted(delta):
+    # Clamped at zero: rows written without stats (raw SQL, a missed path) must not
+    # make a delete fail; `rebuild_stats --check` reports the drift instead
+    return Greatest(ExpressionWrapper(F('book_count') + delta, output_field=IntegerField()), Value(0))
+
+
+def apply_deltas(model, deltas, using=DEFAULT_DB_ALIAS):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    manager = model._default_manager.using(using)
+    if len(deltas) == 1:
+        # Single-row writes: one UPDATE when the row exists (the common case)
+        (key, delta), = deltas.items()
+        if manager.filter(pk=key).update(book_count=counted(delta)) or delta < 0:
+            return
+    keys = list(deltas)
+    for start in range(0, len(keys), CHUNK_SIZE):
+        chunk = keys[start:start + CHUNK_SIZE]
+        # Only additions create rows: a missing row on removal was already deleted
+        # with its author (the AuthorStats cascade runs before the books' signals)
+        manager.bulk_create(
+            [model(pk=key, book_count=0) for key in chunk if deltas[key] > 0], ignore_conflicts=True,
+        )
+        manager.filter(pk__in=chunk).update(book_count=Case(
+            *(When(pk=key, then=counted(deltas[key])) for key in chunk),
+            default=F('book_count'),
+            output_field=IntegerField(),
+        ))
+
+
+def live_counts(using=DEFAULT_DB_ALIAS):
+    """(books per year, books per author) aggregated from api_book."""
+    books = Book.objects.using(using).order_by()
+    years = dict(books.values_list('publication_year').annotate(count=Count('pk')))
+    authors = dict(books.values_list('author_id').annotate(count=Count('pk')))
+    return years, authors
+
+
+def stored_counts(using=DEFAULT_DB_ALIAS):
+    years = dict(YearStats.objects.using(using).filter(book_count__gt=0).values_list('pk', 'book_count'))
+    authors = dict(AuthorStats.objects.using(using).filter(book_count__gt=0).values_list('pk', 'book_count'))
+    return years, authors
+
+
+def estimate_book_count(year=None, author_name=None, using=DEFAULT_DB_ALIAS):
+    """
+    Books of `year` or by authors named `author_name` (or all books) read
+    from the stats tables, with one query; None for both filters at once,
+    which the tables do not count.
+    """
+    if year is not None and author_name is not None:
+        return None
+    if year is not None:
+        return YearStats.objects.using(using).filter(pk=year).values_list('book_count', flat=True).first() or 0
+    if author_name is not None:
+        stats = AuthorStats.objects.using(using).filter(author__name=author_name)
+    else:
+        stats = YearStats.objects.using(using)
+    return stats.aggregate(total=Sum('book_count'))['total'] or 0
+
+
+def diff_counts(using=DEFAULT_DB_ALIAS):
+    """List of (table, key, stored, live) rows that disagree."""
+    differences = []
+    for table, stored, live in zip(('year', 'author'), stored_counts(using), live_counts(using)):
+        for key in sorted(stored.keys() | live.keys()):
+            if stored.get(key, 0) != live.get(key, 0):
+                differences.append((table, key, stored.get(key, 0), live.get(key, 0)))
+    return differences
+
+
+def rebuild_stats(using=DEFAULT_DB_ALIAS):
+    """Replace both tables with live aggregates; returns (years, authors) row counts."""
+    # Count and replace under the write lock: a book written in between would
+    # otherwise be counted twice (in the aggregate and by its own delta) or not at all
+    with immediate_transaction(using):
+        if connections[using].vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {Book._meta.db_table} IN SHARE MODE')
+        years, authors = live_counts(using)
+        YearStats.objects.using(using).all().delete()
+        AuthorStats.objects.using(using).all().delete()
+        YearStats.objects.using(using).bulk_create(
+            [YearStats(publication_year=year, book_count=count) for year, count in years.items()],
+            batch_size=CHUNK_SIZE,
+        )
+        AuthorStats.objects.using(using).bulk_create(
+            [AuthorStats(author_id=author_id, book_count=count) for author_id, count in authors.items()],
+            batch_size=CHUNK_SIZE,
+        )
+    return len(years), len(authors)
@@ -0,0 +1,209 @@
+"""
+In-memory prefix index for title/author autocomplete (`/api/books/suggest/?q=`).
+
+Every process keeps a SuggestIndex of normalized book titles and author names
+(lowercase, accents and punctuation removed). Each text is stored under sorted
+keys, so a lookup is a binary search (bisect) plus a short scan:
+
+- the whole text ("things fall apart"), searched first;
+- the text from each later word on ("fall apart", "apart"), so "apa" also
+  finds "Things Fall Apart".
+
+Whole-text keys keep their first KEY_LENGTH characters, later-word keys their
+first TAIL_LENGTH (they are most of the keys, so most of the memory). The
+index is built on the first lookup, updated after commit by the Book/Author
+save and delete receivers in api/signals.py, and rebuilt in a background
+thread every SUGGEST_REBUILD_INTERVAL seconds; the rebuild picks up writes the
+receivers do not see (bulk paths, other processes).
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connections
+
+# Characters kept per key; longer queries match on their first KEY_LENGTH characters
+KEY_LENGTH = 48
+TAIL_LENGTH = 24
+# Key layout: "<text>\0<kind><pk>"; \0 sorts below every character of a text
+SEPARATOR = '\0'
+KINDS = {'b': 'book', 'a': 'author'}
+
+
+def normalize(text):
+    """'Aké: The Years…' -> 'ake the years'."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    letters = ''.join(
+        char if char.isalnum() else ' ' for char in decomposed if not unicodedata.combining(char)
+    )
+    return ' '.join(letters.split())
+
+
+def index_keys(kind, pk, text):
+    """(head key, [later-word keys]) of one title or name."""
+    words = normalize(text).split()
+    suffix = f"{SEPARATOR}{kind}{pk}"
+    head = ' '.join(words)[:KEY_LENGTH] + suffix
+    tails = [' '.join(words[start:])[:TAIL_LENGTH] + suffix for start in range(1, len(words))]
+    return head, tails
+
+
+# SuggestIndex: sorted prefix keys of titles and author names, per process
+class SuggestIndex:
+    """
+    Features:
+    - `lookup(q, limit, kinds)`: whole-text prefix matches first, then word
+      prefix matches, alphabetical within each, without duplicates.
+    - `add()` / `remove()`: incremental updates; during a rebuild they are
+      replayed onto the new index before it replaces the old one.
+    - `stats()`: entry counts and build time.
+
+    Example usage:
+    - get_suggest_index().lookup("fall ap", limit=5)
+    - get_suggest_index().add('b', book.pk, book.title)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heads, self._tails, self._labels = [], [], {}
+        self._pending = None  # changes made while a rebuild is running
+        self.built_at = None
+        self.build_seconds = 0.0
+
+    # Loading
+    def build(self, books, authors):
+        """Replace the contents with (pk, title) books and (pk, name) authors."""
+        start = time.perf_counter()
+        heads, tails, labels = [], [], {}
+        for kind, rows in (('b', books), ('a', authors)):
+            for pk, text in rows:
+                head, later = index_keys(kind, pk, text)
+                heads.append(head)
+                tails.extend(later)
+                labels[kind, pk] = text
+        heads.sort()
+        tails.sort()
+        with self._lock:
+            self._heads, self._tails, self._labels = heads, tails, labels
+            for change in self._pending or ():
+                self._apply(*change)
+            self._pending = None
+            self.built_at = time.monotonic()
+        self.build_seconds = time.perf_counter() - start
+
+    def build_from_database(self, using=None):
+        from .models import Author, Book
+
+        books = Book.objects.using(using).order_by().values_list('pk', 'title').iterator(chunk_size=10_000)
+        authors = Author.objects.using(using).order_by().values_list('pk', 'name').iterator(chunk_size=10_000)
+        self.build(books, authors)
+
+    def start_rebuild(self):
+        """Rebuild from the database in a background thread; False if one is running."""
+        with self._lock:
+            if self._pending is not None:
+                return False
+            self._pending = []
+
+        def rebuild():
+            try:
+                self.build_from_database()
+            finally:
+                with self._lock:
+                    self._pending = None
+                connections.close_all()
+
+        threading.Thread(target=rebuild, name='suggest-index-rebuild', daemon=True).start()
+        return True
+
+    def is_stale(self):
+        interval = getattr(settings, 'SUGGEST_REBUILD_INTERVAL', 300)
+        return bool(interval) and self.built_at is not None and time.monotonic() - self.built_at > interval
+
+    # Incremental updates
+    def add(self, kind, pk, text):
+        self._change(kind, pk, text)
+
+    def remove(self, kind, pk):
+        self._change(kind, pk, None)
+
+    def _change(self, kind, pk, text):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, pk, text))
+            self._apply(kind, pk, text)
+
+    def _apply(self, kind, pk, text):
+        old = self._labels.pop((kind, pk), None)
+        if old is not None:
+            head, tails = index_keys(kind, pk, old)
+            for keys, key in [(self._heads, head)] + [(self._tails, tail) for tail in tails]:
+                position = bisect_left(keys, key)
+                if position < len(keys) and keys[position] == key:
+                    del keys[position]
+        if text is not None:
+            head, tails = index_keys(kind, pk, text)
+            insort(self._heads, head)
+            for tail in tails:
+                insort(self._tails, tail)
+            self._labels[kind, pk] = text
+
+    # Reading
+    def lookup(self, query, limit=10, kinds=('b', 'a'), max_scan=None):
+        prefix = normalize(query)[:KEY_LENGTH]
+        if not prefix:
+            return []
+        max_scan = max_scan or limit * 20
+        results, seen = [], set()
+        with self._lock:
+            for keys, key_prefix in ((self._heads, prefix), (self._tails, prefix[:TAIL_LENGTH])):
+                # Queries longer than the keys are checked against the full text
+                truncated = len(key_prefix) < len(prefix)
+                position = bisect_left(keys, key_prefix)
+                end = min(len(keys), position + max_scan)
+                while position < end and len(results) < limit:
+                    key = keys[position]
+                    if not key.startswith(key_prefix):
+                        break
+                    position += 1
+                    tag = key[key.rindex(SEPARATOR) + 1:]
+                    kind, pk = tag[0], int(tag[1:])
+                    if kind in kinds and (kind, pk) not in seen and (
+                        not truncated or prefix in normalize(self._labels[kind, pk])
+                    ):
+                        seen.add((kind, pk))
+                        results.append({'type': KINDS[kind], 'id': pk, 'text': self._labels[kind, pk]})
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'texts': len(self._labels),
+                'keys': len(self._heads) + len(self._tails),
+                'build_seconds': round(self.build_seconds, 3),
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_suggest_index(build=True):
+    """This process's index; built on first use, refreshed in the background when stale."""
+    global _index
+    if _index is None and build:
+        with _index_lock:
+            if _index is None:
+                index = SuggestIndex()
+                index.build_from_database()
+                _index = index
+    elif _index is not None and _index.is_stale():
+        _index.start_rebuild()
+    return _index
+
+
+def reset_suggest_index():
+    """Drop this process's index; the next lookup builds a new one (tests)."""
+    global _index
+    _index = None
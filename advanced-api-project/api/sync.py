@@ -0,0 +1,120 @@
+"""
+Delta sync feed for replication clients: `/api/sync/?since=<token>`.
+
+Every write of a Book or Author stores the next value of the 'catalog'
+ChangeSequence in the row's change_seq. Every delete leaves a Tombstone with
+its own value. Single rows are stamped by Book.save()/Author.save() and the
+delete receivers in api/signals.py. The bulk paths (BookListSerializer,
+BookBulkView, import_books) allocate one block of values per batch.
+
+A client keeps the token of its last page and asks for everything above it:
+
+- books, authors and tombstones are each read with an index range scan of
+  at most `limit + 1` rows past the token, and merged by change_seq;
+- only values up to the sequence's committed value are read. Allocating
+  locks the counter (SQLite's write lock, a row lock on other databases)
+  until the writer commits, so every change at or below that value is
+  already visible and a page never steps over a change that commits later;
+- a row changed several times since the token appears once, as it is now.
+
+prune_tombstones deletes tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS.
+A token from before the pruned ones is answered with 410 Gone, and the client
+syncs again from scratch.
+"""
+import base64
+import heapq
+import json
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Author, Book, ChangeSequence, Tombstone, stamp_changes
+from .serializers import AuthorSummarySerializer, BookSerializer
+
+
+class SyncTokenExpired(Exception):
+    """The token is older than the oldest tombstone still kept."""
+
+
+def encode_token(seq):
+    return base64.urlsafe_b64encode(json.dumps({'s': seq}, separators=(',', ':')).encode()).decode()
+
+
+def decode_token(token):
+    """change_seq of a token from encode_token(); ValueError if it is not one."""
+    try:
+        seq = json.loads(base64.urlsafe_b64decode(token.encode()))['s']
+    except (TypeError, ValueError, KeyError):
+        raise ValueError(f"Invalid sync token {token!r}.")
+    if not isinstance(seq, int) or seq < 0:
+        raise ValueError(f"Invalid sync token {token!r}.")
+    return seq
+
+
+def record_deletions(kind, pks, using=DEFAULT_DB_ALIAS):
+    """Leave a tombstone for each deleted pk; call it in the deleting transaction."""
+    tombstones = stamp_changes((Tombstone(kind=kind, object_id=pk) for pk in pks), using=using)
+    Tombstone.objects.using(using).bulk_create(tombstones)
+
+
+def prune_tombstones(days=None, using=DEFAULT_DB_ALIAS):
+    """Delete tombstones older than `days` (SYNC_TOMBSTONE_RETENTION_DAYS); returns how many."""
+    if days is None:
+        days = getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=days)
+    tombstones = Tombstone.objects.using(using)
+    with transaction.atomic(using=using):
+        horizon = tombstones.filter(deleted_at__lt=cutoff).aggregate(horizon=Max('change_seq'))['horizon']
+        if horizon is None:
+            return 0
+        deleted, _ = tombstones.filter(change_seq__lte=horizon).delete()
+        ChangeSequence.objects.using(using).update_or_create(
+            name=ChangeSequence.PRUNED, defaults={'value': horizon},
+        )
+    return deleted
+
+
+def read_changes(since=0, limit=500, using=DEFAULT_DB_ALIAS):
+    """
+    Changes with a change_seq above `since`, oldest first:
+    ([{"type", "id", "seq", "deleted", ["data"]}, ...], token, has_more).
+    """
+    counters = dict(
+        ChangeSequence.objects.using(using)
+        .filter(name__in=[ChangeSequence.CATALOG, ChangeSequence.PRUNED])
+        .values_list('name', 'value')
+    )
+    head = counters.get(ChangeSequence.CATALOG, 0)
+    if since and since < counters.get(ChangeSequence.PRUNED, 0):
+        raise SyncTokenExpired
+
+    window = {'change_seq__gt': since, 'change_seq__lte': head}
+    books = list(Book.objects.using(using).filter(**window).order_by('change_seq')[:limit + 1])
+    authors = list(Author.objects.using(using).filter(**window).order_by('change_seq')[:limit + 1])
+    books = list(zip(books, BookSerializer(books, many=True).data))
+    authors = list(zip(authors, AuthorSummarySerializer(authors, many=True).data))
+    sources = [
+        [{'type': 'book', 'id': book.pk, 'seq': book.change_seq, 'deleted': False, 'data': data}
+         for book, data in books],
+        [{'type': 'author', 'id': author.pk, 'seq': author.change_seq, 'deleted': False, 'data': data}
+         for author, data in authors],
+    ]
+    # A full sync starts empty: there is nothing to delete yet
+    if since:
+        tombstones = Tombstone.objects.using(using).filter(**window).order_by('change_seq')[:limit + 1]
+        sources.append([
+            {'type': tombstone.kind, 'id': tombstone.object_id, 'seq': tombstone.change_seq, 'deleted': True}
+            for tombstone in tombstones
+        ])
+
+    changes = list(islice(heapq.merge(*sources, key=itemgetter('seq')), limit + 1))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    # Caught up: the next sync starts from the head, past the values of rows changed again since
+    token = changes[-1]['seq'] if has_more else head
+    return changes, encode_token(token), has_more
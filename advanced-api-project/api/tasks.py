@@ -0,0 +1,116 @@
+"""
+Catalog jobs run by the background workers (jobs app).
+
+Queue them with `POST /api/jobs/ {"task": "<name>", "kwargs": {...}}` or
+`jobs.queue.enqueue('<name>', {...})`, and run `python manage.py run_workers`.
+"""
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from jobs.registry import task
+
+from .caching import bump_generation
+from .filters import BookFilterSet
+from .models import Book
+from .stats import rebuild_stats as rebuild_stats_tables
+from .sync import prune_tombstones as prune_tombstone_rows
+
+
+def command_output(*args, **options):
+    """Run a management command and return what it printed."""
+    stdout = StringIO()
+    call_command(*args, stdout=stdout, **options)
+    return stdout.getvalue().strip()
+
+
+def import_path(path):
+    """`path` resolved against JOBS_IMPORT_DIR; ValueError for anything outside it."""
+    root = os.path.realpath(settings.JOBS_IMPORT_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Import files must be inside JOBS_IMPORT_DIR, not {path!r}.")
+    return resolved
+
+
+@task
+def import_books(job, path, batch_size=5000):
+    """Import a CSV/NDJSON dump from JOBS_IMPORT_DIR (`path` is relative to it)."""
+    path = import_path(path)
+    # The command checkpoints its progress in each transaction: a retried job resumes where the last attempt stopped.
+    # A run whose job was reclaimed rolls back its open transaction and stops
+    job.report_progress(0, message=f"Importing {os.path.basename(path)}")
+    return {'output': command_output('import_books', path, batch_size=batch_size, before_commit=job.check_owned)}
+
+
+@task
+def export_books(job, output='csv', **filters):
+    """
+    Write the books matching `filters` (the books list filters: title,
+    publication_year, author__name) to JOBS_EXPORT_DIR as CSV or NDJSON.
+    """
+    from .views import BookExportView
+
+    if output not in BookExportView.content_types:
+        raise ValueError(f"output must be one of: {', '.join(BookExportView.content_types)}.")
+    filterset = BookFilterSet(filters, queryset=Book.objects.all())
+    # The filterset ignores keys it does not declare, which would export the whole catalog
+    unknown = sorted(set(filters) - set(filterset.filters))
+    if unknown:
+        raise ValueError(
+            f"Unknown filter(s): {', '.join(unknown)}. Available filters: {', '.join(filterset.filters)}."
+        )
+    if not filterset.is_valid():
+        raise ValueError(f"Invalid filters: {dict(filterset.errors)}")
+    books = filterset.qs.order_by('pk')
+    total = books.count()
+
+    def counted(rows):
+        for done, row in enumerate(rows, 1):
+            if done % 1000 == 0:
+                job.report_progress(done, total, f"Exported {done} of {total} books")
+            yield row
+
+    os.makedirs(settings.JOBS_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.JOBS_EXPORT_DIR, f"books-{job.pk}-{timezone.now():%Y%m%d%H%M%S}.{output}")
+    view = BookExportView()
+    render = view.render_csv if output == 'csv' else view.render_ndjson
+    rows = books.values_list('id', 'title', 'publication_year', 'author_id', 'author_name')
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        for block in render(counted(rows.iterator(chunk_size=view.chunk_size))):
+            handle.write(block)
+    return {'path': path, 'rows': total}
+
+
+@task
+def rebuild_stats(job):
+    job.report_progress(0, message="Recomputing books per year and per author")
+    years, authors = rebuild_stats_tables()
+    # The stats views are cached under the book generation, as in the rebuild_stats command
+    bump_generation('book')
+    return {'years': years, 'authors': authors}
+
+
+@task
+def rebuild_search_index(job):
+    job.report_progress(0, message="Rebuilding the full-text index")
+    return {'output': command_output('rebuild_search_index')}
+
+
+@task
+def sync_author_names(job):
+    return {'output': command_output('sync_author_names')}
+
+
+@task
+def sync_replicas(job):
+    return {'output': command_output('sync_replicas')}
+
+
+@task
+def prune_tombstones(job, days=None):
+    """Forget deletes older than `days` (SYNC_TOMBSTONE_RETENTION_DAYS) from the sync feed."""
+    return {'deleted': prune_tombstone_rows(days)}
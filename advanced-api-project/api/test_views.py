@@ -23,11 +23,39 @@ Note:
 - A separate test database is automatically used during execution
 """
 
-from django.test import TestCase
+import csv
+import json
+import sqlite3
+import tempfile
+from unittest import mock, skipUnless
+
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth.models import User
+from api.async_views import AsyncBookListView
+from api.caching import get_cache, get_generation
+from api.compiled import _compiled
 from api.models import Author, Book
+from api.renderers import msgpack
+from api.suggest import reset_suggest_index
+from api.sync import prune_tombstones
+from api.writequeue import get_write_queue, stop_write_queue
+from api.views import BookCreateView, BookListView
+from perfkit.querybudget import QueryBudgetExceeded, QueryBudgetTestMixin
+from perfkit.replicas import PIN_COOKIE, ReplicaMiddleware, copy_database
+
+
+# CachedAPITestCase: writes bump the cache generations on commit, which never
+# comes inside a TestCase, so every test starts from an empty response cache
+class CachedAPITestCase(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
 
 class BookAPITestCase(TestCase):
     def setUp(self):
@@ -87,3 +115,838 @@ class BookAPITestCase(TestCase):
         })
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+
+class BookKeysetPaginationTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.author = Author.objects.create(name="Chimamanda Ngozi Adichie")
+        for title, year in [("Purple Hibiscus", 2003), ("Half of a Yellow Sun", 2006),
+                            ("Americanah", 2013), ("The Thing Around Your Neck", 2009),
+                            ("Dear Ijeawele", 2017)]:
+            Book.objects.create(title=title, publication_year=year, author=self.author)
+
+    def walk(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [book["title"] for book in response.data["results"]]
+            url = response.data["next"]
+        return titles
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get("/api/books/")
+        self.assertEqual(len(response.data), 5)
+
+    def test_walk_pages_in_order(self):
+        titles = self.walk("/api/books/?ordering=title&page_size=2")
+        self.assertEqual(titles, sorted(titles))
+        self.assertEqual(len(titles), 5)
+
+        years = [book["publication_year"] for book in
+                 self.client.get("/api/books/?ordering=-publication_year&page_size=10").data["results"]]
+        self.assertEqual(years, sorted(years, reverse=True))
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get("/api/books/?ordering=title&page_size=2").data
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(back["results"], first["results"])
+
+    def test_inserts_do_not_shift_unread_pages(self):
+        first = self.client.get("/api/books/?ordering=title&page_size=2").data
+        Book.objects.create(title="A Aardvark", publication_year=2020, author=self.author)
+        rest = self.walk(first["next"])
+        seen = [book["title"] for book in first["results"]] + rest
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertNotIn("A Aardvark", rest)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/books/?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class BookFullTextSearchTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        author = Author.objects.create(name="Yvonne Vera")
+        Book.objects.create(title="Butterfly Burning", publication_year=1998, author=author)
+        Book.objects.create(title="The Stone Virgins", publication_year=2002, author=author)
+        Book.objects.create(title="Under the Tongue", publication_year=1996,
+                            author=Author.objects.create(name="Stone Butterfly"))
+
+    def test_prefix_search_on_title_and_author(self):
+        response = self.client.get("/api/books/?search=butter")
+        self.assertEqual({book["title"] for book in response.data},
+                         {"Butterfly Burning", "Under the Tongue"})
+
+    def test_order_by_relevance(self):
+        response = self.client.get("/api/books/?search=stone&ordering=relevance")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get("/api/books/?ordering=relevance")
+        self.assertEqual(len(response.data), 3)
+
+class BookResponseCacheTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cacheuser', password='testpass')
+        self.author = Author.objects.create(name="Petina Gappah")
+        self.book = Book.objects.create(title="The Book of Memory", publication_year=2015, author=self.author)
+
+    def test_repeated_reads_are_served_from_cache(self):
+        first = self.client.get("/api/books/?ordering=title&publication_year=2015")
+        self.assertEqual(first["X-Cache"], "MISS")
+        # Same query with parameters in another order hits the same entry
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/books/?publication_year=2015&ordering=title")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+
+    def test_writes_invalidate_list_and_detail(self):
+        self.client.get("/api/books/")
+        self.client.get(f"/api/books/{self.book.id}/")
+
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/books/update/{self.book.id}/", {"title": "An Elegy for Easterly"})
+
+        listing = self.client.get("/api/books/")
+        detail = self.client.get(f"/api/books/{self.book.id}/")
+        self.assertEqual(listing["X-Cache"], "MISS")
+        self.assertEqual(listing.data[0]["title"], "An Elegy for Easterly")
+        self.assertEqual(detail.data["title"], "An Elegy for Easterly")
+
+    def test_author_rename_invalidates_list(self):
+        self.client.get("/api/books/?author__name=Petina Gappah")
+        self.author.name = "P. Gappah"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        response = self.client.get("/api/books/?author__name=Petina Gappah")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data, [])
+
+    def test_reads_before_commit_are_invalidated_by_it(self):
+        url = f"/api/books/{self.book.id}/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.title = "Rotten Row"
+            self.book.save()
+            # A concurrent reader still sees the old row until the commit, so
+            # whatever it caches now must be keyed on the generation the commit replaces
+            generation = get_generation(f"book:{self.book.id}")
+            self.client.get(url)
+        self.assertNotEqual(get_generation(f"book:{self.book.id}"), generation)
+        response = self.client.get(url)
+        self.assertEqual((response["X-Cache"], response.data["title"]), ("MISS", "Rotten Row"))
+
+    def test_file_based_backend_and_stats(self):
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}):
+                self.client.get("/api/books/")
+                self.assertEqual(self.client.get("/api/books/")["X-Cache"], "HIT")
+
+                self.client.force_authenticate(user=self.user)
+                stats = self.client.get("/api/cache/stats/").data
+                self.assertEqual(stats, {"hits": 1, "misses": 1})
+
+class BookConditionalRequestTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='etaguser', password='testpass')
+        self.author = Author.objects.create(name="Dambudzo Marechera")
+        self.book = Book.objects.create(title="The House of Hunger", publication_year=1978, author=self.author)
+        self.other = Book.objects.create(title="Black Sunlight", publication_year=1980, author=self.author)
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        etag = self.client.get("/api/books/")["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/books/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title="Mindblast", publication_year=1984, author=self.author)
+        response = self.client.get("/api/books/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_detail_etag_only_changes_with_its_row(self):
+        url = f"/api/books/{self.book.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.other.title = "Black Sunlight (1980)"
+        self.other.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_variants_are_cached_separately(self):
+        url = f"/api/books/{self.book.id}/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(f"{url}?fields=id", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response["X-Cache"], response.data), ("MISS", {"id": self.book.id}))
+
+        expanded = self.client.get(f"{url}?expand=author")
+        self.assertEqual(expanded["X-Cache"], "MISS")
+        # A rename only bumps the author counter, which the expanded variant depends on
+        self.author.name = "D. Marechera"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(f"{url}?expand=author", HTTP_IF_NONE_MATCH=expanded["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["author"]["name"], "D. Marechera")
+
+    def test_update_with_if_match(self):
+        etag = self.client.get(f"/api/books/{self.book.id}/")["ETag"]
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/books/update/{self.book.id}/"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {"title": "House of Hunger"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The old ETag is now stale
+        response = self.client.patch(url, {"title": "Lost edit"}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "House of Hunger")
+
+class BookBulkAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='bulkuser', password='testpass'))
+        self.author = Author.objects.create(name="Ngũgĩ wa Thiong'o")
+        self.other = Author.objects.create(name="Chinua Achebe")
+
+    def payload(self, count):
+        return [{"title": f"Book {i}", "publication_year": 1960 + i,
+                 "author": (self.author if i % 2 else self.other).id} for i in range(count)]
+
+    def test_bulk_create_uses_constant_queries(self):
+        # session/savepoint bookkeeping + one author lookup + one change sequence UPDATE
+        # + one INSERT + INSERT OR IGNORE and UPDATE for each of the two stats tables
+        with self.assertNumQueries(9):
+            response = self.client.post("/api/books/bulk/", self.payload(50), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertTrue(all(book["id"] for book in response.data))
+
+    def test_errors_are_reported_per_item_and_nothing_is_saved(self):
+        items = self.payload(3)
+        items[1]["publication_year"] = 3000
+        items[2]["author"] = 999999
+        response = self.client.post("/api/books/bulk/", items, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertIn("publication_year", response.data["errors"][0]["errors"])
+        self.assertIn("author", response.data["errors"][1]["errors"])
+        self.assertEqual(Book.objects.count(), 0)
+
+    def test_bulk_update_and_delete(self):
+        books = Book.objects.bulk_create(
+            [Book(title=f"Draft {i}", publication_year=2000, author=self.author) for i in range(3)]
+        )
+        response = self.client.patch("/api/books/bulk/", [
+            {"id": books[0].id, "title": "Weep Not, Child"},
+            {"id": books[1].id, "publication_year": 1967, "author": self.other.id},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        books[0].refresh_from_db()
+        books[1].refresh_from_db()
+        self.assertEqual(books[0].title, "Weep Not, Child")
+        self.assertEqual((books[1].publication_year, books[1].author_id), (1967, self.other.id))
+
+        response = self.client.patch("/api/books/bulk/", [{"id": 424242, "title": "Nope"}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.patch("/api/books/bulk/", [
+            {"id": books[2].id, "publication_year": 2001},
+            {"id": books[2].id, "publication_year": 2002},
+        ], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1])
+        books[2].refresh_from_db()
+        self.assertEqual(books[2].publication_year, 2000)
+
+        response = self.client.delete("/api/books/bulk/", {"ids": [books[0].id, books[2].id]}, format="json")
+        self.assertEqual(response.data, {"deleted": 2})
+        self.assertEqual(list(Book.objects.values_list("id", flat=True)), [books[1].id])
+
+class BookExportTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        author = Author.objects.create(name="Bessie Head")
+        Book.objects.create(title="When Rain Clouds Gather", publication_year=1968, author=author)
+        Book.objects.create(title="Maru", publication_year=1971, author=author)
+
+    def test_ndjson_export_streams_filtered_rows(self):
+        response = self.client.get("/api/books/export/?publication_year=1971")
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["title"] for line in lines], ["Maru"])
+        self.assertEqual(json.loads(lines[0])["author_name"], "Bessie Head")
+
+    def test_csv_export(self):
+        response = self.client.get("/api/books/export/?output=csv")
+        rows = list(csv.reader(b"".join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0], ["id", "title", "publication_year", "author", "author_name"])
+        self.assertEqual([row[1] for row in rows[1:]], ["When Rain Clouds Gather", "Maru"])
+
+    def test_unknown_output_format(self):
+        response = self.client.get("/api/books/export/?output=xml")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SparseFieldsetTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.author = Author.objects.create(name="Nuruddin Farah")
+        self.book = Book.objects.create(title="Maps", publication_year=1986, author=self.author)
+
+    def test_fields_trim_payload_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/books/?fields=id,title")
+        self.assertEqual(response.data, [{"id": self.book.id, "title": "Maps"}])
+        select = [q["sql"] for q in queries.captured_queries if "api_book" in q["sql"]][0]
+        self.assertNotIn("publication_year", select.split("FROM")[0])
+
+    def test_expand_author(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/books/{self.book.id}/?fields=title,author&expand=author")
+        self.assertEqual(response.data, {"title": "Maps", "author": {"id": self.author.id, "name": "Nuruddin Farah"}})
+
+        response = self.client.get("/api/books/?expand=author&ordering=title&page_size=5")
+        self.assertEqual(response.data["results"][0]["author"]["name"], "Nuruddin Farah")
+
+    def test_equivalent_field_lists_share_a_compiled_serializer(self):
+        self.client.get("/api/books/?fields=id,title")
+        compiled = len(_compiled)
+        for fields in ("title,id", "id,id,title", "title,id,title,id"):
+            response = self.client.get(f"/api/books/?fields={fields}")
+            self.assertEqual(list(response.data[0]), ["id", "title"])
+        self.assertEqual(len(_compiled), compiled)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get("/api/books/?fields=id,isbn&expand=publisher")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("isbn", str(response.data["fields"]))
+        self.assertIn("publisher", str(response.data["expand"]))
+
+class BookFacetTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        achebe = Author.objects.create(name="Chinua Achebe")
+        ngugi = Author.objects.create(name="Ngũgĩ wa Thiong'o")
+        for title, year, author in [("Things Fall Apart", 1958, achebe), ("No Longer at Ease", 1960, achebe),
+                                    ("Arrow of God", 1964, achebe), ("Weep Not, Child", 1964, ngugi),
+                                    ("The River Between", 1965, ngugi)]:
+            Book.objects.create(title=title, publication_year=year, author=author)
+        self.achebe, self.ngugi = achebe, ngugi
+
+    def test_all_facets_in_one_query(self):
+        # books + count + one UNION ALL statement for both facets
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/books/?facets=publication_year,author&facet_size=2&page_size=1")
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["facets"], {
+            "publication_year": [{"value": 1964, "count": 2}, {"value": 1958, "count": 1}],
+            "author": [{"value": self.achebe.id, "label": "Chinua Achebe", "count": 3},
+                       {"value": self.ngugi.id, "label": "Ngũgĩ wa Thiong'o", "count": 2}],
+        })
+
+        # Other pages and orderings of the same set reuse the cached counts
+        for url in (response.data["next"], "/api/books/?facets=author,publication_year&facet_size=2&ordering=-title"):
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.data["facets"]["author"][0]["count"], 3)
+
+    def test_facets_follow_filters_and_search(self):
+        response = self.client.get("/api/books/?search=arrow&ordering=relevance&facets=author")
+        self.assertEqual(response.data["results"][0]["title"], "Arrow of God")
+        self.assertEqual(response.data["facets"]["author"],
+                         [{"value": self.achebe.id, "label": "Chinua Achebe", "count": 1}])
+
+        response = self.client.get("/api/books/async/?publication_year=1964&facets=publication_year")
+        self.assertEqual(response.json()["facets"], {"publication_year": [{"value": 1964, "count": 2}]})
+
+    def test_writes_invalidate_facets_and_unknown_facets(self):
+        self.client.get("/api/books/?facets=author")
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title="Petals of Blood", publication_year=1977, author=self.ngugi)
+        response = self.client.get("/api/books/?facets=author")
+        self.assertEqual([bucket["count"] for bucket in response.data["facets"]["author"]], [3, 3])
+
+        response = self.client.get("/api/books/?facets=genre")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("facets", response.data)
+
+
+class AuthorAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        for index in range(12):
+            author = Author.objects.create(name=f"Author {index:02d}")
+            for year in range(2000, 2000 + index % 4):
+                Book.objects.create(title=f"Book {index}-{year}", publication_year=year, author=author)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for page_size in (1, 5, 12):
+            with self.assertNumQueries(2):
+                response = self.client.get(f"/api/authors/?page_size={page_size}&books_limit=2")
+            self.assertEqual(len(response.data["results"]), page_size)
+
+    def test_books_count_and_limit(self):
+        response = self.client.get("/api/authors/?ordering=-books_count&books_limit=2")
+        first = response.data[0]
+        self.assertEqual(first["books_count"], 3)
+        self.assertEqual([book["publication_year"] for book in first["books"]], [2002, 2001])
+
+    def test_detail_and_sparse_fields(self):
+        author = Author.objects.get(name="Author 03")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/authors/{author.id}/?fields=name,books_count")
+        self.assertEqual(response.data, {"name": "Author 03", "books_count": 3})
+
+        response = self.client.get("/api/authors/?books_limit=0")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_full_text_search_on_names(self):
+        achebe = Author.objects.create(name="Chinua Achebe")
+        adichie = Author.objects.create(name="Chimamanda Ngozi Adichie")
+
+        # The match is a subquery of the author query
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/authors/?search=chi&page_size=5&fields=name")
+        self.assertEqual(response.data["results"], [{"name": "Chimamanda Ngozi Adichie"}, {"name": "Chinua Achebe"}])
+
+        response = self.client.get("/api/authors/?search=achebe&ordering=relevance&fields=id")
+        self.assertEqual(response.data, [{"id": achebe.id}])
+
+        adichie.name = "C. N. Adichie"
+        adichie.save()
+        response = self.client.get("/api/authors/?search=chi&fields=id")
+        self.assertEqual(response.data, [{"id": achebe.id}])
+
+class CatalogStatsAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='statsuser', password='testpass'))
+        self.authors = [Author.objects.create(name=f"Author {index}") for index in range(3)]
+        response = self.client.post("/api/books/bulk/", [
+            {"title": f"Book {i}", "publication_year": 2000 + i % 2, "author": self.authors[i % 3].id}
+            for i in range(7)
+        ], format="json")
+        self.ids = [book["id"] for book in response.data]
+
+    def test_year_stats(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/stats/years/")
+        self.assertEqual(response.data, [{"publication_year": 2000, "book_count": 4},
+                                         {"publication_year": 2001, "book_count": 3}])
+
+        # Bulk delete applies one grouped update; emptied years drop out of the listing
+        self.client.delete("/api/books/bulk/", {"ids": self.ids[1::2]}, format="json")
+        response = self.client.get("/api/stats/years/?ordering=-book_count")
+        self.assertEqual(response.data, [{"publication_year": 2000, "book_count": 4}])
+
+    def test_author_stats_pages_most_prolific_first(self):
+        response = self.client.get("/api/stats/authors/?page_size=2")
+        self.assertEqual([row["author_name"] for row in response.data["results"]], ["Author 0", "Author 1"])
+        self.assertEqual([row["book_count"] for row in response.data["results"]], [3, 2])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"], [
+            {"author": self.authors[2].id, "author_name": "Author 2", "book_count": 2},
+        ])
+
+
+class AsyncBookViewTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        author = Author.objects.create(name="Tsitsi Dangarembga")
+        self.book = Book.objects.create(title="Nervous Conditions", publication_year=1988, author=author)
+        Book.objects.create(title="This Mournable Body", publication_year=2018, author=author)
+        Book.objects.create(title="The Book of Not", publication_year=2006, author=author)
+
+    async def test_async_views_match_sync_views(self):
+        for query in ["", "?publication_year=2018", "?search=mourn", "?ordering=-publication_year&page_size=2",
+                      "?fields=id,title", "?ordering=relevance"]:
+            expected = await self.async_client.get(f"/api/books/{query}")
+            response = await self.async_client.get(f"/api/books/async/{query}")
+            self.assertEqual(response.status_code, expected.status_code, query)
+            # Pagination links point at the async endpoint itself
+            self.assertEqual(json.loads(response.content.decode().replace("/books/async/", "/books/")),
+                             expected.json(), query)
+
+        response = await self.async_client.get(f"/api/books/async/{self.book.id}/?expand=author")
+        self.assertEqual(response.json()["author"]["name"], "Tsitsi Dangarembga")
+        response = await self.async_client.get("/api/books/async/424242/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_async_list_honours_etag_and_errors(self):
+        response = await self.async_client.get("/api/books/async/")
+        cached = await self.async_client.get("/api/books/async/", headers={"if-none-match": response["ETag"]})
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = await self.async_client.get("/api/books/async/?fields=isbn")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.post("/api/books/async/", {})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    async def test_cache_calls_do_not_block_the_event_loop(self):
+        blocking = AssertionError("synchronous cache call on the event loop")
+        with mock.patch("api.caching.get_generation", side_effect=blocking), \
+                mock.patch("api.caching.record", side_effect=blocking):
+            for url in ["/api/books/async/", f"/api/books/async/{self.book.id}/?expand=author"]:
+                await self.async_client.get(url)
+                response = await self.async_client.get(url)
+                self.assertEqual((response.status_code, response["X-Cache"]), (status.HTTP_200_OK, "HIT"), url)
+
+    async def test_middleware_runs_on_the_event_loop(self):
+        # Sync-only middleware would be adapted, handing every request to a thread
+        with self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler()
+        # Queries made from the async views still count against their budget
+        with mock.patch.object(AsyncBookListView, "query_budget", 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                await self.async_client.get("/api/books/async/?publication_year=1988")
+
+class QueryBudgetTestCase(QueryBudgetTestMixin, CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        for index in range(6):
+            author = Author.objects.create(name=f"Author {index}")
+            Book.objects.create(title=f"Book {index}", publication_year=2000 + index, author=author)
+
+    def test_detects_n_plus_one(self):
+        with self.assertRaises(AssertionError) as failure:
+            with self.assertQueryBudget():
+                [book.author.name for book in Book.objects.all()]
+        self.assertIn("N+1: 6 x SELECT", str(failure.exception))
+        self.assertIn("test_views.py", str(failure.exception))
+
+        with self.assertQueryBudget(max_queries=1):
+            [book.author.name for book in Book.objects.select_related("author")]
+
+    def test_views_stay_within_their_budget(self):
+        User.objects.create_user(username="budget", password="budget")
+        self.client.login(username="budget", password="budget")
+        for url in ["/api/books/", "/api/books/?expand=author", "/api/authors/", "/api/authors/?page_size=3"]:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+
+        # The middleware raises in tests (QUERY_BUDGET_STRICT) once a budget is exceeded
+        with override_settings(QUERY_BUDGET_DEFAULT=1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/api/books/export/")
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+
+    def route(self, view, method="get", cookies=None, write=False):
+        """Run `view` through ReplicaMiddleware; return the read aliases before/after an optional write."""
+        reads = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            reads.append(router.db_for_read(Book))
+            if write:
+                router.db_for_write(Book)
+                reads.append(router.db_for_read(Book))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        request = getattr(self.factory, method)("/")
+        request.COOKIES.update(cookies or {})
+        return reads, middleware(request)
+
+    def test_marked_reads_go_to_a_replica_until_the_request_writes(self):
+        view = BookListView.as_view()
+        reads, response = self.route(view)
+        self.assertEqual(reads, ["replica"])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        reads, response = self.route(view, write=True)
+        self.assertEqual(reads, ["replica", "default"])
+        # Read-your-writes: the client's next requests read the primary too
+        reads, _ = self.route(view, cookies={PIN_COOKIE: response.cookies[PIN_COOKIE].value})
+        self.assertEqual(reads, ["default"])
+
+    @override_settings(DATABASE_REPLICAS=["default"])
+    def test_replica_reads_are_not_cached(self):
+        # The primary doubles as the replica here; the router still treats its reads as lagging
+        Book.objects.create(title="Purple Hibiscus", publication_year=2003,
+                            author=Author.objects.create(name="Chimamanda Ngozi Adichie"))
+        client = APIClient()
+        for _ in range(2):
+            response = client.get("/api/books/?page_size=10&facets=author")
+            self.assertEqual(response["X-Cache"], "MISS")
+            self.assertNotIn("ETag", response)
+
+        # Pinned clients read the primary, so their responses are cached for everyone
+        client.cookies[PIN_COOKIE] = "1"
+        self.assertIn("ETag", client.get("/api/books/?page_size=10&facets=author"))
+        self.assertEqual(client.get("/api/books/?page_size=10&facets=author")["X-Cache"], "HIT")
+
+    def test_writes_and_unmarked_views_use_the_primary(self):
+        self.assertEqual(self.route(BookListView.as_view(), method="post")[0], ["default"])
+        self.assertEqual(self.route(BookCreateView.as_view())[0], ["default"])
+        self.assertEqual(router.db_for_read(Book), "default")  # outside a request
+        self.assertEqual(router.db_for_write(Book), "default")
+
+
+class ReplicaSyncTestCase(TransactionTestCase):
+    def test_copy_database_with_the_backup_api(self):
+        Book.objects.create(title="Arrow of God", publication_year=1964,
+                            author=Author.objects.create(name="Chinua Achebe"))
+        connection.ensure_connection()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/replica.sqlite3"
+            self.assertGreater(copy_database(connection.connection, path), 0)
+            replica = sqlite3.connect(path)
+            try:
+                rows = replica.execute("SELECT title, author_name FROM api_book").fetchall()
+            finally:
+                replica.close()
+            self.assertEqual(rows, [("Arrow of God", "Chinua Achebe")])
+
+            # A primary locked by an open write transaction makes the copy give up instead of spinning
+            with transaction.atomic():
+                Book.objects.update(title="Things Fall Apart")
+                with self.assertRaises(sqlite3.OperationalError):
+                    copy_database(connection.connection, path, max_busy_steps=1)
+
+
+@override_settings(WRITE_QUEUE_ENABLED=True, WRITE_QUEUE_MAX_DELAY=0.05)
+class WriteQueueTestCase(TransactionTestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Chimamanda Ngozi Adichie")
+        self.user = User.objects.create_user(username='writer', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.addCleanup(stop_write_queue)
+
+    def test_create_update_and_delete_run_on_the_writer_thread(self):
+        response = self.client.post("/api/books/create/", {
+            'title': "Purple Hibiscus", 'publication_year': 2003, 'author': self.author.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        book = Book.objects.get(pk=response.data['id'])
+
+        response = self.client.patch(f"/api/books/update/{book.pk}/", {'title': "Americanah"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        book.refresh_from_db()
+        self.assertEqual(book.title, "Americanah")
+
+        response = self.client.delete(f"/api/books/delete/{book.pk}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Book.objects.filter(pk=book.pk).exists())
+        self.assertEqual(get_write_queue().writes, 3)
+
+    def test_writes_are_batched_and_fail_individually(self):
+        writer = get_write_queue()
+
+        def failing():
+            Book.objects.create(title="Half of a Yellow Sun", publication_year=2006, author=self.author)
+            raise ValueError("rejected")
+
+        futures = [
+            writer.submit(Book.objects.create, title="Purple Hibiscus", publication_year=2003, author=self.author),
+            writer.submit(failing),
+            writer.submit(Book.objects.create, title="Americanah", publication_year=2013, author=self.author),
+        ]
+        self.assertEqual(futures[0].result(5).title, "Purple Hibiscus")
+        with self.assertRaises(ValueError):
+            futures[1].result(5)
+        futures[2].result(5)
+        # One transaction; the failed write's savepoint was rolled back
+        self.assertEqual(writer.batches, 1)
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', flat=True)), ["Americanah", "Purple Hibiscus"],
+        )
+
+
+@skipUnless(msgpack, "msgpack is not installed")
+class MessagePackAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        author = Author.objects.create(name="Tsitsi Dangarembga")
+        Book.objects.create(title="Nervous Conditions", publication_year=1988, author=author)
+        Book.objects.create(title="This Mournable Body", publication_year=2018, author=author)
+        self.client = APIClient()
+
+    def test_content_negotiation(self):
+        response = self.client.get("/api/books/?ordering=publication_year", HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual([book['title'] for book in msgpack.unpackb(response.content)],
+                         ["Nervous Conditions", "This Mournable Body"])
+
+        response = self.client.get("/api/books/?ordering=publication_year&fields=title,publication_year",
+                                   HTTP_ACCEPT='application/msgpack; layout=table')
+        self.assertEqual(msgpack.unpackb(response.content), {
+            'columns': ['title', 'publication_year'],
+            'rows': [["Nervous Conditions", 1988], ["This Mournable Body", 2018]],
+        })
+
+        # Paginated lists keep their envelope; only "results" becomes a table
+        response = self.client.get("/api/books/?page_size=1&fields=title&layout=table&format=msgpack")
+        page = msgpack.unpackb(response.content)
+        self.assertEqual(page['results'], {'columns': ['title'], 'rows': [["Nervous Conditions"]]})
+        self.assertIn('next', page)
+        # JSON stays the default
+        self.assertEqual(self.client.get("/api/books/")['Content-Type'], 'application/json')
+
+
+class BookSuggestAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        reset_suggest_index()
+        self.addCleanup(reset_suggest_index)
+        self.author = Author.objects.create(name="Chinua Achebe")
+        Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.author)
+        self.client = APIClient()
+
+    def suggest(self, query, **params):
+        response = self.client.get("/api/books/suggest/", {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result['text'] for result in response.data['results']]
+
+    def test_suggestions_follow_writes(self):
+        self.assertEqual(self.suggest("thi"), ["Things Fall Apart"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest("ache", type='author'), ["Chinua Achebe"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title="Arrow of God", publication_year=1964, author=self.author)
+        self.assertEqual(self.suggest("arr"), ["Arrow of God"])
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertEqual(self.suggest("arr"), [])
+
+        response = self.client.get("/api/books/suggest/", {'q': "a", 'type': 'publisher'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookListCountTestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        achebe = Author.objects.create(name="Chinua Achebe")
+        soyinka = Author.objects.create(name="Wole Soyinka")
+        for title, year, author in [("Things Fall Apart", 1958, achebe), ("No Longer at Ease", 1960, achebe),
+                                    ("A Man of the People", 1966, achebe), ("The Interpreters", 1965, soyinka),
+                                    ("Season of Anomy", 1973, soyinka)]:
+            Book.objects.create(title=title, publication_year=year, author=author)
+
+    def count(self, url):
+        data = self.client.get(url).data
+        return data["count"], data["count_type"]
+
+    def test_exact_below_threshold(self):
+        # A first page holding the whole list counts itself
+        with self.assertNumQueries(1):
+            self.assertEqual(self.count("/api/books/?page_size=10"), (5, "exact"))
+        self.assertEqual(self.count("/api/books/?page_size=2&author__name=Chinua%20Achebe"), (3, "exact"))
+
+    @override_settings(COUNT_EXACT_THRESHOLD=2)
+    def test_estimated_above_threshold(self):
+        # books + count stopped at 3 rows + YearStats sum
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/books/?page_size=1")
+        self.assertEqual((response.data["count"], response.data["count_type"]), (5, "estimated"))
+        # Later pages and other orderings of the same set reuse the count
+        for url in (response.data["next"], "/api/books/?page_size=1&ordering=-publication_year"):
+            with self.assertNumQueries(1):
+                self.assertEqual(self.count(url), (5, "estimated"))
+
+        self.assertEqual(self.count("/api/books/?page_size=1&author__name=Chinua%20Achebe"), (3, "estimated"))
+        # No counter for searches: only known to exceed the threshold
+        Book.objects.create(title="Anthills of the Savannah", publication_year=1987,
+                            author=Author.objects.get(name="Chinua Achebe"))
+        self.assertEqual(self.count("/api/books/?page_size=1&search=the"), (2, "more_than"))
+
+    def test_views_without_a_strategy_do_not_count(self):
+        response = self.client.get("/api/authors/?page_size=1")
+        self.assertNotIn("count", response.data)
+        self.assertIsNotNone(response.data["next"])
+
+
+class ChangeFeedAPITestCase(CachedAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.achebe = Author.objects.create(name="Chinua Achebe")
+        self.book = Book.objects.create(title="Things Fall Apart", publication_year=1958, author=self.achebe)
+        self.other = Book.objects.create(title="Arrow of God", publication_year=1964, author=self.achebe)
+
+    def sync(self, token=None, **params):
+        response = self.client.get("/api/sync/", {**({"since": token} if token else {}), **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_full_sync_in_pages(self):
+        data = self.sync()
+        self.assertEqual([(change["type"], change["deleted"]) for change in data["changes"]],
+                         [("author", False), ("book", False), ("book", False)])
+        self.assertEqual(data["changes"][1]["data"], {"id": self.book.id, "title": "Things Fall Apart",
+                                                     "publication_year": 1958, "author": self.achebe.id})
+        self.assertFalse(data["has_more"])
+
+        seen, url = [], "/api/sync/?limit=2"
+        while url:
+            page = self.client.get(url).data
+            seen += [change["seq"] for change in page["changes"]]
+            url = page["next"]
+        self.assertEqual(seen, [change["seq"] for change in data["changes"]])
+
+    def test_only_changes_since_the_token(self):
+        token = self.sync()["token"]
+        # sequence + books + authors + tombstones
+        with self.assertNumQueries(4):
+            self.assertEqual(self.sync(token)["changes"], [])
+
+        self.book.title = "Things Fall Apart (50th anniversary edition)"
+        self.book.save(update_fields=["title"])
+        Book.objects.get(pk=self.other.pk).delete()
+        soyinka = Author.objects.create(name="Wole Soyinka")
+        data = self.sync(token)
+        self.assertEqual(
+            [(change["type"], change["id"], change["deleted"]) for change in data["changes"]],
+            [("book", self.book.id, False), ("book", self.other.id, True), ("author", soyinka.id, False)],
+        )
+        self.assertNotIn("data", data["changes"][1])
+        self.assertEqual(self.sync(data["token"])["changes"], [])
+
+    def test_bulk_and_cascading_deletes_leave_tombstones(self):
+        token = self.sync()["token"]
+        self.client.force_authenticate(User.objects.create_user(username="syncer", password="pass"))
+        response = self.client.delete("/api/books/bulk/", {"ids": [self.book.id]}, format="json")
+        self.assertEqual(response.data, {"deleted": 1})
+        author_id = self.achebe.id
+        self.achebe.delete()
+        deleted = [(change["type"], change["id"]) for change in self.sync(token)["changes"]]
+        self.assertEqual(deleted, [("book", self.book.id), ("book", self.other.id), ("author", author_id)])
+
+    def test_invalid_and_expired_tokens(self):
+        token = self.sync()["token"]
+        self.assertEqual(self.client.get("/api/sync/?since=garbage").status_code, status.HTTP_400_BAD_REQUEST)
+        self.book.delete()
+        prune_tombstones(days=0)
+        self.assertEqual(self.client.get("/api/sync/", {"since": token}).status_code, status.HTTP_410_GONE)
+        # A full sync still works and hands out a fresh token
+        self.assertEqual(len(self.sync()["changes"]), 2)
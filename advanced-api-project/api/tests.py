@@ -1,3 +1,573 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework import filters, serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarks import compare_results
+from api.compiled import NotCompilable, compile_serializer
+from api.models import Author, Book, ChangeSequence, ImportCheckpoint, Tombstone
+from api.parsers import FastJSONParser, MessagePackParser
+from api.renderers import FastJSONRenderer, MessagePackRenderer, from_table, msgpack, to_table
+from api.search import AUTHOR_FTS_TABLE, BOOK_FTS_TABLE, build_match_query
+from api.serializers import AuthorSerializer, BookSerializer
+from api.stats import diff_counts, estimate_book_count, rebuild_stats, stored_counts
+from api.suggest import SuggestIndex, normalize
+from api.sync import decode_token, encode_token, prune_tombstones, read_changes
+from api.views import BookListView
+from jobs.queue import JobReclaimed
+from perfkit.counting import CountingPaginator, count_queryset, estimate_table_rows
+from perfkit.sqliteprofile import DEFAULT_PRAGMAS, apply_pragmas, get_pragmas, run_maintenance
+
+
+class BookSearchIndexTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="NoViolet Bulawayo")
+        self.book = Book.objects.create(title="We Need New Names", publication_year=2013, author=self.author)
+
+    def matches(self, *terms, table=BOOK_FTS_TABLE):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s",
+                [build_match_query(terms)],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        self.assertEqual(self.matches("names"), [self.book.id])
+
+        self.book.title = "Glory"
+        self.book.save()
+        self.assertEqual(self.matches("names"), [])
+        self.assertEqual(self.matches("glo"), [self.book.id])
+
+        self.book.delete()
+        self.assertEqual(self.matches("glory"), [])
+
+    def test_author_rename_is_indexed(self):
+        self.author.name = "Elizabeth Zandile Tshele"
+        self.author.save()
+        self.assertEqual(self.matches("zandile"), [self.book.id])
+        self.assertEqual(self.matches("bulawayo"), [])
+
+    def test_author_index_follows_inserts_renames_and_deletes(self):
+        self.assertEqual(self.matches("bula", table=AUTHOR_FTS_TABLE), [self.author.id])
+
+        self.author.name = "Elizabeth Zandile Tshele"
+        self.author.save()
+        self.assertEqual(self.matches("bulawayo", table=AUTHOR_FTS_TABLE), [])
+        self.assertEqual(self.matches("zan", "tsh", table=AUTHOR_FTS_TABLE), [self.author.id])
+
+        self.author.delete()
+        self.assertEqual(self.matches("zandile", table=AUTHOR_FTS_TABLE), [])
+
+    def test_match_query_escapes_user_input(self):
+        self.assertEqual(build_match_query(['we"', 'NEAR(', '-']), '"we"""* "NEAR("*')
+        self.assertEqual(self.matches('we"', "NEAR("), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {BOOK_FTS_TABLE}")
+            cursor.execute(f"DELETE FROM {AUTHOR_FTS_TABLE}")
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.matches("need"), [self.book.id])
+        self.assertEqual(self.matches("noviolet", table=AUTHOR_FTS_TABLE), [self.author.id])
+
+
+class ImportBooksCommandTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.existing = Author.objects.create(name="Chinua Achebe")
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def test_csv_import_dedupes_authors(self):
+        path = self.write('books.csv', (
+            "title,publication_year,author\n"
+            "Things Fall Apart,1958,Chinua Achebe\n"
+            "Arrow of God,1964,Chinua Achebe\n"
+            "Nervous Conditions,1988,Tsitsi Dangarembga\n"
+            "Broken row,not-a-year,Nobody\n"
+        ))
+        call_command('import_books', path, '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.filter(name="Chinua Achebe").count(), 1)
+        self.assertEqual(self.existing.books.count(), 2)
+        self.assertEqual(diff_counts(), [])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_ndjson_import_resumes_from_checkpoint(self):
+        lines = [json.dumps({"title": f"Book {i}", "publication_year": 2000 + i, "author": "Writer"}) for i in range(5)]
+        path = self.write('books.ndjson', '\n'.join(lines) + '\n')
+        # An earlier run committed the first two records before it was interrupted
+        ImportCheckpoint.objects.create(name=path, source=path, records=2)
+
+        call_command('import_books', path, '--batch-size', '2', '--workers', '2', stdout=StringIO())
+
+        self.assertEqual(list(Book.objects.order_by('title').values_list('title', flat=True)),
+                         ["Book 2", "Book 3", "Book 4"])
+
+    def test_batches_roll_back_when_before_commit_raises(self):
+        path = self.write('books.csv', "title,publication_year,author\nArrow of God,1964,Chinua Achebe\n")
+
+        def reclaimed():
+            raise JobReclaimed("Job 1 was reclaimed by another worker.")
+
+        with self.assertRaises(JobReclaimed):
+            call_command('import_books', path, before_commit=reclaimed, stdout=StringIO())
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_commits_with_its_batches(self):
+        rows = "".join(f"Book {i},{2000 + i},Writer\n" for i in range(4))
+        path = self.write('books.csv', "title,publication_year,author\n" + rows)
+        commits = []
+
+        def crash_on_second_commit():
+            commits.append(ImportCheckpoint.objects.get(name=path).records)
+            if len(commits) == 2:
+                raise RuntimeError("Worker killed")
+
+        with self.assertRaises(RuntimeError):
+            call_command('import_books', path, '--batch-size', '1', '--commit-every', '2',
+                         before_commit=crash_on_second_commit, stdout=StringIO())
+        # The second transaction rolled back its rows and its checkpoint together
+        self.assertEqual(commits, [2, 4])
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name=path).records, 2)
+
+        call_command('import_books', path, stdout=StringIO())
+        self.assertEqual(list(Book.objects.order_by('title').values_list('title', flat=True)),
+                         ["Book 0", "Book 1", "Book 2", "Book 3"])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+        ImportCheckpoint.objects.create(name=path, source=path + '.old', records=1)
+        with self.assertRaises(CommandError):
+            call_command('import_books', path, stdout=StringIO())
+
+
+class CompiledSerializerTestCase(TestCase):
+    def setUp(self):
+        first = Author.objects.create(name="Wole Soyinka")
+        second = Author.objects.create(name="Ama Ata Aidoo")
+        Author.objects.create(name="No Books Yet")
+        Book.objects.create(title="Aké: The Years of Childhood", publication_year=1981, author=first)
+        Book.objects.create(title="Changes", publication_year=1991, author=second)
+        Book.objects.create(title="The Interpreters", publication_year=1965, author=first)
+
+    def test_output_is_byte_identical(self):
+        render = JSONRenderer().render
+        for serializer_class, queryset in [(BookSerializer, Book.objects.order_by('title')),
+                                           (AuthorSerializer, Author.objects.annotate(books_count=Count('books'))
+                                            .order_by('pk'))]:
+            compiled = compile_serializer(serializer_class)
+            self.assertIsNotNone(compiled)
+            self.assertEqual(render(compiled.serialize(queryset)),
+                             render(serializer_class(queryset, many=True).data))
+
+    def test_nested_books_cost_one_query(self):
+        with self.assertNumQueries(2):
+            compile_serializer(AuthorSerializer).serialize(Author.objects.annotate(books_count=Count('books')))
+
+    def test_missing_annotation_is_not_compilable(self):
+        with self.assertRaises(NotCompilable):
+            compile_serializer(AuthorSerializer).serialize(Author.objects.all())
+
+    def test_unsupported_fields_fall_back(self):
+        class TitleSerializer(serializers.ModelSerializer):
+            label = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Book
+                fields = ['title', 'label']
+
+            def get_label(self, obj):
+                return str(obj)
+
+        self.assertIsNone(compile_serializer(TitleSerializer))
+
+
+class BenchmarkComparisonTestCase(TestCase):
+    def report(self, **stats):
+        return {'results': {'10000': {'list': {'throughput_rps': 100.0, 'p95_ms': 50.0, 'errors': 0, **stats}}}}
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_results(self.report(p95_ms=55.0, throughput_rps=90.0), self.report()), [])
+
+    def test_flags_slower_and_failing_scenarios(self):
+        regressions = compare_results(self.report(p95_ms=80.0, throughput_rps=50.0, errors=3), self.report())
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(line.startswith("list@10000") for line in regressions))
+
+    def test_new_scenarios_are_ignored(self):
+        baseline = {'results': {'10000': {}}}
+        self.assertEqual(compare_results(self.report(p95_ms=500.0), baseline), [])
+
+
+class BookAuthorNameTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Ngũgĩ wa Thiong'o")
+        self.book = Book.objects.create(title="Weep Not, Child", publication_year=1964, author=self.author)
+
+    def query_plan(self, params, backend=None):
+        view = BookListView()
+        view.request = Request(APIRequestFactory().get('/api/books/', params))
+        view.format_kwarg = None
+        if backend is None:
+            queryset = view.filter_queryset(view.get_queryset())
+        else:
+            queryset = backend.filter_queryset(view.request, view.get_queryset(), view)
+        sql, sql_params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", sql_params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def test_filter_and_ordering_use_the_local_index(self):
+        plan = self.query_plan({'author__name': "Ngũgĩ wa Thiong'o", 'ordering': 'author_name'})
+        self.assertNotIn('api_author', plan)
+        self.assertIn('book_author_name_id_idx', plan)
+
+    def test_like_search_fallback_does_not_join(self):
+        self.assertNotIn('api_author', self.query_plan({'search': 'thiong'}, backend=filters.SearchFilter()))
+
+    def test_kept_in_sync(self):
+        self.assertEqual(self.book.author_name, "Ngũgĩ wa Thiong'o")
+        self.author.name = "Ngugi wa Thiong'o"
+        self.author.save()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.author_name, "Ngugi wa Thiong'o")
+
+        serializer = BookSerializer(data=[{'title': "Petals of Blood", 'publication_year': 1977,
+                                           'author': self.author.pk}], many=True)
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(serializer.save()[0].author_name, "Ngugi wa Thiong'o")
+
+    def test_sync_command_repairs_raw_renames(self):
+        Author.objects.filter(pk=self.author.pk).update(name="James Ngugi")
+        with self.assertRaises(CommandError):
+            call_command('sync_author_names', '--check', stdout=StringIO())
+        call_command('sync_author_names', stdout=StringIO())
+        self.assertEqual(Book.objects.get().author_name, "James Ngugi")
+
+
+class CatalogStatsTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Ngũgĩ wa Thiong'o")
+        self.other = Author.objects.create(name="Chinua Achebe")
+
+    def assertStatsMatch(self, years, authors):
+        self.assertEqual(stored_counts(), (years, authors))
+        self.assertEqual(diff_counts(), [])
+
+    def test_single_row_writes(self):
+        book = Book.objects.create(title="Weep Not, Child", publication_year=1964, author=self.author)
+        Book.objects.create(title="The River Between", publication_year=1965, author=self.author)
+        self.assertStatsMatch({1964: 1, 1965: 1}, {self.author.pk: 2})
+
+        book.publication_year, book.author = 1958, self.other
+        book.save()
+        self.assertStatsMatch({1958: 1, 1965: 1}, {self.author.pk: 1, self.other.pk: 1})
+
+        # Unsaved fields and title-only saves leave the stats alone
+        book.publication_year = 2000
+        book.save(update_fields=['title'])
+        Book.objects.get(pk=book.pk).delete()
+        self.assertStatsMatch({1965: 1}, {self.author.pk: 1})
+
+        # Deleting an author cascades to its books and its stats row
+        self.author.delete()
+        self.assertStatsMatch({}, {})
+
+    def test_bulk_writes(self):
+        serializer = BookSerializer(data=[
+            {'title': f"Book {i}", 'publication_year': 1960 + i % 3, 'author': self.author.pk} for i in range(6)
+        ], many=True)
+        serializer.is_valid(raise_exception=True)
+        books = serializer.save()
+        self.assertStatsMatch({1960: 2, 1961: 2, 1962: 2}, {self.author.pk: 6})
+
+        serializer = BookSerializer(books[:2], data=[
+            {'id': books[0].pk, 'author': self.other.pk}, {'id': books[1].pk, 'publication_year': 1962},
+        ], many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertStatsMatch({1960: 2, 1961: 1, 1962: 3}, {self.author.pk: 5, self.other.pk: 1})
+
+    def test_rebuild_command(self):
+        Book.objects.create(title="Arrow of God", publication_year=1964, author=self.other)
+        # Raw writes bypass the signals
+        Book.objects.filter(author=self.other).update(publication_year=1958)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_stats', '--check', stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_stats', stdout=StringIO())
+        self.assertStatsMatch({1958: 1}, {self.other.pk: 1})
+        call_command('rebuild_stats', '--check', stdout=StringIO())
+
+
+class CatalogStatsRebuildTestCase(TransactionTestCase):
+    def test_counts_under_the_write_lock(self):
+        author = Author.objects.create(name="Buchi Emecheta")
+        Book.objects.create(title="The Joys of Motherhood", publication_year=1979, author=author)
+        mode = connection.transaction_mode
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rebuild_stats(), (1, 1))
+        # The live counts are read after BEGIN IMMEDIATE, not before the transaction
+        statements = [query['sql'] for query in queries.captured_queries]
+        self.assertEqual(statements[0], 'BEGIN IMMEDIATE')
+        self.assertIn('COUNT', statements[1])
+        self.assertEqual(connection.transaction_mode, mode)
+
+
+class SQLiteProfileTestCase(TestCase):
+    def test_new_connections_get_the_profile(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA cache_size").fetchone()[0], DEFAULT_PRAGMAS['cache_size'])
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], DEFAULT_PRAGMAS['busy_timeout'])
+
+    def test_file_database_switches_to_wal_and_checkpoints(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            raw = sqlite3.connect(os.path.join(tmp, 'profile.sqlite3'))
+            try:
+                with self.settings(SQLITE_PRAGMAS={'mmap_size': None, 'synchronous': 'OFF'}):
+                    apply_pragmas(raw, get_pragmas())
+                self.assertEqual(raw.execute("PRAGMA journal_mode").fetchone(), ('wal',))
+                self.assertEqual(raw.execute("PRAGMA synchronous").fetchone(), (0,))
+                self.assertEqual(raw.execute("PRAGMA mmap_size").fetchone(), (0,))
+                raw.execute("CREATE TABLE t (x)")
+                raw.execute("INSERT INTO t VALUES (1)")
+                raw.commit()
+                busy, wal_pages, checkpointed = run_maintenance(raw)
+                self.assertEqual(busy, 0)
+                self.assertEqual(wal_pages, checkpointed)
+
+                with self.assertRaises(ImproperlyConfigured):
+                    apply_pragmas(raw, {'journal_mode': 'WAL; DROP TABLE t'})
+            finally:
+                raw.close()
+
+
+class FastJSONTestCase(TestCase):
+    data = {
+        'published': datetime.date(1958, 6, 17),
+        'updated': datetime.datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=datetime.timezone.utc),
+        'price': Decimal('12.50'),
+        'isbn': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy("Books"),
+        'title': "Line\u2028separator – ünïcode",
+        'counts': {1958: 1},
+    }
+
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        big = {'id': 2 ** 70}
+        self.assertEqual(FastJSONRenderer().render(big), JSONRenderer().render(big))
+
+    def test_datetimes_and_decimals_match_json_renderer(self):
+        paris = datetime.timezone(datetime.timedelta(hours=2))
+        data = [
+            {
+                'created': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+                'updated': datetime.datetime(2024, 5, 1, 14, 30, tzinfo=paris),
+                'naive': datetime.datetime(2024, 5, 1, 12, 30, 15, 999),
+                'at': datetime.time(9, 5, 0, 1),
+                'price': Decimal('12.50'),
+                'prices': [Decimal('0.1'), Decimal('1E+3'), Decimal('-7')],
+            },
+        ]
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data, 'application/json'))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({datetime.date(2024, 5, 1): 1})
+
+    def test_indent(self):
+        for media_type in ('application/json; indent=2', 'application/json; indent=4'):
+            self.assertEqual(json.loads(FastJSONRenderer().render(self.data, media_type)),
+                             json.loads(JSONRenderer().render(self.data, media_type)))
+        self.assertIn(b'\n    "', FastJSONRenderer().render(self.data, 'application/json; indent=4'))
+
+    def test_parser(self):
+        body = '{"title": "Aké", "publication_year": 1981}'.encode()
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'title': "Aké", 'publication_year': 1981})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": '))
+
+    def test_registered_for_the_api(self):
+        view = BookListView()
+        self.assertIsInstance(view.get_renderers()[0], FastJSONRenderer)
+        self.assertIsInstance(view.get_parsers()[0], FastJSONParser)
+
+
+class MessagePackTestCase(TestCase):
+    books = [
+        {'id': 1, 'title': "Things Fall Apart", 'publication_year': 1958},
+        {'id': 2, 'title': "Arrow of God", 'publication_year': 1964},
+    ]
+
+    def test_table_layout(self):
+        table = to_table(self.books)
+        self.assertEqual(table['columns'], ['id', 'title', 'publication_year'])
+        self.assertEqual([list(row) for row in table['rows']], [[1, "Things Fall Apart", 1958], [2, "Arrow of God", 1964]])
+        self.assertEqual(from_table(table), self.books)
+        # Items with different fields are left as they are
+        mixed = [{'id': 1}, {'id': 2, 'title': "Arrow of God"}]
+        self.assertIs(to_table(mixed), mixed)
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_round_trip(self):
+        body = MessagePackRenderer().render({'results': self.books, 'next': None}, 'application/msgpack; layout=table')
+        self.assertEqual(msgpack.unpackb(body)['results']['columns'], ['id', 'title', 'publication_year'])
+        self.assertEqual(MessagePackParser().parse(BytesIO(body)), {
+            'results': {'columns': ['id', 'title', 'publication_year'],
+                        'rows': [[1, "Things Fall Apart", 1958], [2, "Arrow of God", 1964]]},
+            'next': None,
+        })
+        body = MessagePackRenderer().render(to_table(self.books))
+        self.assertEqual(MessagePackParser().parse(BytesIO(body), 'application/msgpack; layout=table'), self.books)
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\xc1'))
+
+
+class SuggestIndexTestCase(TestCase):
+    def setUp(self):
+        self.index = SuggestIndex()
+        self.index.build(
+            books=[(1, "Things Fall Apart"), (2, "Arrow of God"), (3, "Aké: The Years of Childhood")],
+            authors=[(1, "Chinua Achebe"), (2, "Wole Soyinka")],
+        )
+
+    def suggest(self, query, **kwargs):
+        return [(result['type'], result['id']) for result in self.index.lookup(query, **kwargs)]
+
+    def test_lookup(self):
+        self.assertEqual(normalize("Aké: The  Years…"), "ake the years")
+        # Whole-title prefixes first, then later words
+        self.assertEqual(self.suggest("a"), [('book', 3), ('book', 2), ('author', 1), ('book', 1)])
+        self.assertEqual(self.suggest("fall AP"), [('book', 1)])
+        self.assertEqual(self.suggest("ake"), [('book', 3)])
+        self.assertEqual(self.suggest("a", limit=2, kinds=('b',)), [('book', 3), ('book', 2)])
+        self.assertEqual(self.suggest("  "), [])
+
+    def test_incremental_updates(self):
+        self.index.add('b', 4, "Anthills of the Savannah")
+        self.index.add('b', 1, "Things Fall Together")
+        self.index.remove('a', 2)
+        self.assertEqual(self.suggest("savannah"), [('book', 4)])
+        self.assertEqual(self.suggest("fall apart"), [])
+        self.assertEqual(self.suggest("fall tog"), [('book', 1)])
+        self.assertEqual(self.suggest("soyinka"), [])
+        self.assertEqual(self.index.stats()['texts'], 5)
+
+    def test_word_matches_longer_than_their_keys(self):
+        self.index.add('b', 5, "The Famished Road Is A Long Book")
+        # Later-word keys keep 24 characters; the rest of the query is checked against the title
+        self.assertEqual(self.suggest("famished road is a long book"), [('book', 5)])
+        self.assertEqual(self.suggest("famished road is a long boat"), [])
+
+
+@override_settings(COUNT_EXACT_THRESHOLD=3)
+class CountingTestCase(TestCase):
+    def setUp(self):
+        achebe = Author.objects.create(name="Chinua Achebe")
+        emecheta = Author.objects.create(name="Buchi Emecheta")
+        for title, year, author in [("Things Fall Apart", 1958, achebe), ("No Longer at Ease", 1960, achebe),
+                                    ("Arrow of God", 1964, achebe), ("Second-Class Citizen", 1974, emecheta),
+                                    ("The Joys of Motherhood", 1979, emecheta)]:
+            Book.objects.create(title=title, publication_year=year, author=author)
+        self.books = Book.objects.all()
+
+    def test_strategies(self):
+        self.assertEqual(count_queryset(self.books, 'exact'), (5, 'exact'))
+        self.assertIsNone(count_queryset(self.books, 'has_more'))
+        self.assertEqual(count_queryset(self.books.filter(publication_year__gt=1970), 'auto'), (2, 'exact'))
+        # Over the threshold: counting stops at threshold + 1 rows
+        filtered = self.books.filter(publication_year__gt=1900)
+        self.assertEqual(count_queryset(filtered, 'auto'), (3, 'more_than'))
+        self.assertEqual(count_queryset(filtered, 'auto', estimate=lambda queryset: 500), (500, 'estimated'))
+        with self.assertNumQueries(0):
+            self.assertEqual(count_queryset(filtered, 'estimated', estimate=lambda queryset: 500), (500, 'estimated'))
+        with self.assertRaises(ImproperlyConfigured):
+            count_queryset(self.books, 'approximate')
+
+    def test_table_estimate_from_database_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE api_book")
+        self.assertEqual(estimate_table_rows(self.books), 5)
+        self.assertIsNone(estimate_table_rows(self.books.filter(publication_year=1958)))
+        self.assertEqual(count_queryset(self.books, 'auto'), (5, 'estimated'))
+
+    def test_estimates_from_stats_tables(self):
+        self.assertEqual(estimate_book_count(), 5)
+        self.assertEqual(estimate_book_count(year=1958), 1)
+        self.assertEqual(estimate_book_count(year=1900), 0)
+        self.assertEqual(estimate_book_count(author_name="Chinua Achebe"), 3)
+        self.assertIsNone(estimate_book_count(year=1958, author_name="Chinua Achebe"))
+
+    def test_paginator(self):
+        paginator = CountingPaginator(self.books.order_by('pk'), 2, count_strategy='has_more',
+                                      estimate=lambda queryset: 40)
+        self.assertEqual((paginator.count, paginator.count_type, paginator.num_pages), (40, 'estimated', 20))
+        self.assertEqual(CountingPaginator(list(self.books), 2).count, 5)
+
+
+class ChangeSequenceTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Tsitsi Dangarembga")
+
+    def test_every_write_takes_the_next_value(self):
+        book = Book.objects.create(title="Nervous Conditions", publication_year=1988, author=self.author)
+        self.assertEqual((self.author.change_seq, book.change_seq), (1, 2))
+        book.title = "Nervous Conditions (reissue)"
+        book.save(update_fields=['title'])
+        self.assertEqual(Book.objects.get(pk=book.pk).change_seq, 3)
+
+        # A batch takes one block of values
+        serializer = BookSerializer(data=[
+            {'title': f"Book {i}", 'publication_year': 2000 + i, 'author': self.author.pk} for i in range(3)
+        ], many=True)
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual([book.change_seq for book in serializer.save()], [4, 5, 6])
+        self.assertEqual(ChangeSequence.objects.get(name=ChangeSequence.CATALOG).value, 6)
+
+    def test_tokens(self):
+        self.assertEqual(decode_token(encode_token(42)), 42)
+        for token in ("", "not-a-token", encode_token(-1), base64.urlsafe_b64encode(b'{"s": "1"}').decode()):
+            with self.assertRaises(ValueError):
+                decode_token(token)
+
+    def test_prune_tombstones(self):
+        book = Book.objects.create(title="This Mournable Body", publication_year=2018, author=self.author)
+        book.delete()
+        self.assertEqual(list(Tombstone.objects.values_list('kind', 'change_seq')), [('book', 3)])
+        self.assertEqual(prune_tombstones(days=1), 0)
+        self.assertEqual(prune_tombstones(days=0), 1)
+        self.assertEqual(ChangeSequence.objects.get(name=ChangeSequence.PRUNED).value, 3)
+        changes, token, has_more = read_changes(since=0)
+        self.assertEqual([change['id'] for change in changes], [self.author.pk])
+        self.assertEqual((decode_token(token), has_more), (3, False))
@@ -1,10 +1,20 @@
 from django.urls import path
+from .async_views import AsyncBookDetailView, AsyncBookListView
 from .views import (
     BookListView,
     BookDetailView,
     BookCreateView,
     BookUpdateView,
     BookDeleteView,
+    BookBulkView,
+    BookExportView,
+    BookSuggestView,
+    ChangeFeedView,
+    AuthorListView,
+    AuthorDetailView,
+    CacheStatsView,
+    YearStatsView,
+    AuthorStatsView,
 )
 from django.http import JsonResponse
 
@@ -22,6 +32,17 @@ urlpatterns = [
     path('books/create/', BookCreateView.as_view(), name='book-create'),
     path('books/update/<int:pk>/', BookUpdateView.as_view(), name='book-update'),
     path('books/delete/<int:pk>/', BookDeleteView.as_view(), name='book-delete'),
+    path('books/bulk/', BookBulkView.as_view(), name='book-bulk'),
+    path('books/export/', BookExportView.as_view(), name='book-export'),
+    path('books/suggest/', BookSuggestView.as_view(), name='book-suggest'),
+    path('books/async/', AsyncBookListView.as_view(), name='book-list-async'),
+    path('books/async/<int:pk>/', AsyncBookDetailView.as_view(), name='book-detail-async'),
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
+    path('stats/years/', YearStatsView.as_view(), name='stats-years'),
+    path('stats/authors/', AuthorStatsView.as_view(), name='stats-authors'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('sync/', ChangeFeedView.as_view(), name='change-feed'),
 
     # Dummy paths for checker string match
     path('books/update/', dummy_update_view),  # checker looks for "books/update"
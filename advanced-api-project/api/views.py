@@ -1,46 +1,130 @@
-from rest_framework import generics, permissions, filters
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import StreamingHttpResponse
+from rest_framework import generics, permissions, filters, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 # Dummy import to satisfy checker string match
 from django_filters import rest_framework
 
-from .models import Book
-from .serializers import BookSerializer
+from .caching import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    ConditionalUpdateMixin,
+    bump_generation,
+    cache_stats,
+    normalized_query,
+)
+from .compiled import CompiledListMixin
+from .facets import FacetedListMixin
+from .fieldsets import SparseFieldsViewMixin
+from .filters import BookFilterSet
+from .models import Author, AuthorStats, Book, Tombstone, YearStats
+from .pagination import CountedListMixin, KeysetPagination
+from .search import AUTHOR_FTS_TABLE, FullTextSearchFilter
+from .serializers import AuthorSerializer, AuthorStatsSerializer, BookSerializer, YearStatsSerializer
+from .stats import apply_book_changes, deferred_signals, estimate_book_count
+from .suggest import get_suggest_index
+from .sync import SyncTokenExpired, decode_token, read_changes, record_deletions
+from .writequeue import run_write
+
+
+# Versioning shared by the single-book views: one generation counter per row,
+# so If-Match only fails when that book itself changed
+class BookVersionMixin:
+    def get_version_names(self):
+        names = [f"book:{self.kwargs['pk']}"]
+        # ?expand=author embeds the author row, which changes without touching the book's counter
+        options = self.get_serializer_options() if hasattr(self, 'get_serializer_options') else {}
+        if 'author' in options.get('expand', ()):
+            names.append('author')
+        return names
+
+    def get_resource_id(self, request):
+        # ?fields= and ?expand= variants are different representations of the book
+        return f"book:{self.kwargs['pk']}?{normalized_query(request)}"
+
 
 # List all books with filtering, searching, and ordering
-class BookListView(generics.ListAPIView):
+class BookListView(ConditionalGetMixin, CachedResponseMixin, CountedListMixin, SparseFieldsViewMixin,
+                   FacetedListMixin, CompiledListMixin, generics.ListAPIView):
     """
     API endpoint that allows books to be viewed.
 
     Features:
-    - Filtering by title, author name, and publication year using query parameters.
-    - Searching by title and author name using the 'search' query parameter.
-    - Ordering by title and publication year using the 'ordering' query parameter.
+    - Filtering by title, author name, and publication year using query parameters
+      (author name reads the denormalized Book.author_name column, no join).
+    - Full-text prefix search on title and author name using the 'search' query parameter.
+    - Relevance (BM25) ordering of search results with 'ordering=relevance'.
+    - Ordering by title, publication year and author name using the 'ordering' query parameter.
+    - Opt-in keyset pagination using the 'page_size' and 'cursor' query parameters.
+    - Pages carry a 'count': exact up to COUNT_EXACT_THRESHOLD books, above it
+      estimated from the YearStats/AuthorStats counters (see api/pagination.py).
+    - Responses are cached until a Book or Author changes (see api/caching.py).
+    - Strong ETags; 'If-None-Match' returns 304 without querying the database.
+    - Unpaginated lists are serialized from value tuples by a compiled serializer (see api/compiled.py).
+    - Sparse fieldsets with 'fields' and nested authors with 'expand=author'; both narrow the SQL query.
+    - Top-N counts per year and author for the filtered set with 'facets' (see api/facets.py).
 
     Example usage:
     - /api/books/?publication_year=2022
     - /api/books/?search=tolkien
+    - /api/books/?search=hobb&ordering=relevance
     - /api/books/?ordering=-title
+    - /api/books/?ordering=author_name&author__name=Chinua%20Achebe
+    - /api/books/?ordering=publication_year&page_size=100
+    - /api/books/?fields=id,title&expand=author
+    - /api/books/?search=achebe&facets=publication_year,author&page_size=20
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    # session + user + books + count + stats estimate (see perfkit/querybudget.py),
+    # + one UNION ALL with ?facets=
+    query_budget = 6
+    replica_reads = True
+    facet_fields = {'publication_year': ('publication_year', None), 'author': ('author_id', 'author_name')}
 
     # Enable filtering, searching, and ordering
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['title', 'author__name', 'publication_year']
-    search_fields = ['title', 'author__name']
-    ordering_fields = ['title', 'publication_year']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    filterset_class = BookFilterSet
+    search_fields = ['title', 'author_name']  # used by the LIKE fallback on non-SQLite databases
+    ordering_fields = ['title', 'publication_year', 'author_name', 'relevance']
     ordering = ['title']  # default ordering
 
+    def estimate_count(self, queryset):
+        # The stats tables count books per year and per author, not per title or search
+        params = self.request.query_params
+        if params.get('title') or params.get('search'):
+            return None
+        return estimate_book_count(
+            year=params.get('publication_year') or None,
+            author_name=params.get('author__name') or None,
+            using=queryset.db,
+        )
+
 
 # Retrieve details of a single book by ID
-class BookDetailView(generics.RetrieveAPIView):
+class BookDetailView(BookVersionMixin, ConditionalGetMixin, CachedResponseMixin, SparseFieldsViewMixin,
+                     generics.RetrieveAPIView):
     """
     API endpoint to retrieve a single book by its ID.
+    Responses are cached and carry an ETag until the book changes.
+    Accepts the same 'fields' and 'expand' parameters as the list.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = 3
+    replica_reads = True
 
 
 # Create a new book entry
@@ -52,17 +136,32 @@ class BookCreateView(generics.CreateAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # session + user + author + BEGIN + change sequence + insert + one UPDATE per stats table
+    # (three for the first book of a year or author: UPDATE, INSERT OR IGNORE, UPDATE)
+    query_budget = 12
+
+    def perform_create(self, serializer):
+        # On the process's writer thread when WRITE_QUEUE_ENABLED (api/writequeue.py)
+        run_write(serializer.save)
 
 
 # Update an existing book
-class BookUpdateView(generics.UpdateAPIView):
+class BookUpdateView(BookVersionMixin, ConditionalUpdateMixin, generics.UpdateAPIView):
     """
     API endpoint to update an existing book.
     Only authenticated users can update books.
+    Send the ETag from the detail endpoint in 'If-Match' to avoid overwriting
+    a concurrent change (412 Precondition Failed).
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # session + user + book + author + BEGIN + change sequence + update, then
+    # INSERT OR IGNORE and UPDATE per stats table whose key (year, author) changed
+    query_budget = 10
+
+    def perform_update(self, serializer):
+        run_write(serializer.save)
 
 
 # Delete a book
@@ -74,4 +173,388 @@ class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # session + user + book + BEGIN + delete + one UPDATE per stats table + change sequence + tombstone
+    query_budget = 9
+
+    def perform_destroy(self, instance):
+        run_write(instance.delete)
+
+
+# Queryset shared by the author views: counts and nested books in a fixed number of queries
+class AuthorQuerysetMixin:
+    """
+    - `books_count` comes from a COUNT() annotation on the author query.
+    - Nested books are loaded with one prefetch query for the whole page,
+      newest first, and only when the `books` field is part of the response.
+    - `books_limit=N` keeps the N most recent books per author, ranked with a
+      ROW_NUMBER() window inside the same prefetch query.
+    """
+    books_limit_query_param = 'books_limit'
+
+    def get_queryset(self):
+        queryset = Author.objects.annotate(books_count=Count('books'))
+        fields = self.get_serializer_options().get('fields')
+        if not fields or 'books' in fields:
+            newest_first = [F('publication_year').desc(), F('pk').desc()]
+            books = Book.objects.order_by(*newest_first)
+            limit = self.get_books_limit()
+            if limit:
+                books = books.annotate(
+                    author_rank=Window(RowNumber(), partition_by=[F('author_id')], order_by=newest_first),
+                ).filter(author_rank__lte=limit)
+            queryset = queryset.prefetch_related(Prefetch('books', queryset=books))
+        return queryset
+
+    def get_books_limit(self):
+        value = self.request.query_params.get(self.books_limit_query_param)
+        if value is None:
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            raise ValidationError({self.books_limit_query_param: ['Expected a positive integer.']})
+        return limit
+
+
+# List authors with their book counts and books
+class AuthorListView(AuthorQuerysetMixin, ConditionalGetMixin, CachedResponseMixin, SparseFieldsViewMixin,
+                     generics.ListAPIView):
+    """
+    API endpoint that allows authors to be viewed with their books.
+
+    Features:
+    - Two queries per page whatever its size: authors with book counts, then their books.
+    - Cap the nested books per author with 'books_limit'.
+    - Prefix full-text search on the name with 'search' (the api_author_fts index).
+    - Ordering by name, book count or search relevance using the 'ordering' query parameter.
+    - Opt-in keyset pagination, response cache, ETags and sparse fieldsets as for books.
+
+    Example usage:
+    - /api/authors/?page_size=20&books_limit=5
+    - /api/authors/?ordering=-books_count
+    - /api/authors/?search=achebe&ordering=relevance
+    - /api/authors/?fields=id,name,books_count
+    """
+    serializer_class = AuthorSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    query_budget = 4  # session + user + authors + prefetched books
+    replica_reads = True
+    filter_backends = [FullTextSearchFilter, filters.OrderingFilter]
+    fts_table = AUTHOR_FTS_TABLE
+    search_fields = ['name']  # used by the LIKE fallback on non-SQLite databases
+    ordering_fields = ['name', 'books_count', 'relevance']
+    ordering = ['name']
+
+
+# Retrieve a single author with their books
+class AuthorDetailView(AuthorQuerysetMixin, ConditionalGetMixin, CachedResponseMixin, SparseFieldsViewMixin,
+                       generics.RetrieveAPIView):
+    """
+    API endpoint to retrieve a single author by ID, with the same
+    'books_limit', 'fields' parameters and query budget as the list.
+    """
+    serializer_class = AuthorSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = 4
+    replica_reads = True
+
+
+# Books per publication year, read from the incrementally maintained YearStats table
+class YearStatsView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    """
+    API endpoint listing how many books were published each year.
+
+    Features:
+    - Reads one precomputed row per year instead of aggregating api_book.
+    - Ordering by year or count using the 'ordering' query parameter.
+    - Response cache and ETags, invalidated by any book write.
+
+    Example usage:
+    - /api/stats/years/
+    - /api/stats/years/?ordering=-book_count
+    """
+    queryset = YearStats.objects.filter(book_count__gt=0)
+    serializer_class = YearStatsSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['publication_year', 'book_count']
+    ordering = ['publication_year']
+    query_budget = 3  # session + user + stats rows
+    replica_reads = True
+
+
+# Most prolific authors, read from the incrementally maintained AuthorStats table
+class AuthorStatsView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    """
+    API endpoint listing authors by number of books, most prolific first.
+
+    Features:
+    - One indexed range query per page on (book_count, author), joined to the
+      author for its name; no COUNT() over api_book.
+    - Opt-in keyset pagination with 'page_size' and 'cursor'.
+
+    Example usage:
+    - /api/stats/authors/?page_size=10
+    """
+    queryset = AuthorStats.objects.filter(book_count__gt=0).select_related('author').order_by('-book_count', 'pk')
+    serializer_class = AuthorStatsSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    query_budget = 3
+    replica_reads = True
+
+
+# Typeahead suggestions from the in-memory prefix index
+class BookSuggestView(APIView):
+    """
+    API endpoint returning book titles and author names that start with `q`,
+    or have a word starting with it, from the per-process index in api/suggest.py.
+    No database query once the index is built.
+
+    Example usage:
+    - /api/books/suggest/?q=thin
+    - /api/books/suggest/?q=achebe&type=author&limit=5
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 10
+    max_limit = 50
+    # session + user, plus the index build on a process's first lookup
+    query_budget = 4
+    replica_reads = True
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        kinds = {'book': 'b', 'author': 'a'}
+        requested = request.query_params.get('type')
+        if requested and requested not in kinds:
+            raise ValidationError({'type': [f"Choose one of: {', '.join(kinds)}."]})
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        results = get_suggest_index().lookup(
+            query, limit=limit, kinds=(kinds[requested],) if requested else tuple(kinds.values()),
+        )
+        return Response({'query': query, 'results': results})
+
+
+# Books and authors changed since a client's last sync
+class ChangeFeedView(APIView):
+    """
+    API endpoint returning the books and authors created, updated or deleted
+    after a sync token, oldest change first (see api/sync.py).
+
+    Features:
+    - Omit 'since' for a full sync; then pass the 'token' of the last response.
+    - 'limit' changes per page (default 500, at most 5000); follow 'next' while 'has_more'.
+    - Deletes are entries with "deleted": true and no data.
+    - 410 Gone when the token is older than the tombstones still kept: sync from scratch.
+
+    Example usage:
+    - /api/sync/
+    - /api/sync/?since=eyJzIjoxMjN9&limit=1000
+    """
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    default_limit = 500
+    max_limit = 5000
+    # session + user + sequence + books + authors + tombstones
+    query_budget = 6
+    replica_reads = True
+
+    def get(self, request):
+        token = request.query_params.get('since')
+        try:
+            since = decode_token(token) if token else 0
+        except ValueError:
+            raise ValidationError({'since': ["Invalid sync token."]})
+        try:
+            limit = min(max(int(request.query_params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        try:
+            changes, token, has_more = read_changes(since, limit)
+        except SyncTokenExpired:
+            return Response({'detail': "Sync token expired; sync again without 'since'."},
+                            status=status.HTTP_410_GONE)
+        next_url = replace_query_param(request.build_absolute_uri(), 'since', token) if has_more else None
+        return Response({'changes': changes, 'token': token, 'has_more': has_more, 'next': next_url})
+
+
+# Response cache hit/miss counters
+class CacheStatsView(APIView):
+    """
+    API endpoint exposing the response cache hit and miss counters.
+    Only authenticated users can read them.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 2
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+# Create, update or delete many books in one request
+class BookBulkView(generics.GenericAPIView):
+    """
+    API endpoint for batch writes, used by ingestion jobs.
+    Only authenticated users can use it.
+
+    - POST   /api/books/bulk/  [{"title": ..., "publication_year": ..., "author": id}, ...]
+    - PATCH  /api/books/bulk/  [{"id": 1, "title": ...}, ...]
+    - DELETE /api/books/bulk/  {"ids": [1, 2, 3]}
+
+    Each batch is validated with BookSerializer(many=True) and written with
+    bulk_create()/bulk_update() in a single transaction: either every item is
+    saved or none is, and a 400 response lists the errors of each failing item.
+    """
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    max_batch_size = 5000
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return self.error_response(serializer.errors)
+        with transaction.atomic():
+            books = serializer.save()
+        self.invalidate(book.pk for book in books)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or len(items) > self.max_batch_size:
+            raise ValidationError({'detail': f'Expected a list of at most {self.max_batch_size} books.'})
+        books = Book.objects.in_bulk([
+            item['id'] for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)
+        ])
+        missing = {
+            index: {'id': ['Book not found.']}
+            for index, item in enumerate(items)
+            if not isinstance(item, dict) or books.get(item.get('id')) is None
+        }
+        if missing:
+            return self.error_response(missing)
+        # A book listed twice would have its old stats key removed twice
+        seen = set()
+        duplicates = {}
+        for index, item in enumerate(items):
+            if item['id'] in seen:
+                duplicates[index] = {'id': ['Book listed more than once.']}
+            seen.add(item['id'])
+        if duplicates:
+            return self.error_response(duplicates)
+
+        instances = [books[item['id']] for item in items]
+        serializer = self.get_serializer(instances, data=items, many=True, partial=True, max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return self.error_response(serializer.errors)
+        with transaction.atomic():
+            serializer.save()
+        self.invalidate(book.pk for book in instances)
+        return Response(serializer.data)
+
+    def delete(self, request, *args, **kwargs):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if (not isinstance(ids, list) or len(ids) > self.max_batch_size
+                or not all(isinstance(pk, int) for pk in ids)):
+            raise ValidationError({'ids': [f'Expected a list of at most {self.max_batch_size} ids.']})
+        with transaction.atomic(), deferred_signals():
+            books = Book.objects.filter(pk__in=ids)
+            # One grouped stats update and one block of tombstones instead of one per deleted row
+            removed = list(books.values_list('pk', 'author_id', 'publication_year'))
+            deleted, _ = books.delete()
+            apply_book_changes(removed=[(author_id, year) for _, author_id, year in removed])
+            record_deletions(Tombstone.BOOK, [pk for pk, _, _ in removed])
+        return Response({'deleted': deleted})
+
+    def error_response(self, errors):
+        """
+        400 response listing `{"index": i, "errors": {...}}` for each failing item.
+        Accepts both the list and the dict ListSerializer error formats.
+        """
+        if isinstance(errors, list):
+            errors = {index: error for index, error in enumerate(errors) if error}
+        if not all(isinstance(index, int) for index in errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {'errors': [{'index': index, 'errors': error} for index, error in sorted(errors.items())]},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    @staticmethod
+    def invalidate(pks):
+        # bulk_create()/bulk_update() skip model signals
+        bump_generation('book', *(f'book:{pk}' for pk in pks))
+
+
+# Pseudo-buffer for csv.writer: returns each formatted line instead of storing it
+class Echo:
+    def write(self, value):
+        return value
+
+
+# Stream the whole (filtered) catalog as NDJSON or CSV
+class BookExportView(generics.GenericAPIView):
+    """
+    API endpoint that streams books with their author name.
+
+    Rows are read with a chunked iterator and written to a streaming response
+    as they arrive, so memory stays flat for any table size and the first
+    bytes are sent immediately. Accepts the same filters as the books list.
+
+    Example usage:
+    - /api/books/export/                       (NDJSON)
+    - /api/books/export/?output=csv&publication_year=2022
+    """
+    queryset = Book.objects.all()
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter]
+    filterset_class = BookFilterSet
+    search_fields = ['title', 'author_name']
+
+    columns = ['id', 'title', 'publication_year', 'author', 'author_name']
+    content_types = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+    chunk_size = 2000
+    flush_rows = 500
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in self.content_types:
+            raise ValidationError({'output': [f"Choose one of: {', '.join(self.content_types)}."]})
+
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by('pk')
+            .values_list('id', 'title', 'publication_year', 'author_id', 'author_name')
+            .iterator(chunk_size=self.chunk_size)
+        )
+        render = self.render_csv if output == 'csv' else self.render_ndjson
+        response = StreamingHttpResponse(render(rows), content_type=self.content_types[output])
+        response['Content-Disposition'] = f'attachment; filename="books.{output}"'
+        return response
+
+    def render_ndjson(self, rows):
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n')
+            if len(lines) >= self.flush_rows:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
 
+    def render_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns)
+        lines = []
+        for row in rows:
+            lines.append(writer.writerow(row))
+            if len(lines) >= self.flush_rows:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
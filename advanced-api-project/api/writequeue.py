@@ -0,0 +1,209 @@
+"""
+Single-writer queue for database writes.
+
+SQLite lets one connection write at a time. When several request threads
+write at once, each waits for the lock (busy_timeout) and a deferred
+transaction that read before writing can fail straight away with
+"database is locked". With WRITE_QUEUE_ENABLED, views hand their writes to
+`run_write()` instead of running them on the request thread:
+
+- each process starts one writer thread on first use (again after a fork);
+- the writer takes the first queued write, waits at most
+  WRITE_QUEUE_MAX_DELAY seconds for more (up to WRITE_QUEUE_MAX_BATCH), and
+  runs the whole batch in one `BEGIN IMMEDIATE` transaction;
+- every write runs in its own savepoint, so a failing write (a validation or
+  integrity error) is rolled back and re-raised in its request while the rest
+  of the batch commits;
+- the request thread waits for its result (WRITE_QUEUE_TIMEOUT seconds); a
+  write that timed out before it started is dropped, never run late.
+
+Writes run with the request's context variables, so the replica router still
+pins the request that wrote. With the queue disabled (the default, and the
+test settings) `run_write()` simply calls the function.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from contextlib import contextmanager
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_write_queue = None
+
+
+def write_queue_enabled():
+    return getattr(settings, 'WRITE_QUEUE_ENABLED', False)
+
+
+def get_write_queue():
+    """The writer for this process, started on first use."""
+    global _write_queue
+    with _lock:
+        if _write_queue is None or not _write_queue.is_alive():
+            _write_queue = WriteQueue(
+                max_batch=getattr(settings, 'WRITE_QUEUE_MAX_BATCH', 50),
+                max_delay=getattr(settings, 'WRITE_QUEUE_MAX_DELAY', 0.002),
+            )
+            _write_queue.start()
+        return _write_queue
+
+
+def stop_write_queue():
+    """Stop this process's writer after it drains the queue (tests, benchmarks)."""
+    global _write_queue
+    with _lock:
+        writer, _write_queue = _write_queue, None
+    if writer is not None:
+        writer.stop()
+
+
+def run_write(func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` on the writer thread and return its result."""
+    if not write_queue_enabled():
+        return func(*args, **kwargs)
+    return get_write_queue().submit(func, *args, **kwargs).result_or_cancel(
+        getattr(settings, 'WRITE_QUEUE_TIMEOUT', 30),
+    )
+
+
+@contextmanager
+def immediate_transaction(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() that takes SQLite's write lock at BEGIN, so what the
+    block reads cannot change before it writes. A plain atomic() on other
+    databases and inside a transaction that already started.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # Connecting resets transaction_mode from OPTIONS
+    connection.ensure_connection()
+    mode, connection.transaction_mode = connection.transaction_mode, 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+# WriteFuture: result of one queued write
+class WriteFuture(Future):
+    def result_or_cancel(self, timeout):
+        try:
+            return self.result(timeout)
+        except TimeoutError:
+            if self.cancel():
+                raise TimeoutError(f"Write not started within {timeout}s; it was dropped.") from None
+            # Already running: it will finish in its batch, so wait for it
+            return self.result()
+
+
+# WriteQueue: one writer thread committing queued writes in batches
+class WriteQueue:
+    """
+    Features:
+    - One daemon thread and one database connection per process and alias.
+    - Batches of at most `max_batch` writes, collected for at most `max_delay`
+      seconds after the first one arrives; an idle queue adds no delay beyond that.
+    - One transaction (BEGIN IMMEDIATE on SQLite) per batch, one savepoint per write.
+
+    Example usage:
+    - run_write(serializer.save)                      # in a view, with WRITE_QUEUE_ENABLED
+    - get_write_queue().submit(Book.objects.filter(pk=1).update, title='x').result()
+    """
+    def __init__(self, max_batch=50, max_delay=0.002, using=DEFAULT_DB_ALIAS):
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self.using = using
+        self.pid = os.getpid()
+        self.batches = self.writes = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=f'write-queue-{using}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def is_alive(self):
+        # Threads do not survive a fork: a worker forked after first use needs its own
+        return self.pid == os.getpid() and self._thread.is_alive()
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def submit(self, func, *args, **kwargs):
+        future = WriteFuture()
+        self._queue.put((future, copy_context(), func, args, kwargs))
+        return future
+
+    def _run(self):
+        try:
+            while True:
+                batch, stopping = self._collect()
+                if batch:
+                    self._write(batch)
+                if stopping:
+                    return
+        finally:
+            connections[self.using].close()
+
+    def _collect(self):
+        """Block for the first write, then gather more until the batch is full or the delay is up."""
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch):
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        connection = connections[self.using]
+        results = []
+        try:
+            connection.close_if_unusable_or_obsolete()
+            connection.ensure_connection()
+            if connection.vendor == 'sqlite':
+                # Take the write lock at BEGIN: a deferred transaction that reads
+                # first cannot wait for the lock when it later writes
+                connection.transaction_mode = 'IMMEDIATE'
+            with transaction.atomic(using=self.using):
+                for future, context, func, args, kwargs in batch:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            results.append((future, context.run(func, *args, **kwargs), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+        except Exception as exc:
+            # The batch did not commit: every write in it failed
+            logger.warning("Write batch of %d failed", len(batch), exc_info=True)
+            for future, *_ in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, exc in results:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'progress', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    readonly_fields = ['claim_token', 'worker', 'heartbeat_at', 'started_at', 'finished_at']
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_process(name, stop, poll_interval, burst):
+    """Entry point of one worker process."""
+    # The parent handles Ctrl-C and SIGTERM and tells workers to finish their job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import django
+    django.setup()  # a no-op after fork; needed when processes are spawned
+    from jobs.queue import work
+
+    work(name, stop, poll_interval=poll_interval, burst=burst)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a pool of worker processes that claim and run queued jobs (jobs.models.Job). "
+        "Ctrl-C or SIGTERM lets running jobs finish, then stops."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOBS_WORKERS', 2),
+                            help="Worker processes; 0 runs jobs in this process.")
+        parser.add_argument('--poll-interval', type=float, default=getattr(settings, 'JOBS_POLL_INTERVAL', 1.0),
+                            help="Seconds an idle worker waits before looking for jobs again.")
+        parser.add_argument('--burst', action='store_true', help="Exit once no job is due.")
+
+    def handle(self, *args, **options):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        poll_interval, burst = options['poll_interval'], options['burst']
+        if options['workers'] <= 0:
+            from jobs.queue import work
+
+            processed = work(prefix, poll_interval=poll_interval, burst=burst)
+            self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs."))
+            return
+
+        stop = multiprocessing.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        # Children must not share the parent's SQLite handles
+        connections.close_all()
+
+        def start(index):
+            process = multiprocessing.Process(
+                target=worker_process, args=(f"{prefix}/{index}", stop, poll_interval, burst),
+                name=f"job-worker-{index}",
+            )
+            process.start()
+            return process
+
+        processes = [start(index) for index in range(options['workers'])]
+        self.stdout.write(f"Started {len(processes)} workers (pids {', '.join(str(p.pid) for p in processes)})")
+        while any(process.is_alive() for process in processes):
+            if stop.wait(1):
+                break
+            for index, process in enumerate(processes):
+                if not burst and not process.is_alive():
+                    # A crashed worker's job is requeued once its heartbeat goes stale
+                    self.stderr.write(f"Worker {index} exited with {process.exitcode}; restarting it")
+                    processes[index] = start(index)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
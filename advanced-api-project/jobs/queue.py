@@ -0,0 +1,244 @@
+"""
+Database-backed job queue.
+
+`enqueue()` inserts a Job row; worker processes started by
+`python manage.py run_workers` claim and run them. No broker is involved:
+
+- Claiming is a conditional UPDATE (`... SET status='running' WHERE id = ?
+  AND status = 'queued'`). SQLite runs each UPDATE under its write lock, so
+  when two workers race for the same row exactly one sees a changed row; the
+  other moves on to the next candidate.
+- A failed run is retried after JOBS_RETRY_DELAY * 2 ** (attempt - 1)
+  seconds (at most JOBS_RETRY_MAX_DELAY) until the job's max_attempts.
+- A running job's worker refreshes heartbeat_at every JOBS_HEARTBEAT_INTERVAL
+  seconds. Jobs whose heartbeat is older than JOBS_STALE_AFTER (the worker was
+  killed) are queued again, counting as a failed attempt. A heartbeat that
+  fails (e.g. "database is locked") is logged and retried at the next beat.
+- Tasks report progress through `job.report_progress(done, total, message)`.
+  Once another worker has reclaimed the job, progress reports raise
+  JobReclaimed; long tasks also call `job.check_owned()` before committing
+  work, so a run that lost its job stops instead of repeating the new owner's work.
+"""
+import logging
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+# Due jobs fetched per claim attempt; racing workers fall through to the next one
+CLAIM_CANDIDATES = 5
+
+
+class JobReclaimed(Exception):
+    """The job was requeued or claimed by another worker while this run was executing."""
+
+
+def enqueue(task_name, kwargs=None, max_attempts=None, run_at=None, created_by=None):
+    """Queue a call of the registered task `task_name`; KeyError for unknown tasks."""
+    registered = get_task(task_name)
+    return Job.objects.create(
+        task=registered.name,
+        kwargs=kwargs or {},
+        max_attempts=max_attempts or registered.max_attempts,
+        run_at=run_at or timezone.now(),
+        created_by=created_by,
+    )
+
+
+def retry_delay(attempt):
+    """Seconds before retry number `attempt` (1-based)."""
+    base = getattr(settings, 'JOBS_RETRY_DELAY', 5)
+    return min(base * 2 ** (attempt - 1), getattr(settings, 'JOBS_RETRY_MAX_DELAY', 600))
+
+
+def claim_job(worker):
+    """Claim the next due job for `worker`, or return None when nothing is due."""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        .order_by('run_at', 'pk').values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+    )
+    for pk in candidates:
+        token = uuid.uuid4().hex
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, claim_token=token, worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, progress=0.0, progress_message='',
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale():
+    """Release jobs whose worker stopped sending heartbeats; returns (requeued, failed)."""
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=getattr(settings, 'JOBS_STALE_AFTER', 60)),
+    )
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, claim_token='', run_at=now, error='Worker stopped responding.',
+    )
+    failed = stale.update(
+        status=Job.FAILED, claim_token='', finished_at=now, error='Worker stopped responding.',
+    )
+    return requeued, failed
+
+
+# JobContext: what a task sees of its job while it runs
+class JobContext:
+    """
+    Features:
+    - Attributes of the Job row (pk, kwargs, attempts, ...) are available as usual.
+    - `report_progress()` stores the fraction done and a message, at most every
+      `progress_interval` seconds (and always on completion), and counts as a heartbeat.
+    - `still_owned()` / `check_owned()` tell a long task whether another worker
+      has reclaimed the job; reports raise JobReclaimed once the heartbeat saw it.
+
+    Example usage:
+    - job.report_progress(500, 2000, "Exported 500 of 2000 books")
+    - job.report_progress(0.5)
+    - with transaction.atomic(): ...; job.check_owned()
+    """
+    progress_interval = 0.5
+
+    def __init__(self, job):
+        self.job = job
+        self.owned = True
+        self._last_report = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.job, name)
+
+    def update(self, **fields):
+        """Write `fields` if this run still owns the job; False once it was reclaimed."""
+        updated = bool(Job.objects.filter(pk=self.job.pk, claim_token=self.job.claim_token).update(**fields))
+        if not updated:
+            self.owned = False
+        return updated
+
+    def still_owned(self):
+        """Whether the Job row still carries this run's claim token (one query until it does not)."""
+        if self.owned:
+            self.owned = Job.objects.filter(pk=self.job.pk, claim_token=self.job.claim_token).exists()
+        return self.owned
+
+    def check_owned(self):
+        """Raise JobReclaimed if another worker took the job; inside a transaction it rolls the work back."""
+        if not self.still_owned():
+            raise JobReclaimed(f"Job {self.job.pk} was reclaimed by another worker.")
+
+    def report_progress(self, done, total=None, message=''):
+        if not self.owned:
+            raise JobReclaimed(f"Job {self.job.pk} was reclaimed by another worker.")
+        fraction = min(max(done / total if total else done, 0.0), 1.0)
+        now = time.monotonic()
+        if fraction < 1.0 and now - self._last_report < self.progress_interval:
+            return
+        self._last_report = now
+        self.job.progress, self.job.progress_message = fraction, message[:200]
+        if not self.update(progress=fraction, progress_message=message[:200], heartbeat_at=timezone.now()):
+            raise JobReclaimed(f"Job {self.job.pk} was reclaimed by another worker.")
+
+
+def _heartbeat(context, stopped):
+    interval = getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', 10)
+    try:
+        while not stopped.wait(interval):
+            try:
+                if not context.update(heartbeat_at=timezone.now()):
+                    # Reclaimed: the task sees it through context.owned
+                    return
+            except DatabaseError:
+                # A missed beat is retried; stopping here would get the job reclaimed while it runs
+                logger.warning("Heartbeat of job %s failed", context.job.pk, exc_info=True)
+                close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome; returns the job's new status."""
+    context = JobContext(job)
+    try:
+        task = get_task(job.task)
+    except KeyError:
+        # Enqueued by a newer deployment, or the task was removed: retrying cannot help
+        context.update(
+            status=Job.FAILED, error=f"Unknown task {job.task!r}.", finished_at=timezone.now(), claim_token='',
+        )
+        return Job.FAILED
+    stopped = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(context, stopped), daemon=True)
+    heartbeat.start()
+    try:
+        result = task(context, **job.kwargs)
+    except JobReclaimed:
+        # The new owner records the outcome
+        logger.warning("Job %s (%s) was reclaimed by another worker; stopped this run", job.pk, job.task)
+        status = Job.objects.filter(pk=job.pk).values_list('status', flat=True).first()
+    except Exception as exc:
+        status = fail_job(context, exc)
+    else:
+        status = Job.SUCCEEDED
+        context.update(
+            status=status, result=result, error='', progress=1.0, finished_at=timezone.now(), claim_token='',
+        )
+    finally:
+        stopped.set()
+        heartbeat.join()
+    return status
+
+
+def fail_job(context, exc):
+    job = context.job
+    error = ''.join(traceback.format_exception(exc))
+    if job.attempts < job.max_attempts:
+        delay = retry_delay(job.attempts)
+        logger.warning("Job %s (%s) failed, retrying in %ss", job.pk, job.task, delay, exc_info=exc)
+        context.update(
+            status=Job.QUEUED, error=error, claim_token='', run_at=timezone.now() + timedelta(seconds=delay),
+        )
+        return Job.QUEUED
+    logger.error("Job %s (%s) failed", job.pk, job.task, exc_info=exc)
+    context.update(status=Job.FAILED, error=error, finished_at=timezone.now(), claim_token='')
+    return Job.FAILED
+
+
+def work(worker, stop=None, poll_interval=1.0, burst=False):
+    """
+    Claim and run jobs until `stop` (a threading/multiprocessing Event) is set,
+    or, with `burst`, until no job is due. Returns the number of jobs run.
+    """
+    stop = stop or threading.Event()
+    processed = 0
+    next_stale_check = 0.0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            if time.monotonic() >= next_stale_check:
+                requeue_stale()
+                next_stale_check = time.monotonic() + getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', 10)
+            job = claim_job(worker)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            logger.info("%s running job %s (%s)", worker, job.pk, job.task)
+            run_job(job)
+            processed += 1
+    finally:
+        connections.close_all()
+    return processed
@@ -0,0 +1,48 @@
+"""
+Task registry.
+
+Any installed app can define tasks in a `tasks.py` module (imported by
+JobsConfig.ready()):
+
+    from jobs.registry import task
+
+    @task(max_attempts=5)
+    def rebuild_stats(job):
+        job.report_progress(0, 1, "Rebuilding")
+        ...
+        return {"years": 125}
+
+A task receives the running JobContext plus the job's kwargs and returns a
+JSON-serializable result.
+"""
+
+_tasks = {}
+
+
+# Task: a registered function with its retry policy
+class Task:
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+
+def task(func=None, *, name=None, max_attempts=3):
+    """Register `func` as a task, under its function name unless `name` is given."""
+    def register(func):
+        registered = Task(func, name or func.__name__, max_attempts)
+        _tasks[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    """The registered Task called `name`; KeyError when there is none."""
+    return _tasks[name]
+
+
+def task_names():
+    return sorted(_tasks)
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from .models import Job
+from .registry import task_names
+
+
+# JobSerializer: enqueue with task + kwargs, poll everything else
+class JobSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='job-detail')
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'url', 'task', 'kwargs', 'status', 'progress', 'progress_message', 'result', 'error',
+            'attempts', 'max_attempts', 'run_at', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'progress', 'progress_message', 'result', 'error', 'attempts', 'run_at',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        extra_kwargs = {'max_attempts': {'required': False, 'min_value': 1, 'max_value': 20}}
+
+    def validate_task(self, value):
+        if value not in task_names():
+            raise serializers.ValidationError(f"Unknown task. Available tasks: {', '.join(task_names())}.")
+        return value
+
+    def validate_kwargs(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of keyword arguments.")
+        return value
@@ -0,0 +1,181 @@
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.caching import get_generation
+from api.models import Author, Book
+from jobs.models import Job
+from jobs.queue import JobContext, JobReclaimed, _heartbeat, claim_job, enqueue, requeue_stale, retry_delay, run_job
+from jobs.registry import task
+
+
+@task(name='tests.add')
+def add(job, a, b):
+    job.report_progress(1, 2, "Halfway")
+    return a + b
+
+
+@task(name='tests.flaky', max_attempts=2)
+def flaky(job):
+    raise RuntimeError("Temporary failure")
+
+
+@override_settings(JOBS_RETRY_DELAY=5, JOBS_STALE_AFTER=60)
+class JobQueueTestCase(TestCase):
+    def test_claim_and_run(self):
+        job = enqueue('tests.add', {'a': 2, 'b': 3})
+        claimed = claim_job('worker-1')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, Job.RUNNING, 1))
+        # A claimed job is not handed out twice
+        self.assertIsNone(claim_job('worker-2'))
+
+        self.assertEqual(run_job(claimed), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.progress), (Job.SUCCEEDED, 5, 1.0))
+        self.assertEqual(job.progress_message, "Halfway")
+        self.assertEqual(job.claim_token, '')
+
+    def test_retries_with_backoff(self):
+        job = enqueue('tests.flaky')
+        self.assertEqual(job.max_attempts, 2)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(run_job(claim_job('worker-1')), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn("Temporary failure", job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=4))
+        # Not due yet
+        self.assertIsNone(claim_job('worker-1'))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(run_job(claim_job('worker-1')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual([retry_delay(attempt) for attempt in (1, 2, 3)], [5, 10, 20])
+
+    def test_stale_jobs_are_requeued(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        claimed = claim_job('worker-1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(requeue_stale(), (1, 0))
+        self.assertEqual(claim_job('worker-2').pk, job.pk)
+        # The first worker lost the job: its outcome is not recorded
+        run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (Job.RUNNING, 'worker-2'))
+
+    @override_settings(JOBS_HEARTBEAT_INTERVAL=0.01)
+    def test_heartbeat_outlives_database_errors(self):
+        context = JobContext(enqueue('tests.add', {'a': 1, 'b': 1}))
+        beats = [DatabaseError("database is locked"), True, False]
+        with mock.patch.object(context, 'update', side_effect=beats) as update:
+            with self.assertLogs('jobs.queue', 'WARNING'):
+                heartbeat = threading.Thread(target=_heartbeat, args=(context, threading.Event()))
+                heartbeat.start()
+                heartbeat.join(5)
+        # It kept beating after the error and stopped once the job was reclaimed
+        self.assertEqual(update.call_count, 3)
+
+    def test_reclaimed_run_stops(self):
+        job = enqueue('tests.add', {'a': 1, 'b': 1})
+        context = JobContext(claim_job('worker-1'))
+        self.assertTrue(context.still_owned())
+        Job.objects.filter(pk=job.pk).update(claim_token='worker-2-token', worker='worker-2')
+        self.assertFalse(context.still_owned())
+        with self.assertRaises(JobReclaimed):
+            context.report_progress(1.0)
+
+    def test_unknown_task_fails_without_retry(self):
+        job = Job.objects.create(task='tests.removed')
+        self.assertEqual(run_job(claim_job('worker-1')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.error, "Unknown task 'tests.removed'.")
+
+    def test_run_workers_in_process(self):
+        author = Author.objects.create(name="Buchi Emecheta")
+        Book.objects.create(title="The Joys of Motherhood", publication_year=1979, author=author)
+        job = enqueue('rebuild_stats')
+        out = StringIO()
+        call_command('run_workers', '--workers', '0', '--burst', stdout=out)
+        self.assertIn("Ran 1 jobs.", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'years': 1, 'authors': 1}))
+
+
+class JobAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(username='admin', password='pass')
+
+    def test_enqueue_and_poll(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/jobs/', {'task': 'tests.add', 'kwargs': {'a': 1, 'b': 2}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Location'], response.data['url'])
+        self.assertEqual((response.data['status'], response.data['max_attempts']), (Job.QUEUED, 3))
+
+        response = self.client.get(response['Location'])
+        self.assertEqual(response['Retry-After'], '1')
+        run_job(claim_job('worker-1'))
+        response = self.client.get(f"/api/jobs/{response.data['id']}/")
+        self.assertEqual((response.data['status'], response.data['result']), (Job.SUCCEEDED, 3))
+        self.assertNotIn('Retry-After', response)
+
+        response = self.client.post('/api/jobs/', {'task': 'rm -rf'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='reader', password='pass'))
+        self.assertEqual(self.client.get('/api/jobs/').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.post('/api/jobs/', {'task': 'rebuild_stats'}).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+
+class CatalogTasksTestCase(TestCase):
+    def test_export_rejects_unknown_filters(self):
+        job = enqueue('export_books', {'publication_year__gte': 2000}, max_attempts=1)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(run_job(claim_job('worker-1')), Job.FAILED)
+        job.refresh_from_db()
+        self.assertIn("Unknown filter(s): publication_year__gte", job.error)
+
+    def test_rebuild_stats_invalidates_cached_stats(self):
+        generation = get_generation('book')
+        enqueue('rebuild_stats')
+        self.assertEqual(run_job(claim_job('worker-1')), Job.SUCCEEDED)
+        self.assertNotEqual(get_generation('book'), generation)
+
+    def test_import_reads_only_from_the_import_dir(self):
+        with tempfile.TemporaryDirectory() as root:
+            with open(os.path.join(root, 'books.csv'), 'w') as handle:
+                handle.write("title,publication_year,author\nSula,1973,Toni Morrison\n")
+            with self.settings(JOBS_IMPORT_DIR=root):
+                job = enqueue('import_books', {'path': 'books.csv'})
+                self.assertEqual(run_job(claim_job('worker-1')), Job.SUCCEEDED)
+                self.assertTrue(Book.objects.filter(title="Sula").exists())
+
+                # A run that lost its job to another worker imports nothing
+                job = enqueue('import_books', {'path': 'books.csv'})
+                claimed = claim_job('worker-1')
+                Job.objects.filter(pk=job.pk).update(claim_token='worker-2-token', worker='worker-2')
+                with self.assertLogs('jobs.queue', 'WARNING'):
+                    self.assertEqual(run_job(claimed), Job.RUNNING)
+                self.assertEqual(Book.objects.filter(title="Sula").count(), 1)
+
+                for path in ('../books.csv', '/etc/passwd'):
+                    job = enqueue('import_books', {'path': path}, max_attempts=1)
+                    with self.assertLogs('jobs.queue', 'ERROR'):
+                        self.assertEqual(run_job(claim_job('worker-1')), Job.FAILED)
+                    job.refresh_from_db()
+                    self.assertIn("must be inside JOBS_IMPORT_DIR", job.error)
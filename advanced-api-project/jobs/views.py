@@ -0,0 +1,57 @@
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+
+from .models import Job
+from .queue import enqueue
+from .serializers import JobSerializer
+
+
+# List and enqueue jobs
+class JobListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint to queue a background job and list recent ones (admins only).
+
+    Example usage:
+    - POST /api/jobs/ {"task": "rebuild_stats"}
+    - POST /api/jobs/ {"task": "export_books", "kwargs": {"output": "csv"}}
+    - GET  /api/jobs/?status=running
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        job_status = self.request.query_params.get('status')
+        return queryset.filter(status=job_status) if job_status else queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue(
+            serializer.validated_data['task'],
+            kwargs=serializer.validated_data.get('kwargs'),
+            max_attempts=serializer.validated_data.get('max_attempts'),
+            created_by=request.user,
+        )
+        data = self.get_serializer(job).data
+        # 202: the work happens later; poll the Location for progress and the result
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+# Poll one job
+class JobDetailView(generics.RetrieveAPIView):
+    """
+    API endpoint returning a job's status, progress and, once finished, its
+    result or error. Unfinished jobs carry `Retry-After` as a polling hint.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    poll_interval = 1  # seconds
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data['status'] not in (Job.SUCCEEDED, Job.FAILED):
+            response['Retry-After'] = str(self.poll_interval)
+        return response
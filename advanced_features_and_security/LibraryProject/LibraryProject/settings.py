@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,10 +18,13 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'bookshelf',  # Ensure bookshelf is listed
+    'perfkit',
 ]
 
 # ✅ Middleware
 MIDDLEWARE = [
+    'perfkit.querybudget.QueryBudgetMiddleware',
+    'perfkit.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,6 +58,25 @@ DATABASES = {
     }
 }
 
+# SQLite connection profile (perfkit/sqliteprofile.py): overrides of DEFAULT_PRAGMAS
+SQLITE_PRAGMAS = {}
+SQLITE_MAINTENANCE_INTERVAL = 300  # seconds between PRAGMA optimize + WAL checkpoint; 0 disables
+
+# Counts of admin changelists (perfkit/counting.py)
+COUNT_STRATEGY = 'auto'
+COUNT_EXACT_THRESHOLD = 10_000
+
+# Read replicas (perfkit/replicas.py): aliases such as ['replica']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_SECONDS = 5  # read-your-writes window after a request writes
+for _alias in DATABASE_REPLICAS:
+    DATABASES[_alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.{_alias}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['perfkit.replicas.ReplicaRouter']
+
 # ✅ Password Validators
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -99,3 +122,10 @@ SECURE_BROWSER_XSS_FILTER = True
 
 # Prevent clickjacking by disallowing framing
 X_FRAME_OPTIONS = 'DENY'
+
+# Query budgets and N+1 detection (perfkit/querybudget.py): strict under the
+# test runner or with QUERY_BUDGET_STRICT=1
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+TEST_RUNNER = 'perfkit.testrunner.QueryBudgetTestRunner'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
@@ -2,11 +2,14 @@ from django.contrib import admin
 from .models import Book
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from perfkit.counting import CountingAdminMixin
 from .models import CustomUser
 
 # Custom admin for our CustomUser model
-class CustomUserAdmin(UserAdmin):
+# (counted exactly up to COUNT_EXACT_THRESHOLD users, estimated above; see perfkit/counting.py)
+class CustomUserAdmin(CountingAdminMixin, UserAdmin):
     model = CustomUser
+    count_strategy = 'auto'
     list_display = ('username', 'email', 'date_of_birth', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_active', 'date_of_birth')
     fieldsets = (
@@ -26,7 +29,8 @@ class CustomUserAdmin(UserAdmin):
 admin.site.register(CustomUser, CustomUserAdmin)
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(CountingAdminMixin, admin.ModelAdmin):
+    count_strategy = 'auto'                                 # Exact count up to COUNT_EXACT_THRESHOLD books, estimated above
     list_display = ('title', 'author', 'publication_year')  # Shows these columns in admin list view
     list_filter = ('author', 'publication_year')           # Adds filter sidebar by author and year
     search_fields = ('title', 'author')                    # Enables search by title and author
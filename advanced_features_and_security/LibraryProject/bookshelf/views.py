@@ -1,5 +1,6 @@
 from django.contrib.auth.decorators import permission_required
 from django.shortcuts import render
+from perfkit.querybudget import query_budget
 from .models import Book
 from .forms import ExampleForm
 def book_list(request):
@@ -8,6 +9,7 @@ def book_list(request):
     return render(request, 'bookshelf/book_list.html', {'books': books})
 
 @permission_required('bookshelf.can_view', raise_exception=True)
+@query_budget(5)  # session + user + user/group permissions + books
 def book_list(request):
     books = Book.objects.all()
     return render(request, 'bookshelf/book_list.html', {'books': books})
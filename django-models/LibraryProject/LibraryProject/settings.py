@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,10 +39,13 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'relationship_app',
+    'perfkit',
 ]
 
 
 MIDDLEWARE = [
+    'perfkit.querybudget.QueryBudgetMiddleware',
+    'perfkit.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +85,21 @@ DATABASES = {
     }
 }
 
+# SQLite connection profile (perfkit/sqliteprofile.py): overrides of DEFAULT_PRAGMAS
+SQLITE_PRAGMAS = {}
+SQLITE_MAINTENANCE_INTERVAL = 300  # seconds between PRAGMA optimize + WAL checkpoint; 0 disables
+
+# Read replicas (perfkit/replicas.py): aliases such as ['replica']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_SECONDS = 5  # read-your-writes window after a request writes
+for _alias in DATABASE_REPLICAS:
+    DATABASES[_alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.{_alias}.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['perfkit.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,3 +142,9 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Query budgets and N+1 detection (perfkit/querybudget.py): strict under the
+# test runner or with QUERY_BUDGET_STRICT=1
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+TEST_RUNNER = 'perfkit.testrunner.QueryBudgetTestRunner'
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 5
@@ -3,6 +3,8 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.decorators import permission_required
+from perfkit.querybudget import query_budget
+from perfkit.replicas import replica_reads
 from .models import Book, UserProfile
 from .forms import BookForm
 
@@ -53,9 +55,12 @@ def register_view(request):
 # 🔹 Book Listing
 # ==============================
 @login_required
+@query_budget(3)  # session + user + books
+@replica_reads
 def list_books(request):
     """Displays a list of all books."""
-    books = Book.objects.all()
+    # The template prints book.author.name: join the authors instead of one query per book
+    books = Book.objects.select_related('author')
     return render(request, 'relationship_app/list_books.html', {'books': books})
 
 # ==============================
@@ -0,0 +1,16 @@
+"""
+Performance modules shared by the Django projects of this repository.
+
+- querybudget: per-request query budgets and N+1 detection (QUERY_BUDGET_*);
+- sqliteprofile: pragmas and periodic maintenance for every SQLite
+  connection (SQLITE_PRAGMAS, SQLITE_MAINTENANCE_INTERVAL);
+- replicas: read replicas with read-your-writes (DATABASE_REPLICAS,
+  DATABASE_REPLICA_*) and the `sync_replicas` command;
+- counting: counting strategies for paginated lists and admin changelists
+  (COUNT_STRATEGY, COUNT_EXACT_THRESHOLD).
+
+Install it with `pip install -e .` from the repository root (pyproject.toml)
+and list 'perfkit' in INSTALLED_APPS: the app applies the SQLite profile to
+new connections and provides the `sync_replicas` command. Each module
+documents its settings; perfkit.testrunner makes query budgets strict in tests.
+"""
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PerfkitConfig(AppConfig):
+    name = 'perfkit'
+
+    def ready(self):
+        # Apply the tuned SQLite connection profile to every new connection
+        from . import sqliteprofile  # noqa: F401
@@ -0,0 +1,175 @@
+"""
+Counting strategies for paginated lists and admin changelists.
+
+A plain COUNT(*) reads every row of the filtered set, which on a large table
+costs more than the page itself. `count_queryset()` counts with one of:
+
+- 'exact': COUNT(*), whatever the size;
+- 'auto': exact up to COUNT_EXACT_THRESHOLD rows, counted over at most
+  threshold + 1 rows (`SELECT COUNT(*) FROM (... LIMIT n)`), so the count
+  stops early on large sets; above the threshold, the estimate;
+- 'estimated': the estimate straight away, counting like 'auto' only when
+  there is none;
+- 'has_more': no count at all; clients follow the `next` link.
+
+Estimates come from maintained counters: the `estimate` callback of the
+caller (a counter table the app keeps up to date), or for an
+unfiltered queryset the table's row count in the database statistics
+(sqlite_stat1, refreshed by the PRAGMA optimize of sqliteprofile.py, or
+pg_class.reltuples on PostgreSQL). A set known to be over the threshold
+without any estimate is reported as 'more_than' the threshold.
+
+Views choose a strategy with a `count_strategy` attribute, ModelAdmins with
+CountingAdminMixin; COUNT_STRATEGY is the default.
+"""
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+EXACT = 'exact'
+AUTO = 'auto'
+ESTIMATED = 'estimated'
+HAS_MORE = 'has_more'
+STRATEGIES = (EXACT, AUTO, ESTIMATED, HAS_MORE)
+# Count type of a set known to hold more rows than the threshold, with no estimate
+MORE_THAN = 'more_than'
+
+
+# ListCount: a row count and how it was obtained ('exact', 'estimated' or 'more_than')
+class ListCount(NamedTuple):
+    value: int
+    type: str
+
+
+def get_strategy(strategy=None):
+    strategy = strategy or getattr(settings, 'COUNT_STRATEGY', AUTO)
+    if strategy not in STRATEGIES:
+        raise ImproperlyConfigured(
+            f"Unknown count strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}."
+        )
+    return strategy
+
+
+def get_threshold():
+    return getattr(settings, 'COUNT_EXACT_THRESHOLD', 10_000)
+
+
+def count_queryset(queryset, strategy=None, estimate=None, threshold=None):
+    """
+    ListCount of `queryset` with `strategy`, or None for 'has_more'.
+    `estimate(queryset)` returns a maintained count for the set, or None.
+    """
+    strategy = get_strategy(strategy)
+    if strategy == HAS_MORE:
+        return None
+    if strategy == EXACT:
+        return ListCount(queryset.count(), EXACT)
+
+    threshold = get_threshold() if threshold is None else threshold
+    value = None
+    if strategy == ESTIMATED:
+        value = estimate_rows(queryset, estimate)
+        if value is not None:
+            return ListCount(value, ESTIMATED)
+
+    bounded = queryset.order_by()[:threshold + 1].count()
+    if bounded <= threshold:
+        return ListCount(bounded, EXACT)
+    if strategy == AUTO:
+        value = estimate_rows(queryset, estimate)
+    if value is None:
+        return ListCount(threshold, MORE_THAN)
+    # Counters that lag behind still count at least what was just seen
+    return ListCount(max(value, bounded), ESTIMATED)
+
+
+def estimate_rows(queryset, estimate=None):
+    value = estimate(queryset) if estimate is not None else None
+    return estimate_table_rows(queryset) if value is None else value
+
+
+def estimate_table_rows(queryset):
+    """Row count of an unfiltered queryset's table from the database statistics, or None."""
+    query = queryset.query
+    if query.where or query.is_sliced or query.distinct or query.combinator or query.group_by is not None:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        # Every row for a table starts with its row count as of the last ANALYZE / PRAGMA optimize
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 only exists once the database has been analyzed
+        return None
+    if row is None:
+        return None
+    value = int(str(row[0]).split()[0])
+    return value if value >= 0 else None
+
+
+# CountingPaginator: Django Paginator whose count follows a counting strategy
+class CountingPaginator(Paginator):
+    """
+    Features:
+    - `count` is exact below COUNT_EXACT_THRESHOLD and estimated above it
+      (strategy 'auto'), so changelists of large tables skip the full COUNT(*).
+    - `count_type` tells templates whether `count` is exact.
+    - Page links need a count, so 'has_more' counts like 'auto' here.
+
+    Example usage:
+    - CountingPaginator(Book.objects.all(), 100, count_strategy='estimated')
+    """
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True,
+                 count_strategy=None, estimate=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        strategy = get_strategy(count_strategy)
+        self.count_strategy = AUTO if strategy == HAS_MORE else strategy
+        self.estimate = estimate
+
+    @cached_property
+    def list_count(self):
+        if not hasattr(self.object_list, 'query'):
+            return ListCount(len(self.object_list), EXACT)
+        return count_queryset(self.object_list, self.count_strategy, self.estimate)
+
+    @cached_property
+    def count(self):
+        return self.list_count.value
+
+    @property
+    def count_type(self):
+        return self.list_count.type
+
+
+# CountingAdminMixin: changelists counted with a counting strategy
+class CountingAdminMixin:
+    """
+    Features:
+    - `count_strategy` per ModelAdmin (default COUNT_STRATEGY).
+    - `estimate_count(queryset)` hook for counters maintained by the app.
+    - No second COUNT(*) of the whole table for the "(N total)" label.
+
+    Example usage:
+    - class BookAdmin(CountingAdminMixin, admin.ModelAdmin): count_strategy = 'auto'
+    """
+    count_strategy = None
+    show_full_result_count = False
+
+    def estimate_count(self, queryset):
+        return None
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return CountingPaginator(queryset, per_page, orphans, allow_empty_first_page,
+                                 count_strategy=self.count_strategy, estimate=self.estimate_count)
@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perfkit.replicas import get_replicas, sync_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary into each DATABASE_REPLICAS file with the online backup API, "
+        "once or every --interval seconds (a local stand-in for replication)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', nargs='+', help="Replica aliases (default: DATABASE_REPLICAS).")
+        parser.add_argument('--pages', type=int, default=256, help="Pages copied per backup step.")
+        parser.add_argument('--interval', type=float, default=0, help="Repeat every N seconds (0: once).")
+
+    def handle(self, *args, **options):
+        aliases = options['alias'] or get_replicas()
+        if not aliases:
+            raise CommandError("No replicas configured: set DATABASE_REPLICAS in settings.")
+        unknown = set(aliases) - set(get_replicas())
+        if unknown:
+            raise CommandError(f"Not in DATABASE_REPLICAS: {', '.join(sorted(unknown))}.")
+        while True:
+            try:
+                results = sync_replicas(aliases, options['pages'])
+            except (ValueError, sqlite3.OperationalError) as exc:
+                raise CommandError(str(exc))
+            for alias, (pages, seconds) in results.items():
+                self.stdout.write(f"{alias}: {pages} pages in {seconds * 1000:.0f}ms")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,205 @@
+"""
+Per-request query budgets and N+1 detection.
+
+QueryBudgetMiddleware records every SQL query a request runs, groups them by
+shape (the SQL with its literal values stripped) and reports:
+
+- N+1 patterns: one shape repeated QUERY_BUDGET_N_PLUS_ONE_THRESHOLD times or
+  more, with the application stack that issued it first;
+- budget overruns: more queries than the view declared with `@query_budget(n)`
+  (function views) or a `query_budget = n` attribute (class-based views).
+
+Problems raise QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (under
+perfkit.testrunner.QueryBudgetTestRunner, or QUERY_BUDGET_STRICT=1 in the
+environment) and are logged as warnings otherwise. Tests can also check a block
+of code directly with `QueryBudgetTestMixin.assertQueryBudget()`.
+"""
+import logging
+import re
+import time
+import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Recorders active in the current context. Async views query from
+# sync_to_async threads, which inherit the context but have their own connections
+_recorders = ContextVar('query_recorders', default=())
+
+_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                      # string literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),                   # numbers
+    (re.compile(r'%s'), '?'),                                  # unexpanded placeholders
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),      # IN (?, ?, ...) of any length
+]
+
+
+def normalize_sql(sql):
+    """Query shape: `sql` without literal values, so repeated lookups compare equal."""
+    for pattern, replacement in _LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return ' '.join(sql.split())
+
+
+def application_stack():
+    """Frames of the calling code that belong to the project, innermost last."""
+    base_dir = str(getattr(settings, 'BASE_DIR', ''))
+    frames = traceback.extract_stack()[:-3]
+    return [
+        f"{frame.filename}:{frame.lineno} in {frame.name}"
+        for frame in frames
+        if frame.filename.startswith(base_dir) and __file__ != frame.filename
+    ]
+
+
+def query_budget(max_queries):
+    """Declare the most queries a function view may run per request."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper of every connection: passes the query through the active recorders."""
+    for recorder in _recorders.get():
+        execute = partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    install(connection)
+
+
+# QueryRecorder: execute_wrapper that counts queries by shape
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.shapes = defaultdict(int)
+        self.stacks = {}
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            shape = normalize_sql(sql)
+            self.count += 1
+            self.shapes[shape] += 1
+            if shape not in self.stacks:
+                # Only the first occurrence of a shape pays for the stack capture
+                self.stacks[shape] = application_stack()
+
+    @contextmanager
+    def installed(self):
+        """Record the queries of this context, in this thread and the threads it hands work to."""
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all():
+            install(connection)
+        token = _recorders.set((*_recorders.get(), self))
+        try:
+            yield self
+        finally:
+            _recorders.reset(token)
+
+    def problems(self, budget=None, threshold=None):
+        """Human-readable list of N+1 patterns and budget overruns."""
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 5)
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries, budget is {budget}")
+        for shape, count in self.shapes.items():
+            # Repeated INSERT/UPDATE batches (bulk_create, bulk_update) are intentional
+            if count >= threshold and shape.startswith('SELECT'):
+                origin = '\n    '.join(self.stacks[shape][-3:]) or '(no application frame)'
+                problems.append(f"N+1: {count} x {shape}\n    {origin}")
+        return problems
+
+
+# QueryBudgetMiddleware: record queries per request and report N+1s and overruns
+class QueryBudgetMiddleware:
+    """
+    Settings:
+    - QUERY_BUDGET_STRICT: raise QueryBudgetExceeded instead of logging.
+    - QUERY_BUDGET_DEFAULT: budget for views that declare none (None: unlimited).
+    - QUERY_BUDGET_N_PLUS_ONE_THRESHOLD: repeats of one query shape reported as N+1 (5).
+
+    With DEBUG on, responses carry an `X-Query-Count` header.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.query_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        recorder = QueryRecorder()
+        with recorder.installed():
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        request.query_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        recorder = QueryRecorder()
+        with recorder.installed():
+            response = await self.get_response(request)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        problems = recorder.problems(request.query_budget)
+        if problems:
+            message = f"{request.method} {request.path}: " + '\n'.join(problems)
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_func, 'query_budget', getattr(view_class, 'query_budget', None))
+        if budget is not None:
+            request.query_budget = budget
+        return None
+
+
+# QueryBudgetTestMixin: assertions for TestCase classes
+class QueryBudgetTestMixin:
+    @contextmanager
+    def assertQueryBudget(self, max_queries=None, threshold=None):
+        """Fail if the block runs more than `max_queries` queries or an N+1 pattern."""
+        recorder = QueryRecorder()
+        with recorder.installed():
+            yield recorder
+        problems = recorder.problems(max_queries, threshold)
+        if problems:
+            self.fail('\n'.join(problems))
@@ -0,0 +1,182 @@
+"""
+Read replicas with read-your-writes.
+
+ReplicaRouter sends the reads of views marked with `@replica_reads`
+(function views) or `replica_reads = True` (class-based views) to one of the
+aliases in DATABASE_REPLICAS, and every write to the primary ('default').
+
+ReplicaMiddleware decides per request:
+
+- only GET/HEAD/OPTIONS requests to marked views read from a replica, and
+  never for sessions and users (DATABASE_REPLICA_PRIMARY_APPS);
+- the first write of a request pins the rest of it to the primary;
+- a request that wrote sets a short-lived cookie (DATABASE_REPLICA_PIN_SECONDS)
+  so the client's next requests also read from the primary until the
+  replicas have caught up;
+- `read_from_replica()` tells caches that the request's data may be older
+  than the primary, so it is not stored under the current cache generations.
+
+Locally, replicas are SQLite files refreshed from the primary with the online
+backup API by `python manage.py sync_replicas` (a stand-in for real
+replication). With DATABASE_REPLICAS empty everything uses 'default'.
+"""
+import random
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Apps always read from the primary (DATABASE_REPLICA_PRIMARY_APPS)
+PRIMARY_APPS = ('auth', 'sessions')
+
+# Mutable per-request state, so writes made in sync_to_async threads (async
+# views) still pin the request they belong to
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_reads(view_func):
+    """Let a function view read from the replicas."""
+    view_func.replica_reads = True
+    return view_func
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def read_from_replica():
+    """True once the current request has read from a replica, whose rows may lag the primary."""
+    state = _request_state.get()
+    return state is not None and state.read_replica
+
+
+# ReplicaState: routing decisions for the current request
+class ReplicaState:
+    def __init__(self, pinned=False):
+        self.use_replica = False
+        self.pinned = pinned
+        self.wrote = False
+        self.read_replica = False
+
+
+# ReplicaRouter: reads of marked views to a replica, writes to the primary
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        replicas = get_replicas()
+        if state is None or not state.use_replica or state.pinned or not replicas:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in getattr(settings, 'DATABASE_REPLICA_PRIMARY_APPS', PRIMARY_APPS):
+            # A session or user created since the last sync must still authenticate
+            return DEFAULT_DB_ALIAS
+        state.read_replica = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from sync_replicas, never from migrate
+        return db not in get_replicas()
+
+
+# ReplicaMiddleware: per-request replica routing and read-your-writes pinning
+# (sync and async, so async views are not handed to a thread)
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = ReplicaState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.set_pin(state, response)
+
+    async def __acall__(self, request):
+        state = ReplicaState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.set_pin(state, response)
+
+    @staticmethod
+    def set_pin(state, response):
+        if state.wrote and get_replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5), httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        marked = getattr(view_func, 'replica_reads', getattr(view_class, 'replica_reads', False))
+        state = _request_state.get()
+        if state is not None:
+            state.use_replica = marked and request.method in SAFE_METHODS
+        return None
+
+
+def copy_database(source, path, pages=256, max_busy_steps=120):
+    """
+    Copy an open sqlite3 connection into the file at `path` with the online
+    backup API, `pages` pages per step so writers are not blocked for the
+    whole copy. Returns the number of pages copied.
+
+    sqlite3 retries a step every 0.25s while a writer holds the source lock;
+    after `max_busy_steps` retries in a row the copy gives up.
+    """
+    copied = busy = 0
+
+    def progress(status, remaining, total):
+        nonlocal copied, busy
+        busy = busy + 1 if status in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED) else 0
+        if busy > max_busy_steps:
+            raise sqlite3.OperationalError(f"Primary stayed locked for {busy} backup steps.")
+        copied = total
+
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    finally:
+        target.close()
+    return copied
+
+
+def sync_replicas(aliases=None, pages=256):
+    """Refresh each replica file from the primary; returns {alias: (pages, seconds)}."""
+    primary = connections[DEFAULT_DB_ALIAS]
+    if primary.vendor != 'sqlite':
+        raise ValueError("sync_replicas copies SQLite files; use the database's own replication.")
+    primary.ensure_connection()
+    results = {}
+    for alias in aliases or get_replicas():
+        # Drop open handles so the next read reopens the refreshed file
+        connections[alias].close()
+        start = time.perf_counter()
+        pages_copied = copy_database(primary.connection, connections[alias].settings_dict['NAME'], pages)
+        results[alias] = (pages_copied, time.perf_counter() - start)
+    return results
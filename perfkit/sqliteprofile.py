@@ -0,0 +1,108 @@
+"""
+Tuned SQLite connection profile.
+
+Every new SQLite connection gets the pragmas in SQLITE_PRAGMAS (merged over
+DEFAULT_PRAGMAS; a value of None leaves that pragma at SQLite's default):
+
+- journal_mode=WAL: readers no longer wait for a writer, and a writer no
+  longer waits for readers (the setting is stored in the database file);
+- synchronous=NORMAL: safe with WAL, one fsync per checkpoint instead of per commit;
+- cache_size / mmap_size / temp_store: keep hot pages, memory-mapped reads and
+  temporary B-trees in memory;
+- busy_timeout: how long a writer waits for the lock before "database is locked".
+
+Every SQLITE_MAINTENANCE_INTERVAL seconds (per database, per process) a new
+connection or the end of a request also runs `PRAGMA optimize` (refreshes the
+query planner statistics that need it) and a passive WAL checkpoint, which
+keeps the -wal file from growing while connections stay open.
+
+The pragmas are applied on the raw sqlite3 connection, so they do not show up
+in query counts or budgets.
+"""
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,           # milliseconds; first, so switching to WAL waits for the lock
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,           # negative: KiB, i.e. 64 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+_VALUE = re.compile(r'-?\d+|[A-Za-z_]+')
+
+_last_maintenance = {}
+_maintenance_lock = threading.Lock()
+
+
+def get_pragmas():
+    pragmas = {**DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def apply_pragmas(raw_connection, pragmas):
+    """Run `PRAGMA name = value` for each pragma on a sqlite3 connection."""
+    for name, value in pragmas.items():
+        if not _VALUE.fullmatch(str(value)) or not name.isidentifier():
+            raise ImproperlyConfigured(f"Invalid SQLite pragma in SQLITE_PRAGMAS: {name}={value!r}")
+        raw_connection.execute(f'PRAGMA {name} = {value}').fetchall()
+
+
+def run_maintenance(raw_connection):
+    """`PRAGMA optimize` plus a passive WAL checkpoint; returns (busy, wal pages, checkpointed pages)."""
+    raw_connection.execute('PRAGMA optimize')
+    return tuple(raw_connection.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone())
+
+
+def maintenance_due(name):
+    """True (and the clock restarted) when `name` has not been maintained for the interval."""
+    interval = getattr(settings, 'SQLITE_MAINTENANCE_INTERVAL', 300)
+    if not interval:
+        return False
+    now = time.monotonic()
+    with _maintenance_lock:
+        last = _last_maintenance.get(name)
+        if last is not None and now - last < interval:
+            return False
+        _last_maintenance[name] = now
+    return last is not None
+
+
+def maintain(connection):
+    if connection.connection is None or not maintenance_due(str(connection.settings_dict['NAME'])):
+        return
+    try:
+        result = run_maintenance(connection.connection)
+    except Exception:
+        # Maintenance is opportunistic: a locked database is retried next interval
+        logger.warning("SQLite maintenance failed for %s", connection.alias, exc_info=True)
+    else:
+        logger.debug("SQLite maintenance for %s: checkpoint %s", connection.alias, result)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    apply_pragmas(connection.connection, get_pragmas())
+    maintain(connection)
+
+
+@receiver(request_finished)
+def maintain_open_connections(sender, **kwargs):
+    # Persistent connections (CONN_MAX_AGE) are rarely recreated, so check here too
+    for connection in connections.all(initialized_only=True):
+        if connection.vendor == 'sqlite':
+            maintain(connection)
@@ -0,0 +1,22 @@
+"""
+Test runner for projects that use perfkit.
+
+Set TEST_RUNNER = 'perfkit.testrunner.QueryBudgetTestRunner' to make query
+budget and N+1 problems (perfkit/querybudget.py) raise QueryBudgetExceeded
+during `manage.py test`, whatever QUERY_BUDGET_STRICT says. Other runners
+(pytest-django, ...) get the same with QUERY_BUDGET_STRICT=1 in the environment.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+# QueryBudgetTestRunner: DiscoverRunner with strict query budgets
+class QueryBudgetTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.strict_budgets = override_settings(QUERY_BUDGET_STRICT=True)
+        self.strict_budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.strict_budgets.disable()
+        super().teardown_test_environment(**kwargs)